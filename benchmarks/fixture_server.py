@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from utils.file_utils import load_json_file, save_json_file
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+MANIFEST_FILE = 'manifest.json'
+FIXTURE_KINDS = ('search', 'channel_videos', 'watch', 'shorts')
+NEXT_ENDPOINT = '/youtubei/v1/next'
+API_PREFIX = '/youtubei/'
+
+# Everything except the local server is blocked during a benchmark, so a fixture never reaches the real site.
+OFFLINE_URL_PATTERNS = [
+    '*youtube.com/*', '*youtube-nocookie.com/*', '*ytimg.com/*', '*ggpht.com/*', '*googlevideo.com/*',
+    '*googleusercontent.com/*', '*gstatic.com/*', '*google.com/*', '*googleapis.com/*',
+]
+
+
+def get_route(url):
+    """
+    Path and query of the original YouTube URL, under which the fixture is served locally.
+    """
+    parts = urlsplit(url)
+    return parts.path + (f'?{parts.query}' if parts.query else '')
+
+
+def get_next_key(request_body):
+    """
+    Key of a youtubei/v1/next exchange: the continuation token of a comments request,
+    or the video id of the request for the rest of a watch page.
+    """
+    try:
+        payload = json.loads(request_body or '{}')
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    return payload.get('continuation') or payload.get('videoId')
+
+
+def load_manifest(fixture_dir=FIXTURE_DIR):
+    """
+    Returns:
+        dict: Fixture kind -> list of {'url', 'file', 'items'} entries written by record_fixtures.py.
+    """
+    manifest_path = os.path.join(fixture_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(
+            f'Не найден {manifest_path}. Сначала запишите фикстуры: python -m benchmarks.record_fixtures'
+        )
+    return load_json_file(manifest_path)
+
+
+def save_manifest(manifest, fixture_dir=FIXTURE_DIR):
+    save_json_file(manifest, os.path.join(fixture_dir, MANIFEST_FILE))
+
+
+class FixtureServer:
+    """
+    Serves recorded pages from a local HTTP server under the path and query of their original URL,
+    e.g. /watch?v=... or /@channel/videos, and the recorded youtubei/v1/next responses of watch pages.
+
+    Requests to the youtubei API without a recorded response are collected, see pop_unserved_requests:
+    a scenario that made them did not run against the complete page.
+    """
+
+    def __init__(self, manifest, fixture_dir=FIXTURE_DIR, host='127.0.0.1', port=0):
+        self.routes = {
+            get_route(entry['url']): os.path.join(fixture_dir, entry['file'])
+            for entries in manifest.values() for entry in entries
+        }
+        self.next_responses = {}
+        for entries in manifest.values():
+            for entry in entries:
+                if entry.get('next_file'):
+                    self.next_responses.update(load_json_file(os.path.join(fixture_dir, entry['next_file'])))
+        self.unserved_requests = []
+        self.unserved_lock = threading.Lock()
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f'http://{self.host}:{self.server.server_address[1]}'
+
+    def local_url(self, url):
+        return self.base_url + get_route(url)
+
+    def _add_unserved_request(self, request):
+        with self.unserved_lock:
+            self.unserved_requests.append(request)
+
+    def pop_unserved_requests(self):
+        """
+        Returns:
+            list[str]: "METHOD path" of the youtubei API requests that got no recorded response since the last call.
+        """
+        with self.unserved_lock:
+            unserved_requests, self.unserved_requests = self.unserved_requests, []
+        return unserved_requests
+
+    def _create_handler(self):
+        routes = self.routes
+        next_responses = self.next_responses
+        fixture_server = self
+
+        class FixtureHandler(BaseHTTPRequestHandler):
+            def _send_body(self, body, content_type):
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_not_found(self):
+                if self.path.startswith(API_PREFIX):
+                    fixture_server._add_unserved_request(f'{self.command} {urlsplit(self.path).path}')
+                self.send_error(404)
+
+            def do_GET(self):
+                fixture_path = routes.get(self.path)
+                if fixture_path is None:
+                    self._send_not_found()
+                    return
+                with open(fixture_path, 'rb') as f:
+                    body = f.read()
+                self._send_body(body, 'text/html; charset=utf-8')
+
+            def do_POST(self):
+                request_body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                response = None
+                if urlsplit(self.path).path == NEXT_ENDPOINT:
+                    response = next_responses.get(get_next_key(request_body))
+                if response is None:
+                    self._send_not_found()
+                    return
+                self._send_body(response.encode('utf-8'), 'application/json; charset=utf-8')
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return FixtureHandler
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), self._create_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f'Фикстуры ({len(self.routes)} страниц) доступны по адресу {self.base_url}.')
+        return self
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
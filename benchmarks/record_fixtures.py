@@ -0,0 +1,171 @@
+"""
+Records the YouTube pages used by the benchmark suite.
+
+Every page is loaded in a real browser, scrolled or expanded the way the scrapers need it and saved
+as the rendered DOM without external scripts, so it stays static when served by the fixture server.
+Responses of youtubei/v1/next requests made by watch pages (comments, related videos) are saved next
+to the page and served for the same requests.
+
+    python -m benchmarks.record_fixtures --search "python" --channel https://www.youtube.com/@name/videos \
+        --watch https://www.youtube.com/watch?v=... --shorts https://www.youtube.com/shorts/...
+"""
+import argparse
+import json
+import logging
+import os
+import re
+from urllib.parse import quote_plus
+from benchmarks.fixture_server import FIXTURE_DIR, NEXT_ENDPOINT, get_next_key, save_manifest
+from utils.selector_utils import load_selectors
+from utils.navigation_utils import click_element_css, scroll_to_load_items
+from utils.wait_utils import wait_for_selector
+from utils.webdriver_utils import setup_options_webdriver
+
+logger = logging.getLogger(__name__)
+
+EXTERNAL_SCRIPT_PATTERN = re.compile(r'<script\b[^>]*\bsrc=[^>]*>\s*</script>', re.IGNORECASE)
+COMMENTS_LOAD_ATTEMPTS = 10  # Сколько раз прокручивать к комментариям до их появления
+
+# Runs before the page scripts and keeps the request body and response of every youtubei/v1/next fetch.
+RECORD_NEXT_SCRIPT = """
+window.__recordedNext = [];
+const originalFetch = window.fetch;
+window.fetch = function(input, init) {
+    const url = typeof input === 'string' ? input : (input && input.url) || String(input);
+    if (!url.includes('%s')) {
+        return originalFetch.apply(this, arguments);
+    }
+    const requestBody = init && init.body !== undefined ? Promise.resolve(String(init.body))
+        : input instanceof Request ? input.clone().text() : Promise.resolve('');
+    return originalFetch.apply(this, arguments).then(response => {
+        Promise.all([requestBody, response.clone().text()]).then(([request, text]) => {
+            window.__recordedNext.push({request: request, response: text});
+        });
+        return response;
+    });
+};
+""" % NEXT_ENDPOINT
+
+
+def save_fixture(driver, fixture_dir, file_name, url, items=None):
+    html = EXTERNAL_SCRIPT_PATTERN.sub('', driver.page_source)
+    with open(os.path.join(fixture_dir, file_name), 'w', encoding='utf-8') as f:
+        f.write(html)
+    logger.info(f'Страница {url} сохранена в {file_name}.')
+    return {'url': url, 'file': file_name, 'items': items}
+
+
+def record_list_page(driver, css_selectors, fixture_dir, file_name, url, item_key, max_items):
+    driver.get(url)
+    wait_for_selector(driver, css_selectors, item_key)
+    items = scroll_to_load_items(driver, css_selectors, item_key, max_items)
+    return save_fixture(driver, fixture_dir, file_name, url, items)
+
+
+def scroll_to_comments(driver, css_selectors):
+    """
+    Scrolls to the comments section until the comment count or the "comments are turned off" message appears.
+    """
+    selector_keys = ['video_comments', 'comments_turned_off']
+    selector = ', '.join(css_selectors.any_of(key) for key in selector_keys)
+    for _ in range(COMMENTS_LOAD_ATTEMPTS):
+        driver.execute_script(
+            "const comments = document.querySelector('#comments');"
+            "if (comments) { comments.scrollIntoView(); } else { window.scrollBy(0, window.innerHeight); }"
+        )
+        wait_for_selector(driver, css_selectors, selector_keys, timeout=2)
+        if driver.find_elements('css selector', selector):
+            return True
+    logger.warning(f'Комментарии на странице {driver.current_url} не загрузились.')
+    return False
+
+
+def save_next_responses(driver, fixture_dir, file_name):
+    """
+    Saves the youtubei/v1/next responses recorded by RECORD_NEXT_SCRIPT, keyed by get_next_key.
+
+    Returns:
+        str | None: File name of the responses, or None if the page made no such request.
+    """
+    recorded = driver.execute_script('return window.__recordedNext || [];')
+    responses = {}
+    for exchange in recorded:
+        key = get_next_key(exchange['request'])
+        if key:
+            responses[key] = exchange['response']
+    if not responses:
+        return None
+    next_file = f'{os.path.splitext(file_name)[0]}_next.json'
+    with open(os.path.join(fixture_dir, next_file), 'w', encoding='utf-8') as f:
+        json.dump(responses, f, ensure_ascii=False)
+    logger.info(f'Ответов {NEXT_ENDPOINT} сохранено в {next_file}: {len(responses)}.')
+    return next_file
+
+
+def record_watch_page(driver, css_selectors, fixture_dir, file_name, url):
+    driver.get(url)
+    wait_for_selector(driver, css_selectors, ['video_title', 'is_video_unavailable', 'is_video_unacceptable'])
+    # Saved the way the scrapers read it: with the description expanded and the comments section loaded.
+    click_element_css(driver, css_selectors, 'video_description_button')
+    scroll_to_comments(driver, css_selectors)
+    entry = save_fixture(driver, fixture_dir, file_name, url)
+    entry['next_file'] = save_next_responses(driver, fixture_dir, file_name)
+    return entry
+
+
+def record_shorts_page(driver, css_selectors, fixture_dir, file_name, url):
+    driver.get(url)
+    wait_for_selector(driver, css_selectors, ['shorts_menu_button', 'is_shorts_unacceptable'])
+    # The description panel is saved open: its buttons do nothing in the static copy.
+    for selector_key in ('shorts_menu_button', 'shorts_description_button', 'shorts_more_button'):
+        click_element_css(driver, css_selectors, selector_key)
+    return save_fixture(driver, fixture_dir, file_name, url)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Запись страниц YouTube для бенчмарков.')
+    parser.add_argument('--search', help='Поисковый запрос.')
+    parser.add_argument('--channel', help='Ссылка на вкладку "Видео" канала.')
+    parser.add_argument('--watch', nargs='*', default=[], help='Ссылки на Video.')
+    parser.add_argument('--shorts', nargs='*', default=[], help='Ссылки на Shorts.')
+    parser.add_argument('--max-items', type=int, default=60, help='Сколько элементов подгружать в поиске и на канале.')
+    parser.add_argument('--fixtures', default=FIXTURE_DIR, help='Папка фикстур.')
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    os.makedirs(args.fixtures, exist_ok=True)
+    css_selectors = load_selectors('css_selectors.json')
+
+    manifest = {'search': [], 'channel_videos': [], 'watch': [], 'shorts': []}
+    driver = setup_options_webdriver(block_resources=True)
+    try:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': RECORD_NEXT_SCRIPT})
+        if args.search:
+            url = f'https://www.youtube.com/results?search_query={quote_plus(args.search)}'
+            manifest['search'].append(record_list_page(
+                driver, css_selectors, args.fixtures, 'search.html', url, 'search_all_videos', args.max_items
+            ))
+        if args.channel:
+            manifest['channel_videos'].append(record_list_page(
+                driver, css_selectors, args.fixtures, 'channel_videos.html', args.channel, 'channel_all_videos',
+                args.max_items
+            ))
+        for number, url in enumerate(args.watch):
+            manifest['watch'].append(
+                record_watch_page(driver, css_selectors, args.fixtures, f'watch_{number}.html', url)
+            )
+        for number, url in enumerate(args.shorts):
+            manifest['shorts'].append(
+                record_shorts_page(driver, css_selectors, args.fixtures, f'shorts_{number}.html', url)
+            )
+    finally:
+        driver.quit()
+
+    save_manifest(manifest, args.fixtures)
+
+
+if __name__ == '__main__':
+    main()
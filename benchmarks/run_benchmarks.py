@@ -0,0 +1,176 @@
+"""
+Runs the scrapers against recorded pages served locally and compares the results with a baseline.
+
+    python -m benchmarks.run_benchmarks                  # compare with benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --save-baseline  # make this run the new baseline
+
+Exit code 1 means at least one scenario or field became slower than the baseline by more than the threshold.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from benchmarks.fixture_server import FIXTURE_DIR, OFFLINE_URL_PATTERNS, FixtureServer, load_manifest
+from channel_info_scraper import ChannelVideo
+from search_info_scraper import SearchVideo
+from video_info_scraper import VideoInfo, ShortsInfo
+from utils.file_utils import load_json_file, save_json_file
+from utils.selector_utils import load_selectors
+from utils.timing_utils import timings
+from utils.wait_utils import set_wait_timeout
+from utils.webdriver_utils import BLOCKED_URL_PATTERNS, enable_resource_blocking, setup_options_webdriver
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+REGRESSION_THRESHOLD = 0.2  # Допустимое замедление относительно базовой линии
+MIN_REGRESSION_SECONDS = 0.01  # Меньшие изменения p50 поля считаются шумом
+
+
+def run_search(driver, css_selectors, server, entries):
+    items = 0
+    for entry in entries:
+        driver.get(server.local_url(entry['url']))
+        scraper = SearchVideo(driver, css_selectors)
+        items += len(scraper.scraping_search_video(scraper.get_available_info(), max_items=entry['items']))
+    return items
+
+
+def run_channel_videos(driver, css_selectors, server, entries):
+    items = 0
+    for entry in entries:
+        driver.get(server.local_url(entry['url']))
+        scraper = ChannelVideo(driver, css_selectors)
+        items += len(scraper.scraping_channel_videos(scraper.get_available_info(), max_items=entry['items']))
+    return items
+
+
+def run_watch(driver, css_selectors, server, entries):
+    scraper = VideoInfo(driver, css_selectors)
+    videos = [{'url': server.local_url(entry['url'])} for entry in entries]
+    return len(scraper.scraping_video_info(videos, scraper.get_available_info()))
+
+
+def run_shorts(driver, css_selectors, server, entries):
+    scraper = ShortsInfo(driver, css_selectors)
+    videos = [{'url': server.local_url(entry['url'])} for entry in entries]
+    return len(scraper.scraping_shorts_info(videos, scraper.get_available_info()))
+
+
+SCENARIOS = {
+    'search': run_search,
+    'channel_videos': run_channel_videos,
+    'watch': run_watch,
+    'shorts': run_shorts,
+}
+
+
+def run_scenario(name, driver, css_selectors, server, entries):
+    timings.reset()
+    server.pop_unserved_requests()
+    started_at = time.perf_counter()
+    items = SCENARIOS[name](driver, css_selectors, server, entries)
+    seconds = time.perf_counter() - started_at
+    stages = timings.summary()
+    result = {
+        'pages': len(entries),
+        'items': items,
+        'seconds': round(seconds, 3),
+        'items_per_sec': round(items / seconds, 3) if seconds else 0.0,
+        'fields': {stage: stats for stage, stats in stages.items() if stage.startswith('field.')},
+        'stages': {stage: stats for stage, stats in stages.items() if not stage.startswith('field.')}
+    }
+    # The pages waited for data that was not recorded, so the timings do not describe the real site.
+    unserved_requests = sorted(set(server.pop_unserved_requests()))
+    if unserved_requests:
+        result['invalid'] = unserved_requests
+    return result
+
+
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or result.get('invalid') or base.get('invalid'):
+            continue
+        if base['items_per_sec'] and result['items_per_sec'] < base['items_per_sec'] * (1 - threshold):
+            regressions.append(
+                f'{name}: {result["items_per_sec"]:.2f} элементов/с вместо {base["items_per_sec"]:.2f}'
+            )
+        for field, stats in result['fields'].items():
+            base_stats = base['fields'].get(field)
+            if not base_stats:
+                continue
+            slowdown = stats['p50'] - base_stats['p50']
+            if slowdown > MIN_REGRESSION_SECONDS and stats['p50'] > base_stats['p50'] * (1 + threshold):
+                regressions.append(f'{name}/{field}: p50 {stats["p50"]:.3f} с вместо {base_stats["p50"]:.3f} с')
+    return regressions
+
+
+def print_results(results):
+    for name, result in results.items():
+        print(f'\n{name}: {result["items"]} элементов со {result["pages"]} страниц за {result["seconds"]:.2f} с '
+              f'({result["items_per_sec"]:.2f} элементов/с)')
+        if result.get('invalid'):
+            print(f'    Сценарий недействителен, нет записанных ответов: {", ".join(result["invalid"])}. '
+                  f'Перезапишите фикстуры.')
+        for field, stats in result['fields'].items():
+            print(f'    {field}: p50 {stats["p50"]:.3f} с, p95 {stats["p95"]:.3f} с, max {stats["max"]:.3f} с, '
+                  f'{stats["count"]} раз')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Бенчмарки скраперов на записанных страницах YouTube.')
+    parser.add_argument('--fixtures', default=FIXTURE_DIR, help='Папка фикстур.')
+    parser.add_argument('--scenarios', nargs='*', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='JSON базовой линии для сравнения.')
+    parser.add_argument('--save-baseline', action='store_true', help='Сохранить результаты как базовую линию.')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument('--wait-timeout', type=float, default=10)
+    parser.add_argument('--no-headless', action='store_true', help='Показывать окно браузера.')
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    set_wait_timeout(args.wait_timeout)
+    manifest = load_manifest(args.fixtures)
+    css_selectors = load_selectors('css_selectors.json')
+
+    results = {}
+    with FixtureServer(manifest, args.fixtures) as server:
+        driver = setup_options_webdriver(block_resources=True, headless=not args.no_headless)
+        try:
+            enable_resource_blocking(driver, BLOCKED_URL_PATTERNS + OFFLINE_URL_PATTERNS)
+            for name in args.scenarios:
+                if manifest.get(name):
+                    results[name] = run_scenario(name, driver, css_selectors, server, manifest[name])
+        finally:
+            driver.quit()
+
+    print_results(results)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    save_json_file(results, os.path.join(RESULTS_DIR, f'benchmark_{time.strftime("%Y%m%d_%H%M%S")}.json'))
+    if args.save_baseline:
+        save_json_file(results, args.baseline)
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f'\nБазовая линия {args.baseline} не найдена. Сохраните её флагом --save-baseline.')
+        return
+    regressions = find_regressions(results, load_json_file(args.baseline), args.threshold)
+    if regressions:
+        print('\nЗамедление относительно базовой линии:')
+        for regression in regressions:
+            print(f'    {regression}')
+        sys.exit(1)
+    print('\nЗамедлений относительно базовой линии нет.')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,22 @@
 import logging
-import time
 from collections import OrderedDict
-from utils.navigation_utils import click_element_css, scroll_selenium_keys
+from utils.navigation_utils import click_element_css, scroll_to_load_items, iter_limited_items, limit_first_page_items
 from utils.user_input_utils import get_functions_from_user
 from utils import element_utils
+from utils.wait_utils import wait_for_selector
+from utils.timing_utils import timed
+from utils.html_parse_utils import parse_items, save_snapshot
+from utils.initial_data_utils import get_page_data, parse_channel_video_items
 
 
 logger = logging.getLogger(__name__)
 
 
 class ChannelBase:
-    def __init__(self, driver, css_selectors):
+    def __init__(self, driver, css_selectors, snapshot_dir=None):
         self.driver = driver
         self.css_selectors = css_selectors
+        self.snapshot_dir = snapshot_dir
         self.logger = logging.getLogger(__name__)
 
     def click_element_css(self, selector_key):
@@ -27,6 +31,37 @@ class ChannelBase:
     def _get_element_attribute(self, element, selector_key, attribute, error_message):
         return element_utils.get_element_attribute(element, self.css_selectors, selector_key, attribute, error_message)
 
+    def _iter_elements_data(self, container_key, field_specs, selected_functions, error_message):
+        selected_specs = {name: field_specs[name] for name in selected_functions if name in field_specs}
+        elements_data = element_utils.iter_elements_data(
+            self.driver, self.css_selectors, container_key, selected_specs, error_message
+        )
+        if elements_data is None:
+            return None
+        return (OrderedDict((name, element_data[name]) for name in selected_specs) for element_data in elements_data)
+
+    def _parse_snapshot_items(self, container_key, field_specs, selected_functions):
+        selected_specs = {name: field_specs[name] for name in selected_functions if name in field_specs}
+        page_source = self.driver.page_source
+        save_snapshot(self.snapshot_dir, self.driver.current_url, page_source)
+        items = parse_items(page_source, self.css_selectors, container_key, selected_specs)
+        return iter(items)
+
+    def _iter_elements_info(self, elements, info_functions, selected_functions, item_name):
+        total_elements = len(elements)
+        for element_number, element in enumerate(elements, 1):
+            self.logger.info(f'\nОбработка {item_name} {element_number} из {total_elements}...')
+            element_info = OrderedDict()
+            for func_name in selected_functions:
+                if func_name in info_functions:
+                    self.logger.debug(f'Выбрана функция {func_name} для сбора информации.')
+                    func = info_functions[func_name]
+                    with timed(f'field.{type(self).__name__}.{func_name}'):
+                        element_info[func_name] = func(element)
+                else:
+                    self.logger.warning(f'Выбранная пользователем информация не соответствует словарю функций.')
+            yield element_info
+
 
 class ChannelInfo(ChannelBase):
 
@@ -76,7 +111,7 @@ class ChannelInfo(ChannelBase):
 
     def get_channel_main_description(self):
         self.click_element_css('channel_description_button')
-        time.sleep(0.5)
+        wait_for_selector(self.driver, self.css_selectors, 'channel_main_description')
         return self._get_element_text(
             element=self.driver,
             selector_key='channel_main_description',
@@ -134,20 +169,23 @@ class ChannelInfo(ChannelBase):
             if func_name in self.info_functions:
                 self.logger.debug(f'Выбрана функция {func_name} для сбора информации.')
                 func = self.info_functions[func_name]
-                channel_data[func_name] = func()
+                with timed(f'field.{type(self).__name__}.{func_name}'):
+                    channel_data[func_name] = func()
             else:
                 self.logger.warning(f'Выбранная пользователем функция "{func_name}" не соответствует словарю функций.')
 
         self.click_element_css('channel_description_close_button')
         return channel_data
 
+    def get_available_info(self):
+        return list(self.info_functions.keys())
+
     def get_info_functions(self):
-        available_info = list(self.info_functions.keys())
-        return get_functions_from_user('канале', available_info)
+        return get_functions_from_user('канале', self.get_available_info())
 
 class ChannelVideo(ChannelBase):
-    def __init__(self, driver, css_selectors):
-        super().__init__(driver, css_selectors)
+    def __init__(self, driver, css_selectors, snapshot_dir=None):
+        super().__init__(driver, css_selectors, snapshot_dir)
         self.video_functions = {
             'title': self.get_channel_video_title,
             'url': self.get_channel_video_url,
@@ -155,6 +193,13 @@ class ChannelVideo(ChannelBase):
             'release_date': self.get_channel_video_release_date,
             'preview': self.get_channel_video_preview
         }
+        self.video_batch_fields = {
+            'title': ('channel_video_title', None),
+            'url': ('channel_video_url', 'href'),
+            'views': ('channel_video_views', None),
+            'release_date': ('channel_video_release_date', None),
+            'preview': ('channel_video_preview', 'src')
+        }
 
     def get_channel_all_video_elements(self):
         return self._get_elements(
@@ -200,40 +245,88 @@ class ChannelVideo(ChannelBase):
         )
 
 
-    def scraping_channel_videos(self, selected_video_functions):
-        scroll_selenium_keys(self.driver)
-
-        video_elements = self.get_channel_all_video_elements()
-        time.sleep(1)
+    def scraping_channel_videos(self, selected_video_functions, max_items=None, until_date=None, stop_url=None):
+        return list(self.iter_channel_videos(selected_video_functions, max_items, until_date, stop_url))
 
-        video_data = []
-        total_videos = len(video_elements)
-        for video_number, video_element in enumerate(video_elements, 1):
-            self.logger.info(f'\nОбработка видео {video_number} из {total_videos}...')
-            video_info = OrderedDict()
-            for func_name in selected_video_functions:
-                if func_name in self.video_functions:
-                    self.logger.debug(f'Выбрана функция {func_name} для сбора информации.')
-                    func = self.video_functions[func_name]
-                    video_info[func_name] = func(video_element)
-                else:
-                    self.logger.warning(f'Выбранная пользователем информация не соответствует словарю функций.')
+    def _get_first_page_channel_videos(self, selected_video_functions, max_items=None, until_date=None, stop_url=None):
+        video_items = limit_first_page_items(
+            parse_channel_video_items(get_page_data(self.driver)), max_items, until_date, stop_url
+        )
+        if video_items is None:
+            return None
+        return [
+            OrderedDict((name, item[name]) for name in selected_video_functions if name in item)
+            for item in video_items
+        ]
+
+    def iter_channel_videos(
+            self,
+            selected_video_functions,
+            max_items=None,
+            until_date=None,
+            stop_url=None,
+            use_page_data=True
+    ):
+        """
+        use_page_data=False must be passed after a sort chip was clicked: the chip loads videos
+        as a continuation and ytInitialData keeps the default sort.
+        """
+        if use_page_data and not self.snapshot_dir:
+            first_page_data = self._get_first_page_channel_videos(
+                selected_video_functions, max_items, until_date, stop_url
+            )
+            if first_page_data is not None:
+                self.logger.info('Все нужные видео найдены в ytInitialData первой страницы. Прокрутка не нужна.')
+                yield from first_page_data
+                return
+
+        scroll_to_load_items(
+            self.driver,
+            self.css_selectors,
+            'channel_all_videos',
+            max_items,
+            until_date,
+            'channel_video_release_date',
+            stop_url,
+            'channel_video_url'
+        )
 
-            video_data.append(video_info)
-        return video_data
+        if self.snapshot_dir:
+            video_data = self._parse_snapshot_items('channel_all_videos', self.video_batch_fields, selected_video_functions)
+        else:
+            video_data = self._iter_elements_data(
+                container_key='channel_all_videos',
+                field_specs=self.video_batch_fields,
+                selected_functions=selected_video_functions,
+                error_message='Не удалось найти ни одного элемента видео.'
+            )
+        if video_data is None:
+            self.logger.warning('Пакетное извлечение не удалось. Перехожу к поэлементному сбору информации.')
+            video_data = self._iter_elements_info(
+                self.get_channel_all_video_elements(), self.video_functions, selected_video_functions, 'видео'
+            )
+
+        yield from iter_limited_items(video_data, max_items, until_date, stop_url)
+
+    def get_available_info(self):
+        return list(self.video_functions.keys())
 
     def get_video_functions(self):
-        available_info = list(self.video_functions.keys())
-        return get_functions_from_user('видео', available_info)
+        return get_functions_from_user('видео', self.get_available_info())
 
 class ChannelShorts(ChannelBase):
-    def __init__(self, driver, css_selectors):
-        super().__init__(driver, css_selectors)
+    def __init__(self, driver, css_selectors, snapshot_dir=None):
+        super().__init__(driver, css_selectors, snapshot_dir)
         self.shorts_functions = {
             'title': self.get_channel_shorts_title,
             'views': self.get_channel_shorts_views,
             'preview': self.get_channel_shorts_preview
         }
+        self.shorts_batch_fields = {
+            'title': ('channel_shorts_title', None),
+            'views': ('channel_shorts_views', None),
+            'preview': ('channel_shorts_preview', 'src')
+        }
 
     def get_channel_all_shorts_elements(self):
         return self._get_elements(
@@ -264,28 +357,33 @@ class ChannelShorts(ChannelBase):
         )
 
 
-    def scraping_channel_shorts(self, selected_shorts_functions):
-        scroll_selenium_keys(self.driver)
+    def scraping_channel_shorts(self, selected_shorts_functions, max_items=None):
+        return list(self.iter_channel_shorts(selected_shorts_functions, max_items))
 
-        shorts_elements = self.get_channel_all_shorts_elements()
-        time.sleep(1)
+    def iter_channel_shorts(self, selected_shorts_functions, max_items=None):
+        scroll_to_load_items(self.driver, self.css_selectors, 'channel_all_shorts', max_items)
 
-        shorts_data = []
-        total_shorts = len(shorts_elements)
-        for shorts_number, shorts_element in enumerate(shorts_elements, 1):
-            self.logger.info(f'\nОбработка Shorts {shorts_number} из {total_shorts}...')
-            shorts_info = OrderedDict()
-            for func_name in selected_shorts_functions:
-                if func_name in self.shorts_functions:
-                    self.logger.debug(f'Выбрана функция {func_name} для сбора информации.')
-                    func = self.shorts_functions[func_name]
-                    shorts_info[func_name] = func(shorts_element)
-                else:
-                    self.logger.warning(f'Выбранная пользователем информация не соответствует словарю функций.')
+        if self.snapshot_dir:
+            shorts_data = self._parse_snapshot_items(
+                'channel_all_shorts', self.shorts_batch_fields, selected_shorts_functions
+            )
+        else:
+            shorts_data = self._iter_elements_data(
+                container_key='channel_all_shorts',
+                field_specs=self.shorts_batch_fields,
+                selected_functions=selected_shorts_functions,
+                error_message='Не удалось найти ни одного элемента Shorts.'
+            )
+        if shorts_data is None:
+            self.logger.warning('Пакетное извлечение не удалось. Перехожу к поэлементному сбору информации.')
+            shorts_data = self._iter_elements_info(
+                self.get_channel_all_shorts_elements(), self.shorts_functions, selected_shorts_functions, 'Shorts'
+            )
+
+        yield from iter_limited_items(shorts_data, max_items)
 
-            shorts_data.append(shorts_info)
-        return shorts_data
+    def get_available_info(self):
+        return list(self.shorts_functions.keys())
 
     def get_shorts_functions(self):
-        available_info = list(self.shorts_functions.keys())
-        return get_functions_from_user('Shorts', available_info)
\ No newline at end of file
+        return get_functions_from_user('Shorts', self.get_available_info())
\ No newline at end of file
@@ -1,8 +1,21 @@
+import argparse
 import logging
+import multiprocessing
+import os
+import time
 from services import ChannelInfoService, ChannelVideoService, ChannelShortsService, UserChoiceHandler, \
-    SearchVideoService, VideoInfoService, ShortsInfoService
-from utils.webdriver_utils import setup_options_webdriver
-from utils.file_utils import load_json_file
+    SearchVideoService, VideoInfoService, ShortsInfoService, ChannelPipelineService, JobRunner, WorkQueueService
+from utils.webdriver_utils import setup_options_webdriver, set_resource_blocking
+from utils.selector_utils import load_selectors
+from utils.wait_utils import set_wait_timeout
+from utils.cache_utils import VideoInfoCache
+from utils.http_fetch_utils import YoutubeHttpClient
+from utils.async_fetch_utils import AsyncWatchPageFetcher
+from utils.proxy_pool_utils import ProxyPool, load_proxies, set_proxy_pool
+from utils.browser_pool_utils import BrowserPool, set_browser_pool
+from utils.timing_utils import save_timing_report
+from utils.job_spec_utils import JOB_MODES, load_job_spec, validate_job_spec
+from utils.work_queue_utils import SqliteWorkQueue, MemoryWorkQueue
 
 logging.basicConfig(
         level=logging.INFO,
@@ -14,35 +27,364 @@ logging.basicConfig(
 
 CREDENTIALS_FILE = 'C:/Users/User/PycharmProjects/youtube_scraper/channel_scraper_input_data/youtubescraper-456314-c11c71503d15.json'
 SPREADSHEET_ID = '1LsrDyfNiK8MA0dsIza_4ULZyyOfRQnga_PqllawgmPE'
+WORKER_COUNT = 1  # Количество браузеров для параллельной обработки Video/Shorts
+WAIT_TIMEOUT = 10  # Максимальное время ожидания загрузки элементов страницы, с
+INCREMENTAL_CHANNEL_VIDEO = False  # Собирать только новые видео каналов с момента прошлого запуска
+VIDEO_CACHE_FILE = 'video_scraper_cache/video_info_cache.sqlite3'  # None - не использовать кэш информации о видео
+SNAPSHOT_DIR = 'html_snapshots'  # Папка HTML-снимков страниц для режима --snapshot
+HTTP_WORKER_COUNT = 20  # Количество HTTP-потоков для Video в режиме --http
+HTTP_PROXY = None  # SOCKS5-прокси "host:port" для режима --http
+HTTP_ASYNC = False  # Загружать страницы Video через asyncio (нужен aiohttp) вместо HTTP-потоков
+HTTP_CONCURRENCY = 100  # Максимум одновременных запросов асинхронной загрузки
+HTTP_RATE_LIMIT = 20  # Максимум запросов в секунду к одному хосту при асинхронной загрузке
+PROXY_FILE = None  # Файл со списком SOCKS5-прокси "host:port" по одному на строку. None - без прокси
+BROWSER_PROFILE_DIR = 'browser_profiles'  # Постоянные профили Chrome пула браузеров. None - новый драйвер на каждый запуск
+BROWSER_MAX_PAGES = 200  # Перезапускать драйвер пула после стольких загрузок страниц
+BLOCK_RESOURCES = True  # Не загружать в браузере картинки, видео, шрифты и рекламу
+TIMING_REPORT_DIR = 'run_reports'  # Папка JSON-отчётов о времени этапов каждого запуска. None - не сохранять
+SHEETS_UNSENT_DIR = 'sheets_unsent'  # Папка для данных, которые не удалось выгрузить в Google Sheets
+WORK_QUEUE_LEASE = 600  # Время аренды задачи воркером очереди, с. Задачи упавших воркеров вернутся в очередь после него
+WORK_QUEUE_MAX_ATTEMPTS = 3  # Сколько раз выдавать задачу, прежде чем считать её неудачной
+WORK_QUEUE_POLL_INTERVAL = 5  # Пауза воркера, пока задачи в очереди заняты другими воркерами, с
+MEMORY_QUEUE = ':memory:'  # --queue :memory: - очередь в памяти, все роли в одном процессе (пробный запуск)
 
-def main():
-    driver = setup_options_webdriver()
+def parse_args():
+    parser = argparse.ArgumentParser(description='YouTube scraper')
+    parser.add_argument(
+        '--job',
+        action='append',
+        default=[],
+        help='YAML/JSON-файл задания. Можно указать несколько - задания запустятся параллельно'
+    )
+    parser.add_argument('--mode', choices=JOB_MODES, help='Режим работы без интерактивного меню')
+    parser.add_argument('--fields', nargs='+', help='Собираемая информация (по умолчанию - вся)')
+    parser.add_argument('--filters', nargs='+', help='Фильтры поиска или фильтр каналов (popular/old)')
+    parser.add_argument(
+        '--search-request',
+        action='append',
+        help='Поисковый запрос для режима search. Можно указать несколько - видео из всех поисков сохранятся без повторов'
+    )
+    parser.add_argument(
+        '--input',
+        help='Входной JSON-файл: ссылки на каналы или результаты поиска. Для search - файл запросов, по одному на строку'
+    )
+    parser.add_argument('--output', help='Имя выходного файла и листа Google Sheets')
+    parser.add_argument('--max-items', type=int, help='Максимальное количество видео на странице')
+    parser.add_argument('--until-date', help='Собирать видео не старше даты ГГГГ-ММ-ДД')
+    parser.add_argument('--workers', type=int, default=WORKER_COUNT, help='Количество браузеров для Video/Shorts')
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        default=INCREMENTAL_CHANNEL_VIDEO,
+        help='Собирать только новые видео каналов с момента прошлого запуска'
+    )
+    parser.add_argument(
+        '--snapshot',
+        action='store_true',
+        help='Сохранять HTML-снимки страниц и разбирать их локально, не опрашивая браузер по каждому полю'
+    )
+    parser.add_argument(
+        '--http',
+        action='store_true',
+        help='Собирать поиск и Video по HTTP без браузера, браузер - только для недостающих полей'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Продолжить прерванный запуск, пропустив уже обработанные видео и каналы'
+    )
+    parser.add_argument(
+        '--queue',
+        help='SQLite-файл общей очереди задач на диске, доступном всем машинам (распределённый режим). '
+             'Сетевой диск должен поддерживать блокировки файлов. '
+             f'{MEMORY_QUEUE} - очередь в памяти: заполнить, выполнить и выгрузить в одном процессе'
+    )
+    parser.add_argument(
+        '--queue-role',
+        choices=('coordinator', 'worker', 'export'),
+        default='worker',
+        help='coordinator - заполнить очередь из заданий, worker - выполнять задачи, export - выгрузить результаты'
+    )
+    return parser.parse_args()
+
+
+def get_job_specs(args):
+    job_specs = [load_job_spec(job_file) for job_file in args.job]
+    if args.mode:
+        job_specs.append(validate_job_spec({
+            'mode': args.mode,
+            'fields': args.fields,
+            'filters': args.filters,
+            'search_request': args.search_request,
+            'input': args.input,
+            'output': args.output,
+            'max_items': args.max_items,
+            'until_date': args.until_date,
+            'workers': args.workers,
+            'resume': args.resume,
+            'incremental': args.incremental,
+            'snapshot': args.snapshot,
+            'http': args.http,
+        }))
+    for job_spec in job_specs:
+        job_spec['resume'] = job_spec['resume'] or args.resume
+        job_spec['incremental'] = job_spec['incremental'] or args.incremental
+        job_spec['snapshot'] = job_spec['snapshot'] or args.snapshot
+        job_spec['http'] = job_spec['http'] or args.http
+    return job_specs
+
+
+def get_job_name(job_spec):
+    """
+    Name of the job's checkpoint journals: the output name, otherwise the input file name.
+    It does not change between runs of the same job, so --resume finds the journals again.
+    """
+    if job_spec['output']:
+        return job_spec['output']
+    if job_spec['input']:
+        return os.path.splitext(os.path.basename(job_spec['input']))[0]
+    return None
+
+
+def build_services(driver, workers, incremental, resume, snapshot=False, http=False, job_name=None):
+    video_cache = VideoInfoCache(VIDEO_CACHE_FILE) if VIDEO_CACHE_FILE else None
+    snapshot_dir = SNAPSHOT_DIR if snapshot else None
+    http_client = YoutubeHttpClient(HTTP_PROXY) if http else None
+    http_workers = HTTP_WORKER_COUNT if http else 0
+    async_fetcher = None
+    if http and HTTP_ASYNC:
+        async_fetcher = AsyncWatchPageFetcher(HTTP_CONCURRENCY, HTTP_RATE_LIMIT, proxy=HTTP_PROXY)
+
+    css_selectors = load_selectors('css_selectors.json')
+    search_filters = load_selectors('search_filters.json', 'xpath')
+    css_selectors.validate(driver)
+    search_filters.validate(driver)
+
+    channel_info_service = ChannelInfoService(driver, css_selectors, CREDENTIALS_FILE, SPREADSHEET_ID, resume, job_name)
+    channel_video_service = ChannelVideoService(
+        driver, css_selectors, CREDENTIALS_FILE, SPREADSHEET_ID, incremental, resume, snapshot_dir, job_name
+    )
+    channel_shorts_service = ChannelShortsService(
+        driver, css_selectors, CREDENTIALS_FILE, SPREADSHEET_ID, resume, snapshot_dir, job_name
+    )
+
+    return (
+        css_selectors,
+        SearchVideoService(
+            driver, css_selectors, search_filters, CREDENTIALS_FILE, SPREADSHEET_ID, snapshot_dir, http_client
+        ),
+        VideoInfoService(
+            driver,
+            css_selectors,
+            CREDENTIALS_FILE,
+            SPREADSHEET_ID,
+            workers,
+            video_cache,
+            resume,
+            snapshot_dir,
+            http_workers,
+            HTTP_PROXY,
+            async_fetcher
+        ),
+        ShortsInfoService(driver, css_selectors, CREDENTIALS_FILE, SPREADSHEET_ID, workers, video_cache, resume),
+        channel_info_service,
+        channel_video_service,
+        channel_shorts_service,
+        ChannelPipelineService(
+            driver,
+            css_selectors,
+            CREDENTIALS_FILE,
+            SPREADSHEET_ID,
+            channel_info_service,
+            channel_video_service,
+            channel_shorts_service,
+            workers,
+            resume,
+            job_name
+        )
+    )
+
+
+def setup_proxy_pool():
+    if not PROXY_FILE:
+        return
+    proxy_pool = ProxyPool(load_proxies(PROXY_FILE))
+    proxy_pool.check_all()
+    set_proxy_pool(proxy_pool)
+
+
+def start_browser_pool(workers, job_number=0):
+    """
+    Pre-launches one driver for the main scraper and one per worker.
 
-    css_selectors = load_json_file('css_selectors.json')
-    search_filters = load_json_file('search_filters.json')
+    Parallel jobs get separate profile directories, since Chrome locks a profile while it is open.
 
-    search_video_service = SearchVideoService(driver, css_selectors, search_filters, CREDENTIALS_FILE, SPREADSHEET_ID)
-    video_info_service = VideoInfoService(driver, css_selectors, CREDENTIALS_FILE, SPREADSHEET_ID)
-    shorts_info_service = ShortsInfoService(driver, css_selectors, CREDENTIALS_FILE, SPREADSHEET_ID)
-    channel_info_service = ChannelInfoService(driver, css_selectors, CREDENTIALS_FILE, SPREADSHEET_ID)
-    channel_video_service = ChannelVideoService(driver, css_selectors, CREDENTIALS_FILE, SPREADSHEET_ID)
-    channel_shorts_service = ChannelShortsService(driver, css_selectors, CREDENTIALS_FILE, SPREADSHEET_ID)
+    Returns:
+        tuple: The browser pool (None without BROWSER_PROFILE_DIR) and the driver of the main scraper.
+    """
+    if not BROWSER_PROFILE_DIR:
+        return None, setup_options_webdriver()
+    profile_root = os.path.join(BROWSER_PROFILE_DIR, f'job_{job_number}')
+    browser_pool = BrowserPool(workers + 1 if workers > 1 else 1, profile_root, BROWSER_MAX_PAGES).start()
+    set_browser_pool(browser_pool)
+    return browser_pool, browser_pool.acquire()
 
-    user_choice_handler = UserChoiceHandler(
+
+def save_run_report(job_number=None):
+    if not TIMING_REPORT_DIR:
+        return
+    suffix = f'_job{job_number}' if job_number is not None else ''
+    filepath = os.path.join(TIMING_REPORT_DIR, f'timings_{time.strftime("%Y%m%d_%H%M%S")}{suffix}.json')
+    try:
+        save_timing_report(filepath)
+    except OSError as e:
+        logging.error(f'Не удалось сохранить отчёт о времени выполнения: {e}.')
+
+
+def run_job(job_spec, job_number=0):
+    set_wait_timeout(WAIT_TIMEOUT)
+    set_resource_blocking(BLOCK_RESOURCES)
+    setup_proxy_pool()
+    browser_pool, driver = start_browser_pool(job_spec['workers'], job_number)
+
+    css_selectors, *services = build_services(
+        driver,
+        job_spec['workers'],
+        job_spec['incremental'],
+        job_spec['resume'],
+        job_spec['snapshot'],
+        job_spec['http'],
+        get_job_name(job_spec)
+    )
+    job_runner = JobRunner(driver, css_selectors, CREDENTIALS_FILE, SPREADSHEET_ID, *services)
+
+    try:
+        job_runner.run(job_spec)
+    finally:
+        job_runner.sheets_writer.flush()
+        job_runner.sheets_writer.save_pending(SHEETS_UNSENT_DIR)
+        if browser_pool is not None:
+            browser_pool.close()
+        else:
+            driver.quit()
+        save_run_report(job_number)
+
+
+def run_interactive(args):
+    set_wait_timeout(WAIT_TIMEOUT)
+    set_resource_blocking(BLOCK_RESOURCES)
+    setup_proxy_pool()
+    browser_pool, driver = start_browser_pool(args.workers)
+
+    css_selectors, *services = build_services(
+        driver, args.workers, args.incremental, args.resume, args.snapshot, args.http
+    )
+    user_choice_handler = UserChoiceHandler(driver, css_selectors, CREDENTIALS_FILE, SPREADSHEET_ID, *services)
+
+    try:
+        user_choice_handler.youtube_scraper_handler()
+    finally:
+        user_choice_handler.sheets_writer.flush()
+        user_choice_handler.sheets_writer.save_pending(SHEETS_UNSENT_DIR)
+        if browser_pool is not None:
+            browser_pool.close()
+        save_run_report()
+
+
+def run_queue(args, job_specs):
+    """
+    Distributed mode: the coordinator fills the queue from the job specs, workers on any number of machines
+    process it, and export writes the results of the same job specs once the queue is drained.
+
+    With --queue :memory: the queue is kept in memory and one process runs all three roles in turn,
+    a dry run of the distributed mode on a single machine.
+    """
+    if args.queue == MEMORY_QUEUE:
+        work_queue = MemoryWorkQueue(WORK_QUEUE_LEASE, WORK_QUEUE_MAX_ATTEMPTS)
+        roles = ('coordinator', 'worker', 'export')
+    else:
+        work_queue = SqliteWorkQueue(args.queue, WORK_QUEUE_LEASE, WORK_QUEUE_MAX_ATTEMPTS)
+        roles = (args.queue_role,)
+    try:
+        for role in roles:
+            run_queue_role(args, job_specs, work_queue, role)
+    finally:
+        work_queue.close()
+
+
+def run_queue_role(args, job_specs, work_queue, role):
+    if role == 'worker':
+        run_queue_worker(args, work_queue)
+        return
+
+    if not job_specs:
+        raise ValueError(f'Для роли {role} укажите задание через --job или --mode.')
+    queue_service = WorkQueueService(
+        None, load_selectors('css_selectors.json'), CREDENTIALS_FILE, SPREADSHEET_ID, None
+    )
+    for job_spec in job_specs:
+        if role == 'coordinator':
+            queue_service.fill_queue(work_queue, job_spec)
+        else:
+            queue_service.export_results(work_queue, job_spec)
+    queue_service.sheets_writer.flush()
+    queue_service.sheets_writer.save_pending(SHEETS_UNSENT_DIR)
+    logging.info(f'Состояние очереди {args.queue}: {work_queue.counts()}.')
+
+
+def run_queue_worker(args, work_queue):
+    set_wait_timeout(WAIT_TIMEOUT)
+    set_resource_blocking(BLOCK_RESOURCES)
+    setup_proxy_pool()
+    browser_pool, driver = start_browser_pool(args.workers)
+
+    css_selectors = load_selectors('css_selectors.json')
+    css_selectors.validate(driver)
+    channel_video_service = ChannelVideoService(
+        driver, css_selectors, CREDENTIALS_FILE, SPREADSHEET_ID, snapshot_dir=SNAPSHOT_DIR if args.snapshot else None
+    )
+    queue_service = WorkQueueService(
         driver,
         css_selectors,
         CREDENTIALS_FILE,
         SPREADSHEET_ID,
-        search_video_service,
-        video_info_service,
-        shorts_info_service,
-        channel_info_service,
         channel_video_service,
-        channel_shorts_service
+        args.workers,
+        VideoInfoCache(VIDEO_CACHE_FILE) if VIDEO_CACHE_FILE else None
     )
 
-    user_choice_handler.youtube_scraper_handler()
+    try:
+        queue_service.run_worker(work_queue, WORK_QUEUE_POLL_INTERVAL)
+    finally:
+        if browser_pool is not None:
+            browser_pool.close()
+        elif queue_service.driver is not None:
+            # The worker replaces the main driver after a failed task.
+            queue_service.driver.quit()
+        save_run_report()
+
+
+def main():
+    args = parse_args()
+    job_specs = get_job_specs(args)
+
+    if args.queue:
+        run_queue(args, job_specs)
+    elif not job_specs:
+        run_interactive(args)
+    elif len(job_specs) == 1:
+        run_job(job_specs[0])
+    else:
+        logging.info(f'Запускаю {len(job_specs)} заданий параллельно.')
+        processes = [
+            multiprocessing.Process(target=run_job, args=(job_spec, job_number))
+            for job_number, job_spec in enumerate(job_specs)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
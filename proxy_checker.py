@@ -1,15 +1,9 @@
-import requests
+from utils.proxy_pool_utils import check_proxy
 
 
 def proxy_checker(proxy):
-    try:
-        proxies = {
-            "http": f"socks5://{proxy}",
-            "https": f"socks5://{proxy}"
-        }
-        requests.get('https://www.google.com/intl/ru/account/about/', proxies=proxies, timeout=5)
+    if check_proxy(proxy, 'https://www.google.com/intl/ru/account/about/') is not None:
         print('Работает')
         return True
-    except:
-        print('Не работает')
-        return False
\ No newline at end of file
+    print('Не работает')
+    return False
@@ -1,15 +1,19 @@
 import logging
 import re
-import time
 from collections import OrderedDict
-from utils import element_utils, scroll_selenium_keys, get_functions_from_user
+from utils import element_utils, scroll_to_load_items, get_functions_from_user
+from utils.navigation_utils import iter_limited_items, limit_first_page_items
+from utils.html_parse_utils import parse_items, save_snapshot
+from utils.initial_data_utils import get_page_data, parse_search_items
+from utils.timing_utils import timed
 
 logger = logging.getLogger(__name__)
 
 class SearchVideoBase:
-    def __init__(self, driver, css_selectors):
+    def __init__(self, driver, css_selectors, snapshot_dir=None):
         self.driver = driver
         self.css_selectors = css_selectors
+        self.snapshot_dir = snapshot_dir
         self.logger = logging.getLogger(__name__)
 
     def _get_elements(self, selector_key, error_message):
@@ -21,10 +25,13 @@ class SearchVideoBase:
     def _get_element_attribute(self, element, selector_key, attribute, error_message):
         return element_utils.get_element_attribute(element, self.css_selectors, selector_key, attribute, error_message)
 
+    def _iter_elements_data(self, container_key, field_specs, error_message):
+        return element_utils.iter_elements_data(self.driver, self.css_selectors, container_key, field_specs, error_message)
+
 
 class SearchVideo(SearchVideoBase):
-    def __init__(self, driver, css_selectors):
-        super().__init__(driver, css_selectors)
+    def __init__(self, driver, css_selectors, snapshot_dir=None):
+        super().__init__(driver, css_selectors, snapshot_dir)
         self.search_video_functions = {
             'name': self.get_search_video_title,
             'url': self.get_search_video_url,
@@ -34,6 +41,15 @@ class SearchVideo(SearchVideoBase):
             'channel_url': self.get_search_video_channel_url,
             'preview': self.get_search_video_preview
         }
+        self.search_video_batch_fields = {
+            'name': ('search_video_title', None),
+            'url': ('search_video_url', 'href'),
+            'views': ('search_video_views', None),
+            'release_date': ('search_video_release_date', None),
+            'channel_name': ('search_video_channel_name', None),
+            'channel_url': ('search_video_channel_url', 'href'),
+            'preview': ('search_video_preview', 'src')
+        }
 
     def get_search_all_video_elements(self):
         return self._get_elements(
@@ -109,43 +125,100 @@ class SearchVideo(SearchVideoBase):
             error_message='Превью к видео не найдено.'
         )
 
-    def get_search_video_functions(self):
+    def get_available_info(self):
         available_info = list(self.search_video_functions.keys())
         available_info.append('type')
-        return get_functions_from_user('видео из поисковой выдачи', available_info)
-
-    def scraping_search_video(self, selected_search_video_functions):
-        scroll_selenium_keys(self.driver)
+        return available_info
 
+    def get_search_video_functions(self):
+        return get_functions_from_user('видео из поисковой выдачи', self.get_available_info())
+
+    def _build_search_info(self, element_data, selected_search_video_functions, video_element=None):
+        search_info = OrderedDict()
+        video_type = self._get_search_video_type(video_element, element_data)
+
+        for func_name in selected_search_video_functions:
+            if func_name == 'type':
+                search_info['type'] = video_type
+            elif func_name in self.search_video_functions:
+                if func_name in element_data:
+                    search_info[func_name] = element_data[func_name]
+                else:
+                    func = self.search_video_functions[func_name]
+                    with timed(f'field.{type(self).__name__}.{func_name}'):
+                        search_info[func_name] = func(video_element)
+            else:
+                self.logger.warning(f'Выбранная пользователем информация не соответствует словарю функций.')
+
+        return search_info
+
+    def _iter_search_video_batch(self, selected_search_video_functions):
+        field_names = {'url', 'release_date'}
+        field_names.update(name for name in selected_search_video_functions if name in self.search_video_batch_fields)
+        field_specs = {name: self.search_video_batch_fields[name] for name in field_names}
+
+        if self.snapshot_dir:
+            page_source = self.driver.page_source
+            save_snapshot(self.snapshot_dir, self.driver.current_url, page_source)
+            elements_data = parse_items(page_source, self.css_selectors, 'search_all_videos', field_specs)
+        else:
+            elements_data = self._iter_elements_data(
+                container_key='search_all_videos',
+                field_specs=field_specs,
+                error_message='Не удалось найти ни одного элемента видео.'
+            )
+        if elements_data is None:
+            return None
+
+        return (self._build_search_info(element_data, selected_search_video_functions) for element_data in elements_data)
+
+    def _iter_search_video_elements(self, selected_search_video_functions):
         video_elements = self.get_search_all_video_elements()
-        time.sleep(1)
 
-        search_data = []
         total_videos = len(video_elements)
         for video_number, video_element in enumerate(video_elements, 1):
             self.logger.info(f'\nОбработка видео {video_number} из {total_videos}...')
-            search_info = OrderedDict()
 
             element_data = {}
 
             element_data['url'] = self.get_search_video_url(video_element)
             element_data['release_date'] = self.get_search_video_release_date(video_element)
 
-            video_type = self._get_search_video_type(video_element, element_data)
-
-            for func_name in selected_search_video_functions:
-                if func_name == 'type':
-                    search_info['type'] = video_type
-                elif func_name in self.search_video_functions:
-                    if func_name in element_data:
-                        search_info[func_name] = element_data[func_name]
-                    else:
-                        func = self.search_video_functions[func_name]
-                        search_info[func_name] = func(video_element)
-                else:
-                    self.logger.warning(f'Выбранная пользователем информация не соответствует словарю функций.')
-
-            search_data.append(search_info)
-        return search_data
+            yield self._build_search_info(element_data, selected_search_video_functions, video_element)
+
+    def scraping_search_video(self, selected_search_video_functions, max_items=None, until_date=None):
+        return list(self.iter_search_video(selected_search_video_functions, max_items, until_date))
+
+    def _get_first_page_search_video(self, selected_search_video_functions, max_items=None, until_date=None):
+        search_items = limit_first_page_items(parse_search_items(get_page_data(self.driver)), max_items, until_date)
+        if search_items is None:
+            return None
+        return [self._build_search_info(item, selected_search_video_functions) for item in search_items]
+
+    def iter_search_video_http(self, client, search_request, selected_search_video_functions, max_items=None, until_date=None):
+        """
+        Collects search results over HTTP without a browser. Search filters are not supported in this mode.
+        """
+        search_items = iter_limited_items(client.iter_search_items(search_request), max_items, until_date)
+        for video_number, search_item in enumerate(search_items, 1):
+            self.logger.info(f'\nОбработка видео {video_number}...')
+            yield self._build_search_info(search_item, selected_search_video_functions)
+
+    def iter_search_video(self, selected_search_video_functions, max_items=None, until_date=None):
+        if not self.snapshot_dir:
+            first_page_data = self._get_first_page_search_video(selected_search_video_functions, max_items, until_date)
+            if first_page_data is not None:
+                self.logger.info('Все нужные видео найдены в ytInitialData первой страницы. Прокрутка не нужна.')
+                yield from first_page_data
+                return
+
+        scroll_to_load_items(
+            self.driver, self.css_selectors, 'search_all_videos', max_items, until_date, 'search_video_release_date'
+        )
 
+        search_data = self._iter_search_video_batch(selected_search_video_functions)
+        if search_data is None:
+            self.logger.warning('Пакетное извлечение не удалось. Перехожу к поэлементному сбору информации.')
+            search_data = self._iter_search_video_elements(selected_search_video_functions)
 
+        yield from iter_limited_items(search_data, max_items, until_date)
@@ -1,44 +1,112 @@
+import copy
 import logging
+import os
+import threading
 import time
+from itertools import islice, product
 from channel_info_scraper import ChannelInfo, ChannelVideo, ChannelShorts
 from search_info_scraper import SearchVideo
 from utils import search_request_input, load_json_file
 from utils.navigation_utils import click_element_css, sending_request, click_element_xpath
-from utils.file_utils import save_json_file
-from utils.string_utils import extract_channel_name
-from utils.google_sheets_utils import save_to_googlesheets
+from utils.file_utils import save_json_file, JsonLinesWriter, iter_jsonl_file
+from utils.string_utils import extract_channel_name, extract_video_id
+from utils.google_sheets_utils import get_sheets_writer
+from utils.state_utils import ChannelStateStore
+from utils.checkpoint_utils import CheckpointJournal, delay_keyboard_interrupt
 from utils.user_input_utils import channel_filter_input, search_filter_input
-from video_info_scraper import VideoInfo, ShortsInfo
+from utils.wait_utils import wait_for_selector, wait_for_refresh, get_current_elements, get_wait_timeout
+from utils.worker_pool_utils import iter_pool_results
+from utils.browser_pool_utils import get_driver_callbacks
+from utils.job_spec_utils import parse_until_date
+from utils.work_queue_utils import TASK_KINDS, get_worker_id, keep_lease
+from video_info_scraper import VideoInfo, ShortsInfo, is_failed_record
 
 logger = logging.getLogger(__name__)
 
 
 class BaseService:
-    def __init__(self, driver, css_selectors, credentials_file, spreadsheet_id):
+    def __init__(self, driver, css_selectors, credentials_file, spreadsheet_id, resume=False, job_name=None):
         self.driver = driver
         self.css_selectors = css_selectors
         self.credentials_file = credentials_file
         self.spreadsheet_id = spreadsheet_id
+        self.resume = resume
+        self.job_name = job_name
+        self.sheets_writer = get_sheets_writer(spreadsheet_id, credentials_file)
 
-    def channel_filter_click(self, filters):
-        if filters == '1':
-            click_element_css(self.driver, self.css_selectors, 'popular_filter')
-            time.sleep(1)
-        elif filters == '2':
-            click_element_css(self.driver, self.css_selectors, 'old_filter')
-            time.sleep(1)
+    def channel_filter_click(self, filters, items_key='channel_all_videos'):
+        filter_keys = {'1': 'popular_filter', '2': 'old_filter'}
+        if filters not in filter_keys:
+            return
+
+        old_elements = get_current_elements(self.driver, self.css_selectors, items_key)
+        # Without a click the list stays the same, and waiting for it to refresh would take the whole timeout.
+        if click_element_css(self.driver, self.css_selectors, filter_keys[filters]):
+            wait_for_refresh(self.driver, self.css_selectors, items_key, old_elements)
 
     def search_filter_click(self, search_filters, filter_names):
         for filter_name in filter_names:
+            old_elements = get_current_elements(self.driver, self.css_selectors, 'search_all_videos')
             click_element_css(self.driver, self.css_selectors, 'search_filters_button')
-            time.sleep(1)
-            click_element_xpath(self.driver, search_filters, filter_name)
-            time.sleep(0.5)
+            if click_element_xpath(self.driver, search_filters, filter_name, timeout=get_wait_timeout()):
+                wait_for_refresh(self.driver, self.css_selectors, 'search_all_videos', old_elements)
 
     def youtube_search(self, search_request):
         click_element_css(self.driver, self.css_selectors, 'search_bar_button')
         sending_request(self.driver, search_request)
 
+    def save_streamed_records(self, records, json_path, trailing_records=()):
+        jsonl_path = f'{os.path.splitext(json_path)[0]}.jsonl'
+        with JsonLinesWriter(jsonl_path, json_path) as sink:
+            sink.write_many(records)
+            new_count = sink.count
+            sink.write_many(trailing_records)
+        return jsonl_path, new_count
+
+    def save_streamed_output(self, records, json_path, sheet_name):
+        jsonl_path, count = self.save_streamed_records(records, json_path)
+        self.sheets_writer.queue_update_file(jsonl_path, sheet_name)
+        return count
+
+    def save_checkpointed_output(self, videos, records, json_path, sheet_name, journal):
+        """
+        Videos that could not be processed are not journaled, so --resume tries them again. They are listed
+        in {output}_failed.jsonl instead of the output.
+        """
+        jsonl_path = f'{os.path.splitext(json_path)[0]}.jsonl'
+        failed_path = f'{os.path.splitext(json_path)[0]}_failed.jsonl'
+        failed_videos = []
+        with JsonLinesWriter(jsonl_path, json_path, append=self.resume) as sink:
+            for video, record in zip(videos, records):
+                if is_failed_record(record):
+                    failed_videos.append({'url': video['url'], 'status': record['status']})
+                    continue
+                with delay_keyboard_interrupt():
+                    if record is not None:
+                        sink.write(record)
+                        sink.sync()
+                    journal.mark_done(video['url'])
+        self.sheets_writer.queue_update_file(jsonl_path, sheet_name)
+
+        if failed_videos:
+            with JsonLinesWriter(failed_path) as failed_sink:
+                failed_sink.write_many(failed_videos)
+            logger.warning(f'Не удалось обработать {len(failed_videos)} видео. Они перечислены в {failed_path} '
+                           f'и будут обработаны повторно при запуске с --resume.')
+        elif os.path.exists(failed_path):
+            os.remove(failed_path)
+        return sink.count
+
+    def get_checkpoint_journal(self, output_path):
+        return CheckpointJournal(f'{os.path.splitext(output_path)[0]}.checkpoint', self.resume)
+
+    def get_channel_journal(self, name):
+        """
+        Journal of processed channels. Jobs running in parallel get separate journals by job name.
+        """
+        prefix = f'{self.job_name}_' if self.job_name else ''
+        return self.get_checkpoint_journal(f'channel_scraper_output_data/{prefix}{name}')
+
 
 class UserChoiceHandler(BaseService):
     def __init__(
@@ -52,7 +120,8 @@ class UserChoiceHandler(BaseService):
             shorts_info_service,
             channel_info_service,
             channel_video_service,
-            channel_shorts_service
+            channel_shorts_service,
+            channel_pipeline_service
     ):
         super().__init__(
             driver,
@@ -67,6 +136,7 @@ class UserChoiceHandler(BaseService):
         self.channel_info_service = channel_info_service
         self.channel_video_service = channel_video_service
         self.channel_shorts_service = channel_shorts_service
+        self.channel_pipeline_service = channel_pipeline_service
 
     def youtube_scraper_handler(self):
         while True:
@@ -133,9 +203,9 @@ class UserChoiceHandler(BaseService):
                 selected_shorts_functions = self.channel_shorts_service.get_channel_shorts_functions()
                 filters = channel_filter_input()
 
-                self.channel_info_service.process_channel_info(channel_urls, selected_info_functions)
-                self.channel_video_service.process_channel_video(channel_urls, selected_video_functions, filters)
-                self.channel_shorts_service.process_channel_shorts(channel_urls, selected_shorts_functions, filters)
+                self.channel_pipeline_service.process_channels(
+                    channel_urls, selected_info_functions, selected_video_functions, selected_shorts_functions, filters
+                )
                 break
 
             else:
@@ -173,75 +243,357 @@ class UserChoiceHandler(BaseService):
 
 
 
+class JobRunner(BaseService):
+    """
+    Runs a job spec (see utils.job_spec_utils) without any user input.
+    """
+
+    def __init__(
+            self,
+            driver,
+            css_selectors,
+            credentials_file,
+            spreadsheet_id,
+            search_video_service,
+            video_info_service,
+            shorts_info_service,
+            channel_info_service,
+            channel_video_service,
+            channel_shorts_service,
+            channel_pipeline_service
+    ):
+        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id)
+
+        self.search_video_service = search_video_service
+        self.video_info_service = video_info_service
+        self.shorts_info_service = shorts_info_service
+        self.channel_info_service = channel_info_service
+        self.channel_video_service = channel_video_service
+        self.channel_shorts_service = channel_shorts_service
+        self.channel_pipeline_service = channel_pipeline_service
+
+    @staticmethod
+    def select_fields(spec, scraper):
+        available_info = scraper.get_available_info()
+        if not spec['fields']:
+            return available_info
+
+        unknown_fields = [field for field in spec['fields'] if field not in available_info]
+        if unknown_fields:
+            logger.warning(f'Поля {", ".join(unknown_fields)} недоступны и будут пропущены.')
+        return [field for field in spec['fields'] if field in available_info]
+
+    def run(self, spec):
+        mode = spec['mode']
+        logger.info(f'Запускаю задание в режиме {mode}.')
+
+        if mode == 'search':
+            self.run_search(spec)
+        elif mode in ('video_info', 'shorts_info', 'video_all'):
+            self.run_video(spec)
+        else:
+            self.run_channel(spec)
+
+    def run_search(self, spec):
+        unknown_filters = [
+            name for filter_names in spec['filter_combinations'] for name in filter_names
+            if name not in self.search_video_service.search_filters
+        ]
+        if unknown_filters:
+            raise ValueError(f'Неизвестные фильтры поиска: {", ".join(unknown_filters)}.')
+
+        selected_functions = self.select_fields(spec, self.search_video_service.search_video_scraper)
+        if len(spec['search_requests']) == 1 and len(spec['filter_combinations']) == 1:
+            self.search_video_service.get_search_video(
+                selected_functions,
+                spec['max_items'],
+                spec['until_date'],
+                spec['search_requests'][0],
+                spec['filter_combinations'][0],
+                spec['output']
+            )
+            return
+
+        output_name = spec['output'] or (
+            os.path.splitext(os.path.basename(spec['input']))[0] if spec['input'] else 'multi_search'
+        )
+        self.search_video_service.get_multi_search_video(
+            spec['search_requests'],
+            selected_functions,
+            spec['filter_combinations'],
+            spec['max_items'],
+            spec['until_date'],
+            output_name
+        )
+
+    def run_video(self, spec):
+        input_data = load_json_file(spec['input'])
+        output_name = spec['output'] or os.path.splitext(os.path.basename(spec['input']))[0]
+
+        if spec['mode'] in ('video_info', 'video_all'):
+            self.video_info_service.get_video_info(
+                input_data,
+                self.select_fields(spec, self.video_info_service.video_info_scraper),
+                f'{output_name}_video'
+            )
+        if spec['mode'] in ('shorts_info', 'video_all'):
+            self.shorts_info_service.get_shorts_info(
+                input_data,
+                self.select_fields(spec, self.shorts_info_service.shorts_info_scraper),
+                f'{output_name}_shorts'
+            )
+
+    def run_channel(self, spec):
+        channel_urls = load_json_file(spec['input'])
+        filters = spec['channel_filter']
+
+        if spec['mode'] == 'channel_all':
+            self.channel_pipeline_service.process_channels(
+                channel_urls,
+                self.select_fields(spec, self.channel_info_service.channel_info_scraper),
+                self.select_fields(spec, self.channel_video_service.channel_video_scraper),
+                self.select_fields(spec, self.channel_shorts_service.channel_shorts_scraper),
+                filters,
+                spec['max_items'],
+                spec['until_date']
+            )
+            return
+
+        if spec['mode'] == 'channel_info':
+            self.channel_info_service.process_channel_info(
+                channel_urls,
+                self.select_fields(spec, self.channel_info_service.channel_info_scraper)
+            )
+        if spec['mode'] == 'channel_video':
+            self.channel_video_service.process_channel_video(
+                channel_urls,
+                self.select_fields(spec, self.channel_video_service.channel_video_scraper),
+                filters,
+                spec['max_items'],
+                spec['until_date']
+            )
+        if spec['mode'] == 'channel_shorts':
+            self.channel_shorts_service.process_channel_shorts(
+                channel_urls,
+                self.select_fields(spec, self.channel_shorts_service.channel_shorts_scraper),
+                filters,
+                spec['max_items']
+            )
+
+
 class SearchVideoService(BaseService):
-    def __init__(self, driver, css_selectors, search_filters, credentials_file, spreadsheet_id):
+    def __init__(
+            self,
+            driver,
+            css_selectors,
+            search_filters,
+            credentials_file,
+            spreadsheet_id,
+            snapshot_dir=None,
+            http_client=None
+    ):
         super().__init__(driver, css_selectors, credentials_file, spreadsheet_id)
-        self.search_video_scraper = SearchVideo(driver, css_selectors)
+        self.search_video_scraper = SearchVideo(driver, css_selectors, snapshot_dir)
         self.search_filters = search_filters
+        self.http_client = http_client
 
     def get_search_video_functions(self):
         selected_search_video_functions = self.search_video_scraper.get_search_video_functions()
         return selected_search_video_functions
 
-    def get_search_video(self, selected_search_video_functions):
-        search_request = search_request_input()
+    def get_search_video(
+            self,
+            selected_search_video_functions,
+            max_items=None,
+            until_date=None,
+            search_request=None,
+            filter_names=None,
+            output_name=None
+    ):
+        if search_request is None:
+            search_request = search_request_input()
+        output_name = output_name or search_request
+        json_path = f'search_scraper_output_data/{output_name}.json'
+
+        if filter_names is None:
+            filter_names = search_filter_input(self.search_filters)
+
+        search_video_data = self.iter_search_video(
+            search_request, selected_search_video_functions, filter_names, max_items, until_date
+        )
+
+        self.save_streamed_output(search_video_data, json_path, output_name)
+        self.sheets_writer.flush()
+
+    def iter_search_video(self, search_request, selected_search_video_functions, filter_names, max_items=None, until_date=None):
+        """
+        Runs one search with the given filters and yields the found videos.
+        """
+        if self.http_client is not None:
+            if not filter_names:
+                return self.search_video_scraper.iter_search_video_http(
+                    self.http_client, search_request, selected_search_video_functions, max_items, until_date
+                )
+            logger.info('HTTP-режим не поддерживает фильтры поиска. Выполняю поиск в браузере.')
 
         self.driver.get('https://www.youtube.com')
-        time.sleep(1)
+        wait_for_selector(self.driver, self.css_selectors, 'search_bar_button')
 
         self.youtube_search(search_request)
-        time.sleep(1)
+        wait_for_selector(self.driver, self.css_selectors, 'search_all_videos')
 
-        filter_names = search_filter_input(self.search_filters)
         self.search_filter_click(self.search_filters, filter_names)
-        time.sleep(0.5)
 
-        search_video_data = self.search_video_scraper.scraping_search_video(selected_search_video_functions)
+        return self.search_video_scraper.iter_search_video(selected_search_video_functions, max_items, until_date)
 
-        save_json_file(search_video_data, f'search_scraper_output_data/{search_request}.json')
-        save_to_googlesheets(search_video_data, self.spreadsheet_id, search_request, self.credentials_file)
+    def get_multi_search_video(
+            self,
+            search_requests,
+            selected_search_video_functions,
+            filter_combinations=None,
+            max_items=None,
+            until_date=None,
+            output_name='multi_search'
+    ):
+        """
+        Runs every search request with every filter combination and saves each found video once, by its ID,
+        with the searches that found it in 'queries'. VideoInfoService run on the output then scrapes
+        every video once, however many overlapping searches returned it.
+
+        Returns:
+            int: Number of unique videos.
+        """
+        filter_combinations = filter_combinations or [[]]
+        if 'url' not in selected_search_video_functions:
+            logger.info('Для объединения результатов поиска добавляю ссылку на видео в собираемую информацию.')
+            selected_search_video_functions = ['url'] + list(selected_search_video_functions)
+
+        searches = list(product(search_requests, filter_combinations))
+        found_videos = {}
+        try:
+            for search_number, (search_request, filter_names) in enumerate(searches, 1):
+                search_label = search_request + (f' [{", ".join(filter_names)}]' if filter_names else '')
+                logger.info(f'Поиск {search_number} из {len(searches)}: {search_label}.')
+                try:
+                    new_count = self.collect_unique_videos(
+                        found_videos,
+                        search_label,
+                        self.iter_search_video(
+                            search_request, selected_search_video_functions, filter_names, max_items, until_date
+                        )
+                    )
+                except Exception as e:
+                    logger.error(f'Поиск {search_label} прерван: {e}.')
+                    continue
+                logger.info(f'Поиск {search_label}: новых видео {new_count}, всего уникальных {len(found_videos)}.')
+        finally:
+            # Videos of the finished searches are saved even if the run is interrupted.
+            video_count = self.save_multi_search_output(
+                found_videos.values(), f'search_scraper_output_data/{output_name}.json', output_name
+            )
+        self.sheets_writer.flush()
+        return video_count
+
+    @staticmethod
+    def collect_unique_videos(found_videos, search_label, search_video_data):
+        new_count = 0
+        for video in search_video_data:
+            video_id = extract_video_id(video.get('url')) or video.get('url')
+            if not video_id:
+                continue
+            found_video = found_videos.get(video_id)
+            if found_video is None:
+                video['queries'] = [search_label]
+                found_videos[video_id] = video
+                new_count += 1
+            elif search_label not in found_video['queries']:
+                found_video['queries'].append(search_label)
+        return new_count
+
+    def save_multi_search_output(self, videos, json_path, sheet_name):
+        jsonl_path, count = self.save_streamed_records(videos, json_path)
+        self.sheets_writer.queue_update_file(
+            jsonl_path, sheet_name, lambda video: {**video, 'queries': '; '.join(video['queries'])}
+        )
+        logger.info(f'Уникальных видео по всем поискам: {count}.')
+        return count
 
 
 class VideoInfoService(BaseService):
-    def __init__(self, driver, css_selectors, credentials_file, spreadsheet_id):
-        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id)
-        self.video_info_scraper = VideoInfo(driver, css_selectors)
+    def __init__(
+            self,
+            driver,
+            css_selectors,
+            credentials_file,
+            spreadsheet_id,
+            worker_count=1,
+            cache=None,
+            resume=False,
+            snapshot_dir=None,
+            http_workers=0,
+            http_proxy=None,
+            async_fetcher=None
+    ):
+        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id, resume)
+        self.worker_count = worker_count
+        self.video_info_scraper = VideoInfo(
+            driver, css_selectors, cache, snapshot_dir, http_workers, http_proxy, async_fetcher
+        )
 
     def get_video_info_functions(self):
         selected_video_info_functions = self.video_info_scraper.get_video_info_functions()
         return selected_video_info_functions
 
-    def get_video_info(self, input_data, selected_video_info_functions):
+    def get_video_info(self, input_data, selected_video_info_functions, output_name='league_of_legends_video'):
         filtered_data = [video for video in input_data if video.get('type') == 'Video']
 
-        video_data = self.video_info_scraper.scraping_video_info(filtered_data, selected_video_info_functions)
+        json_path = f'video_scraper_output_data/{output_name}.json'
+        with self.get_checkpoint_journal(json_path) as journal:
+            filtered_data = journal.filter_pending(filtered_data, lambda video: video['url'])
+
+            video_data = self.video_info_scraper.iter_video_info(
+                filtered_data, selected_video_info_functions, self.worker_count
+            )
 
-        save_json_file(video_data, 'video_scraper_output_data/league_of_legends_video.json')
-        save_to_googlesheets(video_data, self.spreadsheet_id, 'league_of_legends_video', self.credentials_file)
+            self.save_checkpointed_output(filtered_data, video_data, json_path, output_name, journal)
+        self.sheets_writer.flush()
 
 class ShortsInfoService(BaseService):
-    def __init__(self, driver, css_selectors, credentials_file, spreadsheet_id):
-        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id)
-        self.shorts_info_scraper = ShortsInfo(driver, css_selectors)
+    def __init__(self, driver, css_selectors, credentials_file, spreadsheet_id, worker_count=1, cache=None, resume=False):
+        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id, resume)
+        self.worker_count = worker_count
+        self.shorts_info_scraper = ShortsInfo(driver, css_selectors, cache)
 
     def get_shorts_info_functions(self):
         selected_shorts_info_functions = self.shorts_info_scraper.get_shorts_info_functions()
         return selected_shorts_info_functions
 
-    def get_shorts_info(self, input_data, selected_shorts_info_functions):
+    def get_shorts_info(self, input_data, selected_shorts_info_functions, output_name='league_of_legends_shorts'):
         filtered_data = [video for video in input_data if video.get('type') == 'Shorts']
 
-        shorts_data = self.shorts_info_scraper.scraping_shorts_info(filtered_data, selected_shorts_info_functions)
+        json_path = f'video_scraper_output_data/{output_name}.json'
+        with self.get_checkpoint_journal(json_path) as journal:
+            filtered_data = journal.filter_pending(filtered_data, lambda video: video['url'])
+
+            shorts_data = self.shorts_info_scraper.iter_shorts_info(
+                filtered_data, selected_shorts_info_functions, self.worker_count
+            )
 
-        save_json_file(shorts_data, 'video_scraper_output_data/league_of_legends_shorts.json')
-        save_to_googlesheets(shorts_data, self.spreadsheet_id, 'league_of_legends_shorts', self.credentials_file)
+            self.save_checkpointed_output(filtered_data, shorts_data, json_path, output_name, journal)
+        self.sheets_writer.flush()
 
 
 class ChannelInfoService(BaseService):
-    def __init__(self, driver, css_selectors, credentials_file, spreadsheet_id):
-        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id)
+    def __init__(self, driver, css_selectors, credentials_file, spreadsheet_id, resume=False, job_name=None):
+        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id, resume, job_name)
         self.channel_info_scraper = ChannelInfo(driver, css_selectors)
 
+    def with_driver(self, driver):
+        service = copy.copy(self)
+        service.driver = driver
+        service.channel_info_scraper = ChannelInfo(driver, self.css_selectors)
+        return service
+
     def get_channel_info_functions(self):
         selected_info_functions = self.channel_info_scraper.get_info_functions()
         return selected_info_functions
@@ -250,79 +602,515 @@ class ChannelInfoService(BaseService):
         channel_name = extract_channel_name(channel_url)
 
         self.driver.get(channel_url)
-        time.sleep(1)
+        wait_for_selector(self.driver, self.css_selectors, 'channel_full_name')
 
         channel_data = self.channel_info_scraper.scraping_channel_info(selected_info_functions)
 
         save_json_file(channel_data, f'channel_scraper_output_data/{channel_name}.json')
-        save_to_googlesheets([channel_data], self.spreadsheet_id, channel_name, self.credentials_file)
+        self.sheets_writer.queue_update([channel_data], channel_name)
 
         return channel_data
 
     def process_channel_info(self, channel_urls, selected_info_functions):
-        for channel_url in channel_urls:
-            self.get_channel_info(channel_url, selected_info_functions)
+        with self.get_channel_journal('channel_info') as journal:
+            for channel_url in journal.filter_pending(channel_urls, lambda url: url):
+                self.get_channel_info(channel_url, selected_info_functions)
+                journal.mark_done(channel_url)
+        self.sheets_writer.flush()
 
 class ChannelVideoService(BaseService):
-    def __init__(self, driver, css_selectors, credentials_file, spreadsheet_id):
-        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id)
-        self.channel_video_scraper = ChannelVideo(driver, css_selectors)
+    def __init__(
+            self,
+            driver,
+            css_selectors,
+            credentials_file,
+            spreadsheet_id,
+            incremental=False,
+            resume=False,
+            snapshot_dir=None,
+            job_name=None
+    ):
+        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id, resume, job_name)
+        self.channel_video_scraper = ChannelVideo(driver, css_selectors, snapshot_dir)
+        self.snapshot_dir = snapshot_dir
+        self.incremental = incremental
+        self.channel_state = ChannelStateStore() if incremental else None
+
+    def with_driver(self, driver):
+        """
+        Copy of the service working in another driver. The channel state store is shared.
+        """
+        service = copy.copy(self)
+        service.driver = driver
+        service.channel_video_scraper = ChannelVideo(driver, self.css_selectors, self.snapshot_dir)
+        return service
 
     def get_channel_video_functions(self):
         selected_video_functions = self.channel_video_scraper.get_video_functions()
         return selected_video_functions
 
-    def get_channel_video(self, channel_url, selected_video_functions, filters):
+    def get_channel_video(
+            self,
+            channel_url,
+            selected_video_functions,
+            filters,
+            max_items=None,
+            until_date=None,
+            load_page=True
+    ):
         channel_name = extract_channel_name(channel_url)
 
-        self.driver.get(channel_url)
-        time.sleep(1)
+        incremental = self.incremental
+        if incremental and filters:
+            logger.warning('Инкрементальный сбор доступен только для сортировки "New". Собираю все видео канала.')
+            incremental = False
+        if incremental and 'url' not in selected_video_functions:
+            logger.info('Для инкрементального сбора добавляю ссылку на видео в собираемую информацию.')
+            selected_video_functions = ['url'] + list(selected_video_functions)
+        last_seen_url = self.channel_state.get_last_seen(channel_name) if incremental else None
+
+        video_data = self.iter_channel_video(
+            channel_url, selected_video_functions, filters, max_items, until_date, last_seen_url, load_page
+        )
+        newest_video = {}
+        if incremental:
+            video_data = self.track_newest_video(video_data, newest_video)
+
+        json_path = f'channel_scraper_output_data/{channel_name}_video.json'
+        if incremental and last_seen_url:
+            video_count = self.save_new_channel_video(channel_name, video_data, json_path)
+        else:
+            video_count = self.save_streamed_output(video_data, json_path, f'{channel_name}_video')
+
+        # The newest video on the page, even if it was saved before, e.g. when the last seen one was deleted.
+        if newest_video.get('url'):
+            self.channel_state.set_last_seen(channel_name, newest_video['url'])
+
+        return video_count
+
+    @staticmethod
+    def track_newest_video(video_data, newest_video):
+        for video in video_data:
+            if not newest_video:
+                newest_video.update(video)
+            yield video
+
+    def iter_channel_video(
+            self,
+            channel_url,
+            selected_video_functions,
+            filters,
+            max_items=None,
+            until_date=None,
+            stop_url=None,
+            load_page=True
+    ):
+        """
+        Opens the Videos tab of the channel with the given sort filter and yields its videos.
+        """
+        if load_page:
+            self.driver.get(channel_url)
+        wait_for_selector(self.driver, self.css_selectors, 'channel_video_button')
 
         click_element_css(self.driver, self.css_selectors, 'channel_video_button')
-        time.sleep(0.5)
+        wait_for_selector(self.driver, self.css_selectors, 'channel_all_videos')
 
-        self.channel_filter_click(filters)
-        time.sleep(0.5)
+        self.channel_filter_click(filters, 'channel_all_videos')
 
-        video_data = self.channel_video_scraper.scraping_channel_videos(selected_video_functions)
-
-        save_json_file(video_data, f'channel_scraper_output_data/{channel_name}_video.json')
-        save_to_googlesheets(video_data, self.spreadsheet_id, f'{channel_name}_video', self.credentials_file)
-
-        return video_data
+        return self.channel_video_scraper.iter_channel_videos(
+            selected_video_functions, max_items, until_date, stop_url, use_page_data=not filters
+        )
 
-    def process_channel_video(self, channel_urls, selected_video_functions, filters):
-        for channel_url in channel_urls:
-            self.get_channel_video(channel_url, selected_video_functions, filters)
+    def save_new_channel_video(self, channel_name, new_video_data, json_path):
+        jsonl_path = f'{os.path.splitext(json_path)[0]}.jsonl'
+        previous_jsonl_path = f'{jsonl_path}.prev'
+        if os.path.exists(previous_jsonl_path):
+            # A previous run was interrupted after the rotation: its .jsonl is partial, the history is in .prev.
+            logger.warning(f'Восстанавливаю видео канала {channel_name} из {previous_jsonl_path} прерванного запуска.')
+        elif os.path.exists(jsonl_path):
+            os.replace(jsonl_path, previous_jsonl_path)
+
+        if os.path.exists(previous_jsonl_path):
+            previous_video_data = iter_jsonl_file(previous_jsonl_path)
+            previous_video_ids = {extract_video_id(video.get('url')) for video in iter_jsonl_file(previous_jsonl_path)}
+        elif os.path.exists(json_path):
+            previous_video_data = load_json_file(json_path)
+            previous_video_ids = {extract_video_id(video.get('url')) for video in previous_video_data}
+        else:
+            previous_video_data = []
+            previous_video_ids = set()
+        previous_video_ids.discard(None)
+
+        # If the last seen video was deleted or made private, the whole channel comes back as new.
+        skipped_urls = []
+        new_video_data = self.skip_saved_videos(new_video_data, previous_video_ids, skipped_urls)
+
+        jsonl_path, new_count = self.save_streamed_records(new_video_data, json_path, previous_video_data)
+        if os.path.exists(previous_jsonl_path):
+            os.remove(previous_jsonl_path)
+
+        if skipped_urls:
+            logger.warning(f'Пропущено {len(skipped_urls)} уже сохранённых видео канала {channel_name}.')
+        logger.info(f'Найдено {new_count} новых видео на канале {channel_name}.')
+        self.sheets_writer.queue_append(list(islice(iter_jsonl_file(jsonl_path), new_count)), f'{channel_name}_video')
+        return new_count
+
+    @staticmethod
+    def skip_saved_videos(video_data, saved_video_ids, skipped_urls):
+        for video in video_data:
+            if extract_video_id(video.get('url')) in saved_video_ids:
+                skipped_urls.append(video.get('url'))
+                continue
+            yield video
+
+    def process_channel_video(self, channel_urls, selected_video_functions, filters, max_items=None, until_date=None):
+        with self.get_channel_journal('channel_video') as journal:
+            for channel_url in journal.filter_pending(channel_urls, lambda url: url):
+                self.get_channel_video(channel_url, selected_video_functions, filters, max_items, until_date)
+                journal.mark_done(channel_url)
+        self.sheets_writer.flush()
 
 class ChannelShortsService(BaseService):
-    def __init__(self, driver, css_selectors, credentials_file, spreadsheet_id):
-        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id)
-        self.channel_shorts_scraper = ChannelShorts(driver, css_selectors)
+    def __init__(
+            self,
+            driver,
+            css_selectors,
+            credentials_file,
+            spreadsheet_id,
+            resume=False,
+            snapshot_dir=None,
+            job_name=None
+    ):
+        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id, resume, job_name)
+        self.channel_shorts_scraper = ChannelShorts(driver, css_selectors, snapshot_dir)
+        self.snapshot_dir = snapshot_dir
+
+    def with_driver(self, driver):
+        service = copy.copy(self)
+        service.driver = driver
+        service.channel_shorts_scraper = ChannelShorts(driver, self.css_selectors, self.snapshot_dir)
+        return service
 
     def get_channel_shorts_functions(self):
         selected_shorts_functions = self.channel_shorts_scraper.get_shorts_functions()
         return selected_shorts_functions
 
-    def get_channel_shorts(self, channel_url, selected_shorts_functions, filters):
+    def get_channel_shorts(self, channel_url, selected_shorts_functions, filters, max_items=None, load_page=True):
         channel_name = extract_channel_name(channel_url)
 
-        self.driver.get(channel_url)
-        time.sleep(1)
+        if load_page:
+            self.driver.get(channel_url)
+        wait_for_selector(self.driver, self.css_selectors, 'channel_shorts_button')
 
         click_element_css(self.driver, self.css_selectors, 'channel_shorts_button')
-        time.sleep(0.5)
+        wait_for_selector(self.driver, self.css_selectors, 'channel_all_shorts')
+
+        self.channel_filter_click(filters, 'channel_all_shorts')
+
+        shorts_data = self.channel_shorts_scraper.iter_channel_shorts(selected_shorts_functions, max_items)
+
+        return self.save_streamed_output(
+            shorts_data, f'channel_scraper_output_data/{channel_name}_shorts.json', f'{channel_name}_shorts'
+        )
+
+    def process_channel_shorts(self, channel_urls, selected_shorts_functions, filters, max_items=None):
+        with self.get_channel_journal('channel_shorts') as journal:
+            for channel_url in journal.filter_pending(channel_urls, lambda url: url):
+                self.get_channel_shorts(channel_url, selected_shorts_functions, filters, max_items)
+                journal.mark_done(channel_url)
+        self.sheets_writer.flush()
+
+
+class ChannelPipelineService(BaseService):
+    """
+    Collects About data, Videos and Shorts of every channel in one visit.
+
+    The channel page is loaded once, the Videos and Shorts tabs are opened from it in the same session.
+    With worker_count > 1 channels are spread across a pool of drivers.
+    """
+
+    def __init__(
+            self,
+            driver,
+            css_selectors,
+            credentials_file,
+            spreadsheet_id,
+            channel_info_service,
+            channel_video_service,
+            channel_shorts_service,
+            worker_count=1,
+            resume=False,
+            job_name=None
+    ):
+        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id, resume, job_name)
+        self.channel_info_service = channel_info_service
+        self.channel_video_service = channel_video_service
+        self.channel_shorts_service = channel_shorts_service
+        self.worker_count = worker_count
 
-        self.channel_filter_click(filters)
-        time.sleep(0.5)
+    def process_channel(
+            self,
+            services,
+            channel_url,
+            selected_info_functions,
+            selected_video_functions,
+            selected_shorts_functions,
+            filters,
+            max_items=None,
+            until_date=None
+    ):
+        channel_info_service, channel_video_service, channel_shorts_service = services
+        load_page = True
+        if selected_info_functions:
+            channel_info_service.get_channel_info(channel_url, selected_info_functions)
+            load_page = False
+        if selected_video_functions:
+            channel_video_service.get_channel_video(
+                channel_url, selected_video_functions, filters, max_items, until_date, load_page
+            )
+            load_page = False
+        if selected_shorts_functions:
+            channel_shorts_service.get_channel_shorts(
+                channel_url, selected_shorts_functions, filters, max_items, load_page
+            )
+        return channel_url
 
-        shorts_data = self.channel_shorts_scraper.scraping_channel_shorts(selected_shorts_functions)
+    def process_channels(
+            self,
+            channel_urls,
+            selected_info_functions,
+            selected_video_functions,
+            selected_shorts_functions,
+            filters,
+            max_items=None,
+            until_date=None
+    ):
+        def process(services, channel_url):
+            return self.process_channel(
+                services,
+                channel_url,
+                selected_info_functions,
+                selected_video_functions,
+                selected_shorts_functions,
+                filters,
+                max_items,
+                until_date
+            )
+
+        with self.get_channel_journal('channel_all') as journal:
+            pending_urls = journal.filter_pending(channel_urls, lambda url: url)
+
+            if self.worker_count > 1:
+                logger.info(f'Запускаю обработку {len(pending_urls)} каналов в {self.worker_count} драйверах.')
+
+                def processor_factory(driver):
+                    services = (
+                        self.channel_info_service.with_driver(driver),
+                        self.channel_video_service.with_driver(driver),
+                        self.channel_shorts_service.with_driver(driver)
+                    )
+                    return lambda channel_url: process(services, channel_url)
+
+                driver_factory, driver_closer, driver_checker = get_driver_callbacks()
+                results = iter_pool_results(
+                    pending_urls,
+                    processor_factory,
+                    driver_factory,
+                    self.worker_count,
+                    driver_closer,
+                    driver_checker=driver_checker
+                )
+            else:
+                services = (self.channel_info_service, self.channel_video_service, self.channel_shorts_service)
+                results = (process(services, channel_url) for channel_url in pending_urls)
+
+            for channel_url, result in zip(pending_urls, results):
+                if result is None:
+                    logger.error(f'Канал {channel_url} не обработан.')
+                    continue
+                journal.mark_done(channel_url)
+        self.sheets_writer.flush()
 
-        save_json_file(shorts_data, f'channel_scraper_output_data/{channel_name}_shorts.json')
-        save_to_googlesheets(shorts_data, self.spreadsheet_id, f'{channel_name}_shorts', self.credentials_file)
 
-        return shorts_data
+class WorkQueueService(BaseService):
+    """
+    Distributed mode over a shared work queue (see utils.work_queue_utils).
 
-    def process_channel_shorts(self, channel_urls, selected_shorts_functions, filters):
-        for channel_url in channel_urls:
-            self.get_channel_shorts(channel_url, selected_shorts_functions, filters)
\ No newline at end of file
+    The coordinator turns a job spec into tasks, workers on any number of machines lease them, run
+    the regular scrapers and store the results in the queue, and export writes the collected results
+    to JSON and Google Sheets like the single-process services do.
+    """
+
+    def __init__(
+            self,
+            driver,
+            css_selectors,
+            credentials_file,
+            spreadsheet_id,
+            channel_video_service,
+            worker_count=1,
+            cache=None
+    ):
+        super().__init__(driver, css_selectors, credentials_file, spreadsheet_id)
+        self.channel_video_service = channel_video_service
+        self.worker_count = worker_count
+        self.cache = cache
+
+    @staticmethod
+    def get_task_kinds(mode):
+        if mode == 'video_all':
+            return ['video_info', 'shorts_info']
+        if mode in TASK_KINDS:
+            return [mode]
+        raise ValueError(f'Режим {mode} не поддерживается очередью задач. '
+                         f'Доступные режимы: {", ".join(TASK_KINDS)}, video_all.')
+
+    def fill_queue(self, work_queue, spec):
+        kinds = self.get_task_kinds(spec['mode'])
+        input_data = load_json_file(spec['input'])
+        until_date = spec['until_date'].strftime('%Y-%m-%d') if spec['until_date'] else None
+
+        added = 0
+        for kind in kinds:
+            if kind == 'channel_video':
+                items = [
+                    (channel_url, {
+                        'url': channel_url,
+                        'fields': spec['fields'],
+                        'filters': spec['channel_filter'],
+                        'max_items': spec['max_items'],
+                        'until_date': until_date
+                    })
+                    for channel_url in input_data
+                ]
+            else:
+                video_type = 'Video' if kind == 'video_info' else 'Shorts'
+                items = [
+                    (video['url'], {'video': video, 'fields': spec['fields']})
+                    for video in input_data if video.get('type') == video_type
+                ]
+            kind_added = work_queue.put_many(kind, items)
+            logger.info(f'В очередь {kind} добавлено {kind_added} задач из {len(items)}.')
+            added += kind_added
+        return added
+
+    @staticmethod
+    def _select_fields(fields, scraper):
+        available_info = scraper.get_available_info()
+        return [field for field in fields if field in available_info] if fields else available_info
+
+    def _create_processor(self, driver):
+        video_info_scraper = VideoInfo(driver, self.css_selectors, self.cache)
+        shorts_info_scraper = ShortsInfo(driver, self.css_selectors, self.cache)
+        channel_video_service = self.channel_video_service.with_driver(driver)
+
+        def process(task):
+            payload = task.payload
+            if task.kind == 'video_info':
+                return video_info_scraper.scraping_single_video(
+                    payload['video'], self._select_fields(payload['fields'], video_info_scraper)
+                )
+            if task.kind == 'shorts_info':
+                return shorts_info_scraper.scraping_single_shorts(
+                    payload['video'], self._select_fields(payload['fields'], shorts_info_scraper)
+                )
+            return list(channel_video_service.iter_channel_video(
+                payload['url'],
+                self._select_fields(payload['fields'], channel_video_service.channel_video_scraper),
+                payload['filters'],
+                payload['max_items'],
+                parse_until_date(payload['until_date'])
+            ))
+
+        return process
+
+    @staticmethod
+    def _close_driver(driver, driver_closer, worker_id):
+        try:
+            driver_closer(driver)
+        except Exception as e:
+            logger.warning(f'{worker_id}: не удалось закрыть драйвер: {e}.')
+
+    def _run_worker_loop(self, work_queue, worker_id, driver_factory, driver_closer, poll_interval, use_main_driver=False):
+        """
+        Args:
+            use_main_driver(bool, optional): Work with self.driver. Its replacement after a failure is stored
+                in self.driver too, so the caller closes the current main driver.
+        """
+        driver = self.driver if use_main_driver else None
+        processor = self._create_processor(driver) if driver is not None else None
+        processed = 0
+        while True:
+            task = work_queue.lease(worker_id)
+            if task is None:
+                counts = work_queue.counts()
+                if not counts.get('pending') and not counts.get('leased'):
+                    break
+                # Leases of other workers may still expire and come back to the queue.
+                time.sleep(poll_interval)
+                continue
+
+            try:
+                if driver is None:
+                    driver = driver_factory()
+                    processor = self._create_processor(driver)
+                    if use_main_driver:
+                        self.driver = driver
+                with keep_lease(work_queue, task, worker_id):
+                    result = processor(task)
+                work_queue.complete(task, worker_id, result)
+                processed += 1
+            except Exception as e:
+                logger.error(f'{worker_id}: задача {task.kind} {task.key} не выполнена '
+                             f'(попытка {task.attempts}/{work_queue.max_attempts}): {e}.')
+                work_queue.fail(task, worker_id, e)
+                # Chrome may have crashed and would fail every later task, so the driver is restarted,
+                # the main one too.
+                if driver is not None:
+                    self._close_driver(driver, driver_closer, worker_id)
+                    driver, processor = None, None
+                    if use_main_driver:
+                        self.driver = None
+
+        if driver is not None and not use_main_driver:
+            self._close_driver(driver, driver_closer, worker_id)
+        logger.info(f'{worker_id}: очередь пуста, выполнено задач: {processed}.')
+
+    def run_worker(self, work_queue, poll_interval=5):
+        """
+        Leases and processes tasks until no pending or leased task is left in the queue.
+        """
+        driver_factory, driver_closer, _ = get_driver_callbacks()
+        driver_closer = driver_closer or (lambda driver: driver.quit())
+        worker_id = get_worker_id()
+        if self.worker_count <= 1:
+            self._run_worker_loop(work_queue, worker_id, driver_factory, driver_closer, poll_interval, True)
+            return
+
+        threads = [
+            threading.Thread(
+                target=self._run_worker_loop,
+                args=(work_queue, f'{worker_id}-{number}', driver_factory, driver_closer, poll_interval),
+                daemon=True
+            )
+            for number in range(1, self.worker_count + 1)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def export_results(self, work_queue, spec):
+        output_name = spec['output'] or os.path.splitext(os.path.basename(spec['input']))[0]
+        for kind in self.get_task_kinds(spec['mode']):
+            logger.info(f'Состояние очереди {kind}: {work_queue.counts(kind)}.')
+            if kind == 'channel_video':
+                for channel_url, _, video_data in work_queue.iter_results(kind):
+                    channel_name = extract_channel_name(channel_url)
+                    self.save_streamed_output(
+                        video_data, f'channel_scraper_output_data/{channel_name}_video.json', f'{channel_name}_video'
+                    )
+            else:
+                sheet_name = f'{output_name}_video' if kind == 'video_info' else f'{output_name}_shorts'
+                records = (result for _, _, result in work_queue.iter_results(kind) if result is not None)
+                self.save_streamed_output(records, f'video_scraper_output_data/{sheet_name}.json', sheet_name)
\ No newline at end of file
@@ -0,0 +1,113 @@
+import importlib.util
+import os
+import unittest
+
+# Loaded by path: the utils package imports selenium, work_queue_utils itself needs only the standard library.
+_spec = importlib.util.spec_from_file_location(
+    'work_queue_utils', os.path.join(os.path.dirname(__file__), os.pardir, 'utils', 'work_queue_utils.py')
+)
+work_queue_utils = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(work_queue_utils)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class MemoryWorkQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.queue = work_queue_utils.MemoryWorkQueue(lease_seconds=60, max_attempts=2, clock=self.clock)
+
+    def test_put_many_skips_known_keys(self):
+        self.assertEqual(self.queue.put_many('video_info', [('a', {'n': 1}), ('b', {'n': 2})]), 2)
+        self.assertEqual(self.queue.put_many('video_info', [('a', {'n': 3}), ('c', {'n': 4})]), 1)
+        self.assertEqual(self.queue.put_many('shorts_info', [('a', {'n': 5})]), 1)
+        self.assertEqual(self.queue.counts(), {'pending': 4})
+        self.assertEqual(self.queue.counts('video_info'), {'pending': 3})
+
+    def test_lease_hands_out_each_task_once(self):
+        self.queue.put_many('video_info', [('a', {'n': 1}), ('b', {'n': 2})])
+
+        first = self.queue.lease('worker-1')
+        second = self.queue.lease('worker-2')
+        self.assertEqual((first.key, first.payload, first.attempts), ('a', {'n': 1}, 1))
+        self.assertEqual(second.key, 'b')
+        self.assertIsNone(self.queue.lease('worker-3'))
+        self.assertEqual(self.queue.counts(), {'leased': 2})
+
+    def test_expired_lease_goes_to_another_worker(self):
+        self.queue.put_many('video_info', [('a', {})])
+        task = self.queue.lease('worker-1')
+
+        self.clock.advance(59)
+        self.assertIsNone(self.queue.lease('worker-2'))
+        self.clock.advance(2)
+        retried = self.queue.lease('worker-2')
+
+        self.assertEqual((retried.id, retried.attempts), (task.id, 2))
+        self.assertFalse(self.queue.complete(task, 'worker-1', {'late': True}))
+        self.assertFalse(self.queue.renew(task, 'worker-1'))
+        self.assertTrue(self.queue.complete(retried, 'worker-2', {'ok': True}))
+        self.assertEqual(list(self.queue.iter_results('video_info')), [('a', {}, {'ok': True})])
+
+    def test_renew_extends_lease(self):
+        self.queue.put_many('video_info', [('a', {})])
+        task = self.queue.lease('worker-1')
+
+        self.clock.advance(50)
+        self.assertTrue(self.queue.renew(task, 'worker-1'))
+        self.clock.advance(50)
+        self.assertIsNone(self.queue.lease('worker-2'))
+
+    def test_lease_expired_after_last_attempt_fails_task(self):
+        self.queue.put_many('video_info', [('a', {})])
+        self.queue.lease('worker-1')
+        self.clock.advance(61)
+        self.queue.lease('worker-2')
+        self.clock.advance(61)
+
+        self.assertIsNone(self.queue.lease('worker-3'))
+        self.assertEqual(self.queue.counts(), {'failed': 1})
+        self.assertEqual(self.queue.tasks[1]['error'], 'lease expired')
+
+    def test_fail_requeues_until_max_attempts(self):
+        self.queue.put_many('video_info', [('a', {})])
+
+        task = self.queue.lease('worker-1')
+        self.assertTrue(self.queue.fail(task, 'worker-1', RuntimeError('crashed')))
+        self.assertEqual(self.queue.counts(), {'pending': 1})
+
+        task = self.queue.lease('worker-1')
+        self.assertEqual(task.attempts, 2)
+        self.assertTrue(self.queue.fail(task, 'worker-1', RuntimeError('crashed again')))
+        self.assertEqual(self.queue.counts(), {'failed': 1})
+        self.assertEqual(self.queue.tasks[task.id]['error'], 'crashed again')
+        self.assertIsNone(self.queue.lease('worker-1'))
+
+    def test_complete_keeps_results_in_insertion_order(self):
+        self.queue.put_many('video_info', [('a', {'n': 1}), ('b', {'n': 2})])
+        first = self.queue.lease('worker-1')
+        second = self.queue.lease('worker-1')
+
+        self.assertTrue(self.queue.complete(second, 'worker-1', {'title': 'B'}))
+        self.assertTrue(self.queue.complete(first, 'worker-1', {'title': 'A'}))
+        self.assertFalse(self.queue.complete(first, 'worker-1', {'title': 'again'}))
+
+        self.assertEqual(self.queue.counts(), {'done': 2})
+        self.assertEqual(
+            list(self.queue.iter_results('video_info')),
+            [('a', {'n': 1}, {'title': 'A'}), ('b', {'n': 2}, {'title': 'B'})]
+        )
+        self.assertEqual(list(self.queue.iter_results('shorts_info')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,21 @@
-from .element_utils import get_elements, get_element_text, get_element_attribute
-from .file_utils import save_csv_file, save_json_file, load_json_file
-from .google_sheets_utils import save_to_googlesheets
-from .navigation_utils import click_element_css, click_element_xpath, scroll_selenium_keys, sending_request
-from .string_utils import extract_channel_name
+from .element_utils import get_elements, get_element_text, get_element_attribute, get_elements_data, iter_elements_data, \
+    probe_page_state
+from .file_utils import save_csv_file, save_json_file, load_json_file, JsonLinesWriter, iter_jsonl_file
+from .google_sheets_utils import GoogleSheetsWriter, get_sheets_writer, save_to_googlesheets, append_to_googlesheets
+from .navigation_utils import click_element_css, click_element_xpath, scroll_selenium_keys, scroll_to_load_items, sending_request
+from .string_utils import extract_channel_name, extract_video_id, parse_relative_date, parse_video_likes
 from .user_input_utils import get_functions_from_user, channel_filter_input, search_request_input
-from .webdriver_utils import setup_options_webdriver
\ No newline at end of file
+from .webdriver_utils import setup_options_webdriver
+from .worker_pool_utils import iter_pool_results
+from .wait_utils import wait_for_selector, wait_for_refresh, set_wait_timeout
+from .cache_utils import VideoInfoCache
+from .job_spec_utils import load_job_spec, validate_job_spec
+from .html_parse_utils import parse_page, parse_items, iter_snapshot_dir, SnapshotParser
+from .initial_data_utils import parse_watch_data, parse_search_items, parse_channel_video_items
+from .http_fetch_utils import YoutubeHttpClient
+from .async_fetch_utils import AsyncWatchPageFetcher, TokenBucket
+from .proxy_pool_utils import ProxyPool, check_proxy, load_proxies, set_proxy_pool
+from .browser_pool_utils import BrowserPool, set_browser_pool
+from .timing_utils import timed, timed_function, get_timing_summary, save_timing_report
+from .selector_utils import SelectorRegistry, load_selectors
+from .work_queue_utils import SqliteWorkQueue, MemoryWorkQueue
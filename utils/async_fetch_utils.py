@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import queue
+import random
+import threading
+from urllib.parse import urlsplit
+from utils.http_fetch_utils import USER_AGENT, RETRY_STATUSES, INITIAL_DATA_PATTERN, PLAYER_RESPONSE_PATTERN, \
+    extract_json_object, extract_ytcfg
+from utils.initial_data_utils import YOUTUBE_URL, parse_watch_data, get_comment_count, get_comments_continuation, \
+    parse_comments_header
+from utils.string_utils import extract_video_id
+from utils.timing_utils import timed
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class TokenBucket:
+    """
+    Allows rate requests per second on average with bursts up to capacity.
+
+    pause() stops all requests through the bucket, e.g. after the host answered 429.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = None
+        self.paused_until = 0
+        self.lock = None
+
+    async def acquire(self):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            while True:
+                now = loop.time()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if self.updated_at is not None:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        loop = asyncio.get_running_loop()
+        self.paused_until = max(self.paused_until, loop.time() + seconds)
+
+
+class AsyncWatchPageFetcher:
+    """
+    Downloads watch pages with asyncio and parses their ytInitialData into Video fields.
+
+    At most concurrency requests are in flight, every host has its own token bucket of rate
+    requests per second. 429 pauses the host bucket for Retry-After or an exponential backoff.
+
+    Args:
+        concurrency(int, optional): Maximum number of simultaneous requests.
+        rate(float, optional): Requests per second per host.
+        burst(int, optional): Token bucket capacity. Defaults to rate.
+        max_retries(int, optional): Retries of a request after 429/5xx or a network error.
+        proxy(str, optional): SOCKS5 "host:port", needs aiohttp_socks.
+        timeout(float, optional): Total timeout of one request, s.
+    """
+
+    def __init__(self, concurrency=100, rate=20, burst=None, max_retries=5, proxy=None, timeout=15):
+        if aiohttp is None:
+            raise ImportError('Для асинхронной загрузки страниц установите aiohttp: pip install aiohttp')
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.proxy = proxy
+        self.timeout = timeout
+        self.buckets = {}
+
+    def _get_bucket(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return self.buckets[host]
+
+    def _create_connector(self):
+        if not self.proxy:
+            return aiohttp.TCPConnector(limit=self.concurrency)
+        try:
+            from aiohttp_socks import ProxyConnector
+        except ImportError:
+            raise ImportError('Для SOCKS5-прокси в асинхронном режиме установите aiohttp_socks: pip install aiohttp_socks')
+        return ProxyConnector.from_url(f'socks5://{self.proxy}', limit=self.concurrency)
+
+    def _create_session(self):
+        return aiohttp.ClientSession(
+            connector=self._create_connector(),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'User-Agent': USER_AGENT, 'Accept-Language': 'ru-RU,ru;q=0.9', 'Accept-Encoding': 'gzip, deflate'},
+            cookies={'SOCS': 'CAI'}
+        )
+
+    async def _request(self, session, semaphore, method, url, as_json=False, **kwargs):
+        bucket = self._get_bucket(url)
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            try:
+                async with semaphore:
+                    async with session.request(method, url, **kwargs) as response:
+                        if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                            retry_after = response.headers.get('Retry-After', '')
+                            delay = float(retry_after) if retry_after.isdigit() else min(2 ** attempt, 60) + random.random()
+                            if response.status == 429:
+                                bucket.pause(delay)
+                            logger.warning(f'{url} вернул {response.status}. Повтор через {delay:.1f} с '
+                                           f'(попытка {attempt + 1}/{self.max_retries}).')
+                            await asyncio.sleep(delay)
+                            continue
+                        response.raise_for_status()
+                        return await response.json() if as_json else await response.text()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(2 ** attempt, 60) + random.random()
+                logger.warning(f'Ошибка сети при загрузке {url}: {e}. Повтор через {delay:.1f} с.')
+                await asyncio.sleep(delay)
+
+    async def fetch_watch_data(self, session, semaphore, video_url):
+        """
+        Returns:
+            tuple[dict, dict, dict]: ytInitialData, ytInitialPlayerResponse and ytcfg of the watch page.
+        """
+        # Includes the time spent waiting for the rate limit and the concurrency cap.
+        with timed('http.async_watch_page'):
+            html = await self._request(session, semaphore, 'GET', video_url)
+        return (
+            extract_json_object(html, INITIAL_DATA_PATTERN) or {},
+            extract_json_object(html, PLAYER_RESPONSE_PATTERN) or {},
+            extract_ytcfg(html)
+        )
+
+    async def fetch_video_info(self, session, semaphore, video_url, fields=None):
+        initial_data, player_response, ytcfg = await self.fetch_watch_data(session, semaphore, video_url)
+        video_info = parse_watch_data(initial_data, player_response, extract_video_id(video_url))
+        if 'status' in video_info:
+            return video_info
+
+        if (fields is None or 'comments' in fields) and 'comments' not in video_info:
+            comment_count = get_comment_count(initial_data)
+            continuation = get_comments_continuation(initial_data)
+            if not comment_count and continuation and ytcfg.get('INNERTUBE_API_KEY'):
+                response = await self._request(
+                    session,
+                    semaphore,
+                    'POST',
+                    f'{YOUTUBE_URL}/youtubei/v1/next',
+                    as_json=True,
+                    params={'key': ytcfg['INNERTUBE_API_KEY'], 'prettyPrint': 'false'},
+                    json={'context': ytcfg.get('INNERTUBE_CONTEXT'), 'continuation': continuation}
+                )
+                comment_count = parse_comments_header(response.get('onResponseReceivedEndpoints', []))
+            if comment_count:
+                video_info['comments'] = comment_count
+
+        if fields is not None:
+            video_info = {name: value for name, value in video_info.items() if name in fields}
+        return video_info
+
+    async def _fetch_all(self, video_urls, fields, results):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch_one(index, video_url):
+            try:
+                results.put((index, await self.fetch_video_info(session, semaphore, video_url, fields)))
+            except Exception as e:
+                logger.error(f'Не удалось загрузить {video_url}: {e}.')
+                results.put((index, None))
+
+        async with self._create_session() as session:
+            await asyncio.gather(*(fetch_one(index, video_url) for index, video_url in enumerate(video_urls)))
+
+    def iter_video_info(self, video_urls, fields=None):
+        """
+        Fetches all pages in a background event loop and yields Video fields in input order.
+
+        Yields:
+            dict | None: Fields found in the page, {'status': ...}, or None if the page could not be loaded.
+        """
+        if not video_urls:
+            return
+
+        results = queue.Queue()
+
+        def run_event_loop():
+            try:
+                asyncio.run(self._fetch_all(video_urls, fields, results))
+            except Exception as e:
+                logger.error(f'Асинхронная загрузка страниц прервана: {e}.')
+            finally:
+                results.put(_DONE)
+
+        thread = threading.Thread(target=run_event_loop, daemon=True)
+        thread.start()
+        logger.info(f'Загружаю {len(video_urls)} страниц видео: до {self.concurrency} запросов одновременно, '
+                    f'{self.rate} запросов/с.')
+
+        pending = {}
+        next_index = 0
+        while next_index < len(video_urls):
+            result = results.get()
+            if result is _DONE:
+                break
+            index, video_info = result
+            pending[index] = video_info
+            while next_index in pending:
+                yield pending.pop(next_index)
+                next_index += 1
+
+        # Pages lost to an interrupted event loop are reported as failed.
+        for index in range(next_index, len(video_urls)):
+            yield pending.pop(index, None)
+        thread.join()
@@ -0,0 +1,171 @@
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.webdriver_utils import setup_options_webdriver, prepare_driver_executable, DRIVER_EXECUTABLE_NAME
+from utils.proxy_pool_utils import release_pool_proxy, is_pool_proxy_healthy
+
+logger = logging.getLogger(__name__)
+
+SHARED_DRIVER_DIR = 'chromedriver_cache'  # chromedriver of the workers started without a browser pool
+
+
+class BrowserPool:
+    """
+    Keeps Chrome drivers warm and hands them out to workers.
+
+    chromedriver is patched once for the whole pool. Every driver gets its own persistent profile
+    under profile_root, so the HTTP cache and cookies survive between runs. A driver is recycled
+    after max_pages page loads, when it stops responding or when its proxy is rotated out.
+    """
+
+    def __init__(self, size, profile_root='browser_profiles', max_pages=200):
+        self.size = size
+        self.profile_root = profile_root
+        self.max_pages = max_pages
+        self.driver_executable_path = None
+        self.idle = queue.LifoQueue()
+        self.drivers = set()
+        self.profiles_in_use = set()
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def start(self):
+        self.driver_executable_path = prepare_driver_executable(os.path.join(self.profile_root, DRIVER_EXECUTABLE_NAME))
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            drivers = list(executor.map(lambda _: self._try_launch(), range(self.size)))
+        for driver in drivers:
+            if driver is not None:
+                self.idle.put(driver)
+        logger.info(f'Пул браузеров запущен: {self.idle.qsize()} из {self.size} драйверов.')
+        return self
+
+    def _take_profile(self):
+        with self.lock:
+            profile_number = next(number for number in range(len(self.profiles_in_use) + 1)
+                                  if number not in self.profiles_in_use)
+            self.profiles_in_use.add(profile_number)
+        return profile_number
+
+    def _free_profile(self, profile_number):
+        with self.lock:
+            self.profiles_in_use.discard(profile_number)
+
+    def _launch(self):
+        profile_number = self._take_profile()
+        try:
+            driver = setup_options_webdriver(
+                profile_dir=os.path.join(self.profile_root, f'profile_{profile_number}'),
+                driver_executable_path=self.driver_executable_path
+            )
+        except Exception:
+            self._free_profile(profile_number)
+            raise
+
+        driver.pool_profile = profile_number
+        driver.pages_loaded = 0
+        load_page = driver.get
+
+        def counting_get(url):
+            driver.pages_loaded += 1
+            return load_page(url)
+
+        driver.get = counting_get
+        with self.lock:
+            self.drivers.add(driver)
+        return driver
+
+    def _try_launch(self):
+        try:
+            return self._launch()
+        except Exception as e:
+            logger.error(f'Не удалось запустить драйвер для пула браузеров: {e}.')
+            return None
+
+    def is_healthy(self, driver):
+        if driver.pages_loaded >= self.max_pages:
+            logger.info(f'Драйвер загрузил {driver.pages_loaded} страниц. Перезапускаю его.')
+            return False
+        if not is_pool_proxy_healthy(getattr(driver, 'pool_proxy', None)):
+            return False
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                return self._launch()
+            if self.is_healthy(driver):
+                return driver
+            self._quit(driver)
+
+    def release(self, driver):
+        if self.closed or not self.is_healthy(driver):
+            self._quit(driver)
+        else:
+            self.idle.put(driver)
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f'Не удалось корректно закрыть драйвер: {e}.')
+        release_pool_proxy(getattr(driver, 'pool_proxy', None))
+        self._free_profile(driver.pool_profile)
+        with self.lock:
+            self.drivers.discard(driver)
+
+    def close(self):
+        self.closed = True
+        with self.lock:
+            drivers = list(self.drivers)
+        for driver in drivers:
+            self._quit(driver)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+_browser_pool = None
+_shared_driver_path = None
+_shared_driver_lock = threading.Lock()
+
+
+def set_browser_pool(browser_pool):
+    global _browser_pool
+    _browser_pool = browser_pool
+
+
+def get_browser_pool():
+    return _browser_pool
+
+
+def create_shared_driver():
+    """
+    Starts a driver with the chromedriver shared by all workers. uc would otherwise download and patch
+    its default chromedriver in every worker at once, and the parallel writes to one file race.
+    """
+    global _shared_driver_path
+    with _shared_driver_lock:
+        if _shared_driver_path is None:
+            _shared_driver_path = prepare_driver_executable(os.path.join(SHARED_DRIVER_DIR, DRIVER_EXECUTABLE_NAME))
+    return setup_options_webdriver(driver_executable_path=_shared_driver_path)
+
+
+def get_driver_callbacks():
+    """
+    Returns driver_factory, driver_closer and driver_checker for iter_pool_results:
+    the browser pool when it is set, otherwise a new driver per worker.
+    """
+    if _browser_pool is not None:
+        return _browser_pool.acquire, _browser_pool.release, _browser_pool.is_healthy
+    return create_shared_driver, None, None
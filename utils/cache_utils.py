@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+DEFAULT_FIELD_TTLS = {
+    'name': 7 * DAY,
+    'description': 7 * DAY,
+    'channel': 7 * DAY,
+    'release_date': 30 * DAY,
+    'views': 6 * HOUR,
+    'likes': 6 * HOUR,
+    'comments': 6 * HOUR,
+}
+DEFAULT_TTL = DAY
+
+
+class VideoInfoCache:
+    """
+    SQLite cache of collected video fields keyed by video ID and field name.
+
+    Every field has its own TTL, and the least recently used entries are evicted above max_entries.
+    """
+
+    def __init__(self, db_path='video_scraper_cache/video_info_cache.sqlite3', field_ttls=None, max_entries=500_000):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.field_ttls = {**DEFAULT_FIELD_TTLS, **(field_ttls or {})}
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS video_cache ('
+            'video_id TEXT NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL, '
+            'fetched_at REAL NOT NULL, accessed_at REAL NOT NULL, '
+            'PRIMARY KEY (video_id, field))'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS video_cache_accessed_at ON video_cache (accessed_at)')
+        self.connection.commit()
+        self.entries = self.connection.execute('SELECT COUNT(*) FROM video_cache').fetchone()[0]
+        logger.info(f'Кэш видео {db_path} открыт, записей: {self.entries}.')
+
+    def get_ttl(self, field):
+        return self.field_ttls.get(field, DEFAULT_TTL)
+
+    def get_fresh(self, video_id, fields):
+        """
+        Returns cached values of the given fields that have not outlived their TTL.
+
+        Returns:
+            dict: Field name -> cached value. Missing and expired fields are absent.
+        """
+        fields = list(fields)
+        if not fields:
+            return {}
+
+        now = time.time()
+        placeholders = ', '.join('?' for _ in fields)
+        with self.lock:
+            rows = self.connection.execute(
+                f'SELECT field, value, fetched_at FROM video_cache WHERE video_id = ? AND field IN ({placeholders})',
+                [video_id, *fields]
+            ).fetchall()
+
+            fresh = {
+                field: json.loads(value)
+                for field, value, fetched_at in rows
+                if now - fetched_at < self.get_ttl(field)
+            }
+            if fresh:
+                self.connection.executemany(
+                    'UPDATE video_cache SET accessed_at = ? WHERE video_id = ? AND field = ?',
+                    [(now, video_id, field) for field in fresh]
+                )
+                self.connection.commit()
+        return fresh
+
+    def put(self, video_id, values):
+        values = {field: value for field, value in values.items() if value}
+        if not values:
+            return
+
+        now = time.time()
+        with self.lock:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                'INSERT INTO video_cache (video_id, field, value, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (video_id, field) DO UPDATE SET '
+                'value = excluded.value, fetched_at = excluded.fetched_at, accessed_at = excluded.accessed_at',
+                [(video_id, field, json.dumps(value, ensure_ascii=False), now, now) for field, value in values.items()]
+            )
+            self.entries += self.connection.total_changes - before
+            self._evict()
+            self.connection.commit()
+
+    def _evict(self):
+        # total_changes also counts updated rows, so the counter is re-synced before evicting.
+        if self.entries <= self.max_entries:
+            return
+        self.entries = self.connection.execute('SELECT COUNT(*) FROM video_cache').fetchone()[0]
+        excess = self.entries - self.max_entries
+        if excess <= 0:
+            return
+        self.connection.execute(
+            'DELETE FROM video_cache WHERE rowid IN '
+            '(SELECT rowid FROM video_cache ORDER BY accessed_at LIMIT ?)',
+            (excess,)
+        )
+        self.entries -= excess
+        logger.info(f'Из кэша видео удалено {excess} давно не использованных записей.')
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,84 @@
+import logging
+import os
+import signal
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def delay_keyboard_interrupt():
+    """
+    Postpones Ctrl-C until the block is finished, so a save in progress is never left half-written.
+
+    Outside the main thread signal handlers cannot be replaced, and the block runs unprotected.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    received = []
+
+    def handler(signum, frame):
+        received.append(signum)
+        logger.warning('Получен Ctrl-C во время сохранения. Прерываю работу после завершения сохранения.')
+
+    previous_handler = signal.signal(signal.SIGINT, handler)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        if received:
+            raise KeyboardInterrupt
+
+
+class CheckpointJournal:
+    """
+    Append-only journal of completed URLs or channel handles.
+
+    Without resume the journal is cleared and the run starts from the first input record.
+    """
+
+    def __init__(self, journal_path, resume=False):
+        journal_dir = os.path.dirname(journal_path)
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+        self.journal_path = journal_path
+        self.completed = self._load() if resume else set()
+        self.file = open(journal_path, 'a' if resume else 'w', encoding='utf-8')
+        if resume:
+            logger.info(f'Продолжаю прерванный запуск: уже обработано {len(self.completed)} элементов ({journal_path}).')
+
+    def _load(self):
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                return {line.rstrip('\n') for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    def is_done(self, key):
+        return key in self.completed
+
+    def filter_pending(self, items, key_getter):
+        pending = [item for item in items if not self.is_done(key_getter(item))]
+        skipped = len(items) - len(pending)
+        if skipped:
+            logger.info(f'Пропускаю {skipped} уже обработанных элементов.')
+        return pending
+
+    def mark_done(self, key):
+        self.file.write(f'{key}\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.completed.add(key)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
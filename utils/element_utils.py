@@ -1,6 +1,7 @@
 import logging
 from selenium.common import NoSuchElementException
 from selenium.webdriver.common.by import By
+from utils.timing_utils import timed
 
 
 logger = logging.getLogger(__name__)
@@ -39,4 +40,131 @@ def get_element_attribute(element, css_selectors, selector_key, attribute, error
         return ''
     except Exception as e:
         logger.error(f'Произошла ошибка при получении атрибута {attribute} элемента {selector_key}: {e}.')
-        return ''
\ No newline at end of file
+        return ''
+
+BATCH_CHUNK_SIZE = 200
+
+BATCH_EXTRACTION_SCRIPT = """
+const containerSelector = arguments[0];
+const fields = arguments[1];
+const start = arguments[2];
+const limit = arguments[3];
+const containers = Array.from(document.querySelectorAll(containerSelector)).slice(start, limit ? start + limit : undefined);
+const result = [];
+for (const container of containers) {
+    const item = {};
+    for (const field of fields) {
+        const element = container.querySelector(field.selector);
+        if (!element) {
+            item[field.name] = '';
+        } else if (field.attribute) {
+            let value = element[field.attribute];
+            if (value === undefined || value === null) {
+                value = element.getAttribute(field.attribute);
+            }
+            item[field.name] = value === null || value === undefined ? '' : String(value);
+        } else {
+            item[field.name] = (element.innerText || element.textContent || '').trim();
+        }
+    }
+    result.push(item);
+}
+return result;
+"""
+
+
+def get_elements_data(driver, css_selectors, container_key, field_specs, error_message, start=0, limit=None):
+    """
+    Extracts fields of all elements matched by container_key in a single execute_script call.
+
+    Args:
+        driver: WebDriver instance.
+        css_selectors(dict): CSS selectors from css_selectors.json.
+        container_key(str): Key of the selector matching every item card.
+        field_specs(dict): Field name -> (selector_key, attribute). Attribute None means element text.
+        error_message(str | None): Message logged when nothing was found. None disables the warning.
+        start(int, optional): Index of the first element to extract. Defaults to 0.
+        limit(int, optional): Maximum number of elements to extract. Defaults to all remaining elements.
+
+    Returns:
+        list[dict] | None: Field values per element, or None if the batch call failed.
+    """
+    try:
+        fields = [
+            {'name': name, 'selector': css_selectors[selector_key], 'attribute': attribute}
+            for name, (selector_key, attribute) in field_specs.items()
+        ]
+        with timed(f'extract.{container_key}'):
+            elements_data = driver.execute_script(
+                BATCH_EXTRACTION_SCRIPT, css_selectors[container_key], fields, start, limit
+            )
+        if not elements_data:
+            if error_message:
+                logger.warning(error_message)
+            return []
+        logger.info(f'Пакетно извлечены данные {len(elements_data)} элементов {container_key}.')
+        return elements_data
+    except Exception as e:
+        logger.error(f'Произошла ошибка при пакетном извлечении данных элементов {container_key}: {e}.')
+        return None
+
+
+PAGE_STATE_SCRIPT = """
+const [selectors] = arguments;
+const state = {};
+for (const [name, selector] of Object.entries(selectors)) {
+    let found = false;
+    try {
+        found = document.querySelector(selector) !== null;
+    } catch (e) {}
+    state[name] = found;
+}
+const videoDetails = (window.ytInitialPlayerResponse || {}).videoDetails || {};
+state.live = videoDetails.isLive === true;
+state.upcoming = videoDetails.isUpcoming === true;
+return state;
+"""
+
+
+def probe_page_state(driver, css_selectors, selector_keys):
+    """
+    Checks which of the selectors are present on the page in a single execute_script call.
+
+    Args:
+        driver: WebDriver instance.
+        css_selectors(SelectorRegistry): CSS selectors from css_selectors.json.
+        selector_keys(iterable): Keys of the state selectors, e.g. 'is_video_unavailable'.
+
+    Returns:
+        dict: Selector key -> bool, plus 'live' and 'upcoming' (a premiere that has not started)
+            from ytInitialPlayerResponse. Empty if the call failed.
+    """
+    try:
+        selectors = {key: css_selectors.any_of(key) for key in selector_keys}
+        return driver.execute_script(PAGE_STATE_SCRIPT, selectors) or {}
+    except Exception as e:
+        logger.error(f'Произошла ошибка при проверке состояния страницы: {e}.')
+        return {}
+
+
+def _iter_next_chunks(chunk, driver, css_selectors, container_key, field_specs, chunk_size):
+    start = 0
+    while chunk:
+        yield from chunk
+        if len(chunk) < chunk_size:
+            break
+        start += chunk_size
+        chunk = get_elements_data(driver, css_selectors, container_key, field_specs, None, start, chunk_size)
+
+
+def iter_elements_data(driver, css_selectors, container_key, field_specs, error_message, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Same as get_elements_data, but extracts elements in chunks of chunk_size and yields them one by one.
+
+    Returns:
+        Iterator[dict] | None: Field values per element, or None if the first batch call failed.
+    """
+    first_chunk = get_elements_data(driver, css_selectors, container_key, field_specs, error_message, 0, chunk_size)
+    if first_chunk is None:
+        return None
+    return _iter_next_chunks(first_chunk, driver, css_selectors, container_key, field_specs, chunk_size)
@@ -1,5 +1,7 @@
 import csv
 import json
+import os
+from utils.checkpoint_utils import delay_keyboard_interrupt
 
 def save_csv_file(data, csv_path, header=None):
     """
@@ -38,4 +40,78 @@ def save_json_file(data, filename):
 
 def load_json_file(filepath):
     with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
\ No newline at end of file
+        return json.load(f)
+
+def iter_jsonl_file(filepath):
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def export_jsonl_to_json(jsonl_path, json_path):
+    """
+    Converts a JSON Lines file to a JSON array in the save_json_file format without loading it into memory.
+    """
+    tmp_path = f'{json_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        separator = '['
+        for record in iter_jsonl_file(jsonl_path):
+            record_json = json.dumps(record, ensure_ascii=False, indent=4).replace('\n', '\n    ')
+            f.write(f'{separator}\n    {record_json}')
+            separator = ','
+        f.write('[]' if separator == '[' else '\n]')
+    os.replace(tmp_path, json_path)
+
+
+class JsonLinesWriter:
+    """
+    Streaming output sink: every record is appended to a JSON Lines file as soon as it is collected.
+
+    The file is fsynced every fsync_every records, so partial output survives a crash.
+    With json_path, the JSON Lines file is also exported to a JSON array on close.
+    """
+
+    def __init__(self, jsonl_path, json_path=None, fsync_every=50, append=False):
+        jsonl_dir = os.path.dirname(jsonl_path)
+        if jsonl_dir:
+            os.makedirs(jsonl_dir, exist_ok=True)
+        self.jsonl_path = jsonl_path
+        self.json_path = json_path
+        self.fsync_every = fsync_every
+        self.count = 0
+        self.file = open(jsonl_path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.count += 1
+        if self.count % self.fsync_every == 0:
+            self.sync()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.sync()
+        self.file.close()
+        print(f'Записано {self.count} записей в {self.jsonl_path}')
+        if self.json_path:
+            try:
+                with delay_keyboard_interrupt():
+                    export_jsonl_to_json(self.jsonl_path, self.json_path)
+                print(f'Данные успешно сохранены в {self.json_path}')
+            except Exception as e:
+                print(f'Произошла ошибка при сохранении в JSON: {e}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,62 +1,351 @@
+import json
 import logging
+import os
+import random
+import re
+import threading
+import time
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from google.oauth2.service_account import Credentials
+from utils.file_utils import iter_jsonl_file
+from utils.timing_utils import record_timing, timed_function
 
 logger = logging.getLogger(__name__)
 
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_REQUEST_BYTES = 2 * 1024 * 1024  # Google recommends payloads of up to 2 MB
 
-def save_to_googlesheets(data, spreadsheet_id, sheet_name, credentials_file):
-    try:
-        SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-
-        creds = Credentials.from_service_account_file(credentials_file, scopes=SCOPES)
-
-        service = build('sheets', 'v4', credentials=creds)
-
-        spreadsheet = service.spreadsheets().get(spreadsheetId=spreadsheet_id).execute()
-        sheet_exists = False
-        for sheet in spreadsheet.get('sheets', []):
-            if sheet['properties']['title'] == sheet_name:
-                sheet_exists = True
-                break
-
-        if not sheet_exists:
-            add_sheet_request = {
-                'requests': [{
-                    'addSheet': {
-                        'properties': {
-                            'title': sheet_name
-                        }
-                    }
-                }]
-            }
-            service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body=add_sheet_request).execute()
-            logging.info(f'Создан новый лист "{sheet_name}".')
-        else:
-            logging.info(f'Лист "{sheet_name}" уже существует.')
 
+class JsonlRows:
+    """
+    Sheet rows of a JSON Lines file: the keys of the first record, then the values of every record.
+    The file is read again on every iteration.
+    """
+
+    def __init__(self, jsonl_path, record_transform=None):
+        self.jsonl_path = jsonl_path
+        self.record_transform = record_transform
+
+    def __iter__(self):
+        headers_sent = False
+        for record in iter_jsonl_file(self.jsonl_path):
+            if self.record_transform is not None:
+                record = self.record_transform(record)
+            if not headers_sent:
+                yield list(record.keys())
+                headers_sent = True
+            yield list(record.values())
+
+
+class GoogleSheetsWriter:
+    """
+    Long-lived Google Sheets client that queues outputs and writes them in as few API calls as possible.
+
+    All missing tabs are created with one batchUpdate, full-sheet writes go out in as few size-bounded
+    values.batchUpdate requests as possible. Quota errors (429) and server errors are retried with exponential
+    backoff; outputs that still fail stay queued and can be saved to disk with save_pending().
+    """
+
+    def __init__(self, spreadsheet_id, credentials_file, max_retries=6):
+        self.spreadsheet_id = spreadsheet_id
+        self.credentials_file = credentials_file
+        self.max_retries = max_retries
+        self.service = None
+        self.sheet_titles = None
+        self.pending_updates = {}
+        self.pending_appends = []
+        self.lock = threading.Lock()
+
+    def _get_service(self):
+        if self.service is None:
+            creds = Credentials.from_service_account_file(self.credentials_file, scopes=SCOPES)
+            self.service = build('sheets', 'v4', credentials=creds)
+        return self.service
+
+    @timed_function('sheets.request')
+    def _execute(self, request):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return request.execute()
+            except HttpError as e:
+                status = e.resp.status
+                is_quota_error = status == 403 and 'rateLimitExceeded' in str(e)
+                if (status not in RETRY_STATUSES and not is_quota_error) or attempt == self.max_retries:
+                    raise
+                delay = min(2 ** attempt, 64) + random.random()
+                logging.warning(f'Google Sheets вернул ошибку {status}. Повтор через {delay:.1f} с '
+                                f'(попытка {attempt + 1}/{self.max_retries}).')
+                time.sleep(delay)
+
+    def _get_sheet_titles(self):
+        if self.sheet_titles is None:
+            spreadsheet = self._execute(
+                self._get_service().spreadsheets().get(spreadsheetId=self.spreadsheet_id, fields='sheets.properties.title')
+            )
+            self.sheet_titles = {sheet['properties']['title'] for sheet in spreadsheet.get('sheets', [])}
+        return self.sheet_titles
+
+    def queue_update(self, data, sheet_name):
         if not data:
-            logging.warning(f'Нет данных для выгрузки в Google Sheets')
+            logging.warning('Нет данных для выгрузки в Google Sheets')
             return
-
         headers = list(data[0].keys())
-        values = [headers] + [list(item.values()) for item in data]
+        with self.lock:
+            self.pending_updates[sheet_name] = [headers] + [list(item.values()) for item in data]
+        logging.info(f'Данные для листа "{sheet_name}" поставлены в очередь выгрузки в Google Sheets.')
+
+    def queue_update_file(self, jsonl_path, sheet_name, record_transform=None):
+        """
+        Queues a JSON Lines output as the whole sheet. Rows are read from the file only when they are sent,
+        so queued outputs are not kept in memory.
+        """
+        if next(iter_jsonl_file(jsonl_path), None) is None:
+            logging.warning('Нет данных для выгрузки в Google Sheets')
+            return
+        with self.lock:
+            self.pending_updates[sheet_name] = JsonlRows(jsonl_path, record_transform)
+        logging.info(f'Данные для листа "{sheet_name}" поставлены в очередь выгрузки в Google Sheets.')
+
+    def queue_append(self, data, sheet_name):
+        if not data:
+            logging.warning('Нет новых данных для добавления в Google Sheets')
+            return
+        with self.lock:
+            self.pending_appends.append((sheet_name, list(data[0].keys()), [list(item.values()) for item in data]))
+        logging.info(f'Новые строки для листа "{sheet_name}" поставлены в очередь выгрузки в Google Sheets.')
+
+    def flush(self):
+        """
+        Sends the queued outputs. Full-sheet writes go out in values.batchUpdate requests of at most
+        MAX_REQUEST_BYTES each. Outputs that could not be sent are queued again for the next flush.
+        """
+        with self.lock:
+            updates, self.pending_updates = self.pending_updates, {}
+            appends, self.pending_appends = self.pending_appends, []
+        if not updates and not appends:
+            return
+
+        started_at = time.perf_counter()
+        failed_appends = []
+        try:
+            sheet_titles = self._get_sheet_titles()
+            new_sheets = (set(updates) | {sheet_name for sheet_name, _, _ in appends}) - sheet_titles
+            failed_sheets = self._add_missing_sheets(new_sheets)
+        except Exception as e:
+            logging.error(f'Произошла ошибка при работе с Google Sheets: {e}.')
+            self._requeue(updates, appends)
+            return
 
-        range_ = f"'{sheet_name}'!A1"
+        sent_updates = self._send_updates(
+            {sheet_name: values for sheet_name, values in updates.items() if sheet_name not in failed_sheets}
+        )
+        failed_updates = {sheet_name: values for sheet_name, values in updates.items() if sheet_name not in sent_updates}
 
+        # Sheets API has no batched append, so rows added to existing sheets are sent per sheet.
+        failed_append_sheets = set()
+        for sheet_name, headers, rows in appends:
+            if sheet_name in failed_updates or sheet_name in failed_sheets or sheet_name in failed_append_sheets:
+                # Later rows of a sheet wait for the earlier ones, so the order of rows is kept.
+                failed_appends.append((sheet_name, headers, rows))
+                failed_append_sheets.add(sheet_name)
+                continue
+            # A sheet created by this flush gets the header row with its first rows, unless it was written in full.
+            with_headers = sheet_name in new_sheets and sheet_name not in updates
+            new_sheets.discard(sheet_name)
+            values = [headers] + rows if with_headers else rows
+            unsent_values = self._send_append(sheet_name, values)
+            if not unsent_values:
+                continue
+            failed_append_sheets.add(sheet_name)
+            if with_headers and len(unsent_values) == len(values):
+                # The sheet exists now, so nothing would add the header row to a later append.
+                failed_updates[sheet_name] = values
+            else:
+                failed_appends.append((sheet_name, headers, unsent_values))
+
+        self._requeue(failed_updates, failed_appends)
+        record_timing('sheets.flush', time.perf_counter() - started_at)
+
+    def _send_updates(self, updates):
+        """
+        Returns:
+            set[str]: Sheets written completely.
+        """
+        sent = set(updates)
+        batch = []
+        batch_size = 0
+        for sheet_name, start_row, rows, size in self._iter_update_ranges(updates):
+            if batch and batch_size + size > MAX_REQUEST_BYTES:
+                sent -= self._send_update_batch(batch)
+                batch, batch_size = [], 0
+            # The rest of a sheet is skipped once one of its ranges failed; the sheet is written again later.
+            if sheet_name not in sent:
+                continue
+            batch.append((sheet_name, start_row, rows))
+            batch_size += size
+        if batch:
+            sent -= self._send_update_batch(batch)
+        return sent
+
+    @staticmethod
+    def _iter_update_ranges(updates):
+        """
+        Splits every sheet into row ranges of at most MAX_REQUEST_BYTES.
+
+        Yields:
+            tuple: Sheet name, number of the first row, rows and their size in bytes.
+        """
+        for sheet_name, values in updates.items():
+            start_row = 1
+            rows = []
+            size = 0
+            for row in values:
+                row_size = _get_row_size(row)
+                if rows and size + row_size > MAX_REQUEST_BYTES:
+                    yield sheet_name, start_row, rows, size
+                    start_row += len(rows)
+                    rows, size = [], 0
+                rows.append(row)
+                size += row_size
+            if rows:
+                yield sheet_name, start_row, rows, size
+
+    def _send_update_batch(self, batch):
+        """
+        Returns:
+            set[str]: Sheets of the batch that were not written.
+        """
         body = {
-            'values': values
+            'valueInputOption': 'USER_ENTERED',
+            'data': [{'range': f"'{sheet_name}'!A{start_row}", 'values': rows} for sheet_name, start_row, rows in batch]
         }
+        sheet_names = {sheet_name for sheet_name, _, _ in batch}
+        try:
+            self._execute(
+                self._get_service().spreadsheets().values().batchUpdate(spreadsheetId=self.spreadsheet_id, body=body)
+            )
+        except Exception as e:
+            logging.error(f'Не удалось выгрузить в Google Sheets листы {", ".join(sorted(sheet_names))}: {e}.')
+            return sheet_names
+        logging.info(f'Данные {len(sheet_names)} листов выгружены в Google Sheets одним запросом.')
+        return set()
+
+    def _send_append(self, sheet_name, rows):
+        """
+        Returns:
+            list: Rows that were not added, starting with the first failed chunk.
+        """
+        start = 0
+        while start < len(rows):
+            end = start
+            size = 0
+            while end < len(rows) and (end == start or size + _get_row_size(rows[end]) <= MAX_REQUEST_BYTES):
+                size += _get_row_size(rows[end])
+                end += 1
+            try:
+                self._execute(
+                    self._get_service().spreadsheets().values().append(
+                        spreadsheetId=self.spreadsheet_id,
+                        range=f"'{sheet_name}'!A1",
+                        valueInputOption='USER_ENTERED',
+                        insertDataOption='INSERT_ROWS',
+                        body={'values': rows[start:end]}
+                    )
+                )
+            except Exception as e:
+                logging.error(f'Не удалось добавить строки в лист "{sheet_name}": {e}.')
+                return rows[start:]
+            start = end
+        logging.info(f'В лист "{sheet_name}" добавлено {len(rows)} новых строк.')
+        return []
 
-        result = service.spreadsheets().values().update(
-            spreadsheetId=spreadsheet_id,
-            range=range_,
-            valueInputOption='USER_ENTERED',
-            body=body
-        ).execute()
+    def _requeue(self, updates, appends):
+        if not updates and not appends:
+            return
+        with self.lock:
+            # Outputs queued again during the flush are newer and win.
+            for sheet_name, values in updates.items():
+                self.pending_updates.setdefault(sheet_name, values)
+            self.pending_appends[:0] = appends
+        logging.warning(f'Не выгружено в Google Sheets листов: {len(updates) + len(appends)}. '
+                        f'Они останутся в очереди до следующей выгрузки.')
+
+    def save_pending(self, directory):
+        """
+        Saves outputs that are still queued, e.g. after failed flushes at exit, as JSON Lines files
+        with one sheet row per line, so they can be uploaded later.
+        """
+        with self.lock:
+            updates, self.pending_updates = self.pending_updates, {}
+            appends, self.pending_appends = self.pending_appends, []
+        if not updates and not appends:
+            return
+        os.makedirs(directory, exist_ok=True)
+        entries = [(sheet_name, values) for sheet_name, values in updates.items()]
+        entries += [(f'{sheet_name}.append', [headers] + rows) for sheet_name, headers, rows in appends]
+        for number, (sheet_name, values) in enumerate(entries, 1):
+            file_name = re.sub(r'[\\/:*?"<>|]', '_', sheet_name)
+            filepath = os.path.join(directory, f'{time.strftime("%Y%m%d_%H%M%S")}_{number}_{file_name}.jsonl')
+            with open(filepath, 'w', encoding='utf-8') as f:
+                for row in values:
+                    f.write(json.dumps(row, ensure_ascii=False, default=str) + '\n')
+            logging.warning(f'Данные листа "{sheet_name}" не выгружены в Google Sheets и сохранены в {filepath}.')
+
+    def _add_missing_sheets(self, sheet_names):
+        """
+        Returns:
+            set[str]: Sheets that could not be created.
+        """
+        if not sheet_names:
+            return set()
+        add_sheet_request = {
+            'requests': [{'addSheet': {'properties': {'title': sheet_name}}} for sheet_name in sorted(sheet_names)]
+        }
+        try:
+            self._execute(
+                self._get_service().spreadsheets().batchUpdate(spreadsheetId=self.spreadsheet_id, body=add_sheet_request)
+            )
+        except HttpError as e:
+            if len(sheet_names) == 1:
+                logging.error(f'Не удалось создать лист "{next(iter(sheet_names))}": {e}.')
+                return set(sheet_names)
+            # One bad title fails the whole batch, so the sheets are created one by one to find it.
+            return set().union(*(self._add_missing_sheets({sheet_name}) for sheet_name in sheet_names))
+        self.sheet_titles.update(sheet_names)
+        logging.info(f'Создано новых листов: {len(sheet_names)}.')
+        return set()
 
-        logging.info(f'Данные успешно выгружены в Google Sheets.')
 
-    except Exception as e:
-        logging.error(f'Произошла ошибка при работе с Google Sheets: {e}.')
+def _get_row_size(row):
+    return len(json.dumps(row, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_sheets_writer(spreadsheet_id, credentials_file):
+    with _writers_lock:
+        key = (spreadsheet_id, credentials_file)
+        if key not in _writers:
+            _writers[key] = GoogleSheetsWriter(spreadsheet_id, credentials_file)
+        return _writers[key]
+
+
+def flush_sheets_writers():
+    for writer in list(_writers.values()):
+        writer.flush()
+
+
+def save_to_googlesheets(data, spreadsheet_id, sheet_name, credentials_file):
+    writer = get_sheets_writer(spreadsheet_id, credentials_file)
+    writer.queue_update(data, sheet_name)
+    writer.flush()
+
 
+def append_to_googlesheets(data, spreadsheet_id, sheet_name, credentials_file):
+    writer = get_sheets_writer(spreadsheet_id, credentials_file)
+    writer.queue_append(data, sheet_name)
+    writer.flush()
@@ -0,0 +1,204 @@
+import gzip
+import logging
+import os
+import re
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from urllib.parse import urljoin
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_URL = 'https://www.youtube.com'
+URL_ATTRIBUTES = {'href', 'src'}
+SNAPSHOT_FAILED_STATUS = 'Не удалось разобрать HTML-снимок страницы.'
+
+
+def _parse_document(page_source):
+    if lxml_html is None:
+        raise ImportError('Для разбора HTML-снимков установите lxml и cssselect: pip install lxml cssselect')
+    return lxml_html.fromstring(page_source)
+
+
+def _select_first(root, css_selectors, selector_keys):
+    if isinstance(selector_keys, str):
+        selector_keys = [selector_keys]
+    for selector_key in selector_keys:
+        elements = root.cssselect(css_selectors[selector_key])
+        if elements:
+            return elements[0]
+    return None
+
+
+def _element_text(element):
+    lines = (' '.join(line.split()) for line in element.text_content().splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def _element_value(element, attribute, base_url):
+    if attribute is None:
+        return _element_text(element)
+    value = element.get(attribute) or ''
+    if value and attribute in URL_ATTRIBUTES:
+        value = urljoin(base_url, value)
+    return value
+
+
+def _extract_fields(root, css_selectors, field_specs, base_url):
+    """
+    Field specs are field name -> (selector_key, attribute[, postprocess]).
+    selector_key can be a list of fallback keys, attribute None means element text.
+    """
+    values = OrderedDict()
+    for name, spec in field_specs.items():
+        selector_keys, attribute = spec[0], spec[1]
+        postprocess = spec[2] if len(spec) > 2 else None
+        element = _select_first(root, css_selectors, selector_keys)
+        value = _element_value(element, attribute, base_url) if element is not None else ''
+        values[name] = postprocess(value) if postprocess else value
+    return values
+
+
+def parse_page(page_source, css_selectors, field_specs, status_checks=(), base_url=YOUTUBE_URL):
+    """
+    Parses page-level fields from an HTML snapshot.
+
+    Args:
+        page_source(str): HTML of the page.
+        css_selectors(dict): CSS selectors from css_selectors.json.
+        field_specs(dict): Field name -> (selector_key, attribute[, postprocess]).
+        status_checks(iterable, optional): (selector_key, status) pairs. The first matching selector
+            makes the page return {'status': status} instead of fields.
+        base_url(str, optional): Base for relative href/src values.
+
+    Returns:
+        OrderedDict: Parsed field values.
+    """
+    root = _parse_document(page_source)
+    for selector_key, status in status_checks:
+        if root.cssselect(css_selectors[selector_key]):
+            return OrderedDict(status=status)
+    return _extract_fields(root, css_selectors, field_specs, base_url)
+
+
+def parse_items(page_source, css_selectors, container_key, field_specs, base_url=YOUTUBE_URL):
+    """
+    Parses fields of every item card (search results, channel videos) from an HTML snapshot.
+
+    Returns:
+        list[OrderedDict]: Parsed field values per item.
+    """
+    root = _parse_document(page_source)
+    return [
+        _extract_fields(container, css_selectors, field_specs, base_url)
+        for container in root.cssselect(css_selectors[container_key])
+    ]
+
+
+def _snapshot_path(snapshot_dir, name):
+    safe_name = re.sub(r'[^\w.-]', '_', name)
+    return os.path.join(snapshot_dir, f'{safe_name}.html.gz')
+
+
+def save_snapshot(snapshot_dir, name, page_source):
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = _snapshot_path(snapshot_dir, name)
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        f.write(page_source)
+    return path
+
+
+def load_snapshot(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+def _parse_snapshot_file(path, css_selectors, field_specs, status_checks, container_key):
+    page_source = load_snapshot(path)
+    if container_key:
+        return parse_items(page_source, css_selectors, container_key, field_specs)
+    return parse_page(page_source, css_selectors, field_specs, status_checks)
+
+
+def iter_snapshot_dir(snapshot_dir, css_selectors, field_specs, status_checks=(), container_key=None, max_workers=None):
+    """
+    Re-parses stored snapshots offline, e.g. after selectors in css_selectors.json were fixed.
+
+    Yields:
+        tuple[str, OrderedDict | list]: Snapshot name and parsed data.
+    """
+    paths = sorted(
+        os.path.join(snapshot_dir, filename) for filename in os.listdir(snapshot_dir) if filename.endswith('.html.gz')
+    )
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        parse_snapshot_file = partial(
+            _parse_snapshot_file,
+            css_selectors=css_selectors,
+            field_specs=field_specs,
+            status_checks=tuple(status_checks),
+            container_key=container_key
+        )
+        results = executor.map(parse_snapshot_file, paths)
+        for path, parsed in zip(paths, results):
+            yield os.path.basename(path)[:-len('.html.gz')], parsed
+
+
+class SnapshotParser:
+    """
+    Parses page snapshots in a process pool while the browser moves on to the next URL.
+
+    Results are returned in submission order.
+    """
+
+    def __init__(self, css_selectors, field_specs, status_checks=(), snapshot_dir=None, max_workers=None):
+        self.css_selectors = css_selectors
+        self.field_specs = field_specs
+        self.status_checks = tuple(status_checks)
+        self.snapshot_dir = snapshot_dir
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.pending = deque()
+
+    def submit(self, name, page_source, context=None):
+        if self.snapshot_dir:
+            save_snapshot(self.snapshot_dir, name, page_source)
+        future = self.executor.submit(parse_page, page_source, self.css_selectors, self.field_specs, self.status_checks)
+        self.pending.append((context, future))
+
+    def add_result(self, parsed, context=None):
+        """
+        Queues an already known result (e.g. taken from cache) so that submission order is kept.
+        """
+        future = Future()
+        future.set_result(parsed)
+        self.pending.append((context, future))
+
+    def iter_ready(self):
+        while self.pending and self.pending[0][1].done():
+            context, future = self.pending.popleft()
+            yield context, self._get_result(future)
+
+    def iter_all(self):
+        while self.pending:
+            context, future = self.pending.popleft()
+            yield context, self._get_result(future)
+
+    def _get_result(self, future):
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f'Произошла ошибка при разборе HTML-снимка: {e}.')
+            return OrderedDict(status=SNAPSHOT_FAILED_STATUS)
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,196 @@
+import json
+import logging
+import re
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.initial_data_utils import YOUTUBE_URL, find_first, parse_watch_data, parse_search_items, \
+    parse_search_continuation, get_search_continuation, get_comment_count, get_comments_continuation, \
+    parse_comments_header
+from utils.string_utils import extract_video_id
+from utils.proxy_pool_utils import acquire_pool_proxy, release_pool_proxy
+from utils.timing_utils import timed
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36'
+)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+INITIAL_DATA_PATTERN = re.compile(r'(?:var\s+ytInitialData|window\["ytInitialData"\])\s*=\s*')
+PLAYER_RESPONSE_PATTERN = re.compile(r'(?:var\s+ytInitialPlayerResponse|window\["ytInitialPlayerResponse"\])\s*=\s*')
+YTCFG_PATTERN = re.compile(r'ytcfg\.set\(\s*(?=\{)')
+
+
+def extract_json_object(html, pattern):
+    """
+    Decodes the JSON object that follows the first match of pattern in the page HTML.
+
+    Returns:
+        dict | None: Decoded object or None if it is absent or malformed.
+    """
+    match = pattern.search(html)
+    if not match:
+        return None
+    try:
+        json_object, _ = json.JSONDecoder().raw_decode(html, match.end())
+        return json_object
+    except ValueError:
+        return None
+
+
+def extract_ytcfg(html):
+    ytcfg = {}
+    decoder = json.JSONDecoder()
+    for match in YTCFG_PATTERN.finditer(html):
+        try:
+            config, _ = decoder.raw_decode(html, match.end())
+            ytcfg.update(config)
+        except ValueError:
+            continue
+    return ytcfg
+
+
+class YoutubeHttpClient:
+    """
+    Fetches YouTube pages without a browser and parses their server-rendered ytInitialData.
+
+    One requests session keeps connections alive between pages. Responses are gzip-compressed,
+    429 and server errors are retried with backoff. The proxy is a SOCKS5 "host:port" like in proxy_checker.py,
+    without it the client takes a proxy from the proxy pool, if a pool is set.
+    """
+
+    def __init__(self, proxy=None, timeout=10, pool_size=10, max_retries=3):
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=1,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept-Language': 'ru-RU,ru;q=0.9',
+            'Accept-Encoding': 'gzip, deflate'
+        })
+        # Without the consent cookie EU visitors get the consent page instead of the video page.
+        self.session.cookies.set('SOCS', 'CAI', domain='.youtube.com')
+        self.pool_proxy = None
+        if proxy is None:
+            self.pool_proxy = proxy = acquire_pool_proxy()
+        if proxy:
+            self.session.proxies = {'http': f'socks5://{proxy}', 'https': f'socks5://{proxy}'}
+        self.ytcfg = {}
+
+    def get_page(self, url, params=None):
+        with timed('http.get_page'):
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            html = response.text
+        self.ytcfg = extract_ytcfg(html) or self.ytcfg
+        return html
+
+    def post_innertube(self, endpoint, continuation):
+        """
+        Requests the continuation of a page with the innertube config of the last fetched page.
+        """
+        api_key = self.ytcfg.get('INNERTUBE_API_KEY')
+        context = self.ytcfg.get('INNERTUBE_CONTEXT')
+        if not api_key or not context:
+            raise ValueError('В загруженной странице не найден ytcfg с ключом innertube API.')
+        with timed(f'http.innertube.{endpoint}'):
+            response = self.session.post(
+                f'{YOUTUBE_URL}/youtubei/v1/{endpoint}',
+                params={'key': api_key, 'prettyPrint': 'false'},
+                json={'context': context, 'continuation': continuation},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            return response.json()
+
+    def fetch_watch_data(self, video_url):
+        """
+        Returns:
+            tuple[dict, dict]: ytInitialData and ytInitialPlayerResponse of the watch page.
+        """
+        html = self.get_page(video_url)
+        initial_data = extract_json_object(html, INITIAL_DATA_PATTERN) or {}
+        player_response = extract_json_object(html, PLAYER_RESPONSE_PATTERN) or {}
+        return initial_data, player_response
+
+    def fetch_comment_count(self, initial_data):
+        comment_count = get_comment_count(initial_data)
+        if comment_count:
+            return comment_count
+
+        continuation = get_comments_continuation(initial_data)
+        if not continuation:
+            return None
+        try:
+            response = self.post_innertube('next', continuation)
+        except Exception as e:
+            logger.warning(f'Не удалось запросить количество комментариев: {e}.')
+            return None
+        return parse_comments_header(response.get('onResponseReceivedEndpoints', []))
+
+    def fetch_video_info(self, video_url, fields=None):
+        """
+        Collects Video fields from the server-rendered watch page.
+
+        Args:
+            video_url(str): Link to the video.
+            fields(iterable, optional): Fields to collect. The comments continuation is requested
+                only when 'comments' is among them. Defaults to all fields.
+
+        Returns:
+            dict: Field name -> value for the fields found in the page, or {'status': ...}.
+        """
+        initial_data, player_response = self.fetch_watch_data(video_url)
+        video_info = parse_watch_data(initial_data, player_response, extract_video_id(video_url))
+        if 'status' in video_info:
+            return video_info
+
+        if (fields is None or 'comments' in fields) and 'comments' not in video_info:
+            comment_count = self.fetch_comment_count(initial_data)
+            if comment_count:
+                video_info['comments'] = comment_count
+
+        if fields is not None:
+            video_info = {name: value for name, value in video_info.items() if name in fields}
+        return video_info
+
+    def iter_search_items(self, search_request):
+        """
+        Yields search results page by page, following the continuation tokens.
+        """
+        html = self.get_page(f'{YOUTUBE_URL}/results', params={'search_query': search_request})
+        initial_data = extract_json_object(html, INITIAL_DATA_PATTERN) or {}
+        yield from parse_search_items(initial_data)
+
+        continuation = get_search_continuation(find_first(initial_data, 'twoColumnSearchResultsRenderer') or {})
+        while continuation:
+            search_items, continuation = parse_search_continuation(self.post_innertube('search', continuation))
+            if not search_items:
+                break
+            yield from search_items
+
+    def close(self):
+        self.session.close()
+        release_pool_proxy(self.pool_proxy)
+        self.pool_proxy = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def close_http_client(client):
+    client.close()
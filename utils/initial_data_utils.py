@@ -0,0 +1,357 @@
+import json
+import logging
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_URL = 'https://www.youtube.com'
+
+# Only the parts used by parse_watch_data are serialized, the full ytInitialData of a watch page is ~1 MB.
+WATCH_DATA_SCRIPT = """
+const initialData = window.ytInitialData || {};
+const playerResponse = window.ytInitialPlayerResponse || {};
+const watchResults = ((initialData.contents || {}).twoColumnWatchNextResults || {}).results || {};
+return JSON.stringify({
+    initialData: {
+        contents: {twoColumnWatchNextResults: {results: watchResults}},
+        engagementPanels: initialData.engagementPanels || [],
+        frameworkUpdates: initialData.frameworkUpdates || {}
+    },
+    playerResponse: {
+        playabilityStatus: playerResponse.playabilityStatus || {},
+        videoDetails: playerResponse.videoDetails || {},
+        microformat: playerResponse.microformat || {}
+    }
+});
+"""
+
+# After in-app navigation (search, channel tabs) window.ytInitialData still holds the first page,
+# so the response of the current page is taken from ytd-page-manager when it is available.
+PAGE_DATA_SCRIPT = """
+let response = null;
+try {
+    const pageManager = document.querySelector('ytd-page-manager');
+    response = pageManager && pageManager.getCurrentData && pageManager.getCurrentData().response;
+} catch (e) {}
+return JSON.stringify(response || window.ytInitialData || null);
+"""
+
+# The comments section of a watch page is a continuation. Only its header is requested here,
+# the comment threads themselves are never loaded or rendered.
+COMMENTS_HEADER_SCRIPT = """
+const [continuation, timeoutMs, done] = arguments;
+const config = (window.ytcfg && window.ytcfg.data_) || {};
+const controller = new AbortController();
+setTimeout(() => controller.abort(), timeoutMs);
+fetch(`/youtubei/v1/next?key=${config.INNERTUBE_API_KEY}&prettyPrint=false`, {
+    method: 'POST',
+    credentials: 'same-origin',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify({context: config.INNERTUBE_CONTEXT, continuation: continuation}),
+    signal: controller.signal
+})
+    .then(response => response.json())
+    .then(data => done(JSON.stringify(data.onResponseReceivedEndpoints || [])))
+    .catch(error => done(JSON.stringify({error: String(error)})));
+"""
+
+COMMENTS_DISABLED = 'Комментарии к Video отключены.'
+
+PLAYABILITY_STATUSES = {
+    'ERROR': 'Видео удалено/недоступно',
+    'CONTENT_CHECK_REQUIRED': 'YouTube посчитал данное видео неприемлемым!',
+    'AGE_CHECK_REQUIRED': 'YouTube посчитал данное видео неприемлемым!',
+    'LOGIN_REQUIRED': 'YouTube посчитал данное видео неприемлемым!',
+}
+
+
+def get_watch_page_data(driver):
+    """
+    Reads ytInitialData and ytInitialPlayerResponse of the opened watch page in one execute_script call.
+
+    Returns:
+        tuple[dict, dict]: Initial data and player response, empty dicts if they could not be read.
+    """
+    try:
+        page_data = json.loads(driver.execute_script(WATCH_DATA_SCRIPT))
+        return page_data['initialData'], page_data['playerResponse']
+    except Exception as e:
+        logger.warning(f'Не удалось прочитать ytInitialData страницы видео: {e}.')
+        return {}, {}
+
+
+def get_page_data(driver):
+    try:
+        return json.loads(driver.execute_script(PAGE_DATA_SCRIPT)) or {}
+    except Exception as e:
+        logger.warning(f'Не удалось прочитать ytInitialData страницы: {e}.')
+        return {}
+
+
+def find_values(data, key):
+    """
+    Yields every value stored under key at any depth of the JSON data.
+    """
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for node_key, value in node.items():
+                if node_key == key:
+                    yield value
+                stack.append(value)
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def find_first(data, key, default=None):
+    return next(find_values(data, key), default)
+
+
+def get_text(node):
+    """
+    Returns the text of a YouTube text object: {'simpleText': ...}, {'runs': [...]} or {'content': ...}.
+    """
+    if not isinstance(node, dict):
+        return node if isinstance(node, str) else ''
+    if 'simpleText' in node:
+        return node['simpleText']
+    if 'runs' in node:
+        return ''.join(run.get('text', '') for run in node['runs'])
+    return node.get('content', '')
+
+
+def _format_number(number):
+    return '{:,}'.format(int(number)).replace(',', '.')
+
+
+def _get_comments_section(initial_data):
+    for section in find_values(initial_data, 'itemSectionRenderer'):
+        if section.get('sectionIdentifier') == 'comment-item-section':
+            return section
+    return None
+
+
+def get_comments_continuation(initial_data):
+    """
+    Returns the continuation token of the comments section, or None if there is none.
+    """
+    section = _get_comments_section(initial_data) or {}
+    continuation_command = find_first(section, 'continuationCommand') or {}
+    return continuation_command.get('token')
+
+
+def parse_comments_header(endpoints):
+    """
+    Extracts the comment count from the endpoints of the comments continuation response.
+    """
+    header = find_first(endpoints, 'commentsHeaderRenderer') or {}
+    return get_text(header.get('countText')) or get_text(header.get('commentsCount')) or None
+
+
+def fetch_comment_count(driver, continuation, timeout=10):
+    """
+    Requests the header of the comments section from the opened watch page.
+
+    Returns:
+        str | None: Comment count text or None if the request failed.
+    """
+    try:
+        driver.set_script_timeout(timeout + 5)
+        endpoints = json.loads(driver.execute_async_script(COMMENTS_HEADER_SCRIPT, continuation, timeout * 1000))
+    except Exception as e:
+        logger.warning(f'Не удалось запросить количество комментариев: {e}.')
+        return None
+
+    if isinstance(endpoints, dict):
+        logger.warning(f'Не удалось запросить количество комментариев: {endpoints.get("error")}.')
+        return None
+    return parse_comments_header(endpoints)
+
+
+def resolve_comment_count(driver, initial_data, timeout=10):
+    """
+    Resolves the comment count of the opened watch page without scrolling to the comments section.
+
+    The count is taken from the initial data if it is there, otherwise from the comments continuation.
+    Sections without a continuation and with a message instead of comments are reported as disabled.
+
+    Returns:
+        str | None: Comment count text, COMMENTS_DISABLED, or None if it could not be resolved.
+    """
+    comment_count = get_comment_count(initial_data)
+    if comment_count:
+        return comment_count
+
+    continuation = get_comments_continuation(initial_data)
+    if continuation:
+        return fetch_comment_count(driver, continuation, timeout)
+    return None
+
+
+def get_comment_count(initial_data):
+    header = find_first(initial_data, 'commentsEntryPointHeaderRenderer')
+    if header and get_text(header.get('commentCount')):
+        return get_text(header['commentCount'])
+
+    section = _get_comments_section(initial_data)
+    if section and not get_comments_continuation(initial_data) and find_first(section, 'messageRenderer'):
+        return COMMENTS_DISABLED
+
+    for panel in find_values(initial_data, 'engagementPanelSectionListRenderer'):
+        if panel.get('panelIdentifier') != 'engagement-panel-comments-section':
+            continue
+        title_header = find_first(panel.get('header', {}), 'engagementPanelTitleHeaderRenderer') or {}
+        comment_count = get_text(title_header.get('contextualInfo'))
+        if comment_count:
+            return comment_count
+    return None
+
+
+def parse_watch_data(initial_data, player_response, video_id=None):
+    """
+    Extracts Video fields from ytInitialData and ytInitialPlayerResponse.
+
+    Fields that are missing in the data are absent from the result, so they can be collected with CSS getters.
+    A video whose player reports an error gets only a 'status' key.
+
+    Args:
+        initial_data(dict): ytInitialData of the watch page.
+        player_response(dict): ytInitialPlayerResponse of the watch page.
+        video_id(str, optional): Expected video ID. Data of another video (stale page) is ignored.
+
+    Returns:
+        dict: Field name -> value.
+    """
+    video_details = player_response.get('videoDetails') or {}
+    if video_id and video_details.get('videoId') and video_details['videoId'] != video_id:
+        logger.warning(f'ytInitialData относится к другому видео ({video_details["videoId"]}), пропускаю.')
+        return {}
+
+    playability_status = (player_response.get('playabilityStatus') or {}).get('status')
+    if playability_status in PLAYABILITY_STATUSES:
+        return {'status': PLAYABILITY_STATUSES[playability_status]}
+
+    primary_info = find_first(initial_data, 'videoPrimaryInfoRenderer') or {}
+    secondary_info = find_first(initial_data, 'videoSecondaryInfoRenderer') or {}
+    microformat = (player_response.get('microformat') or {}).get('playerMicroformatRenderer') or {}
+    video_fields = {}
+
+    view_count = find_first(primary_info, 'videoViewCountRenderer') or {}
+    video_fields['views'] = get_text(view_count.get('viewCount')) or video_details.get('viewCount')
+
+    like_count = find_first(initial_data, 'likeCountIfIndifferentNumber')
+    video_fields['likes'] = _format_number(like_count) if like_count and like_count.isdigit() else None
+
+    video_fields['name'] = video_details.get('title') or get_text(primary_info.get('title'))
+    video_fields['release_date'] = get_text(primary_info.get('dateText')) or microformat.get('publishDate')
+    video_fields['comments'] = get_comment_count(initial_data)
+    video_fields['description'] = (
+        video_details.get('shortDescription') or get_text(secondary_info.get('attributedDescription'))
+    )
+    video_fields['channel'] = video_details.get('author') or get_text(
+        (find_first(secondary_info, 'videoOwnerRenderer') or {}).get('title')
+    )
+
+    return {name: value for name, value in video_fields.items() if value}
+
+
+def _get_url(renderer):
+    url = ((renderer.get('navigationEndpoint') or {}).get('commandMetadata') or {}).get('webCommandMetadata', {}).get('url')
+    if url:
+        return urljoin(YOUTUBE_URL, url)
+    return f'{YOUTUBE_URL}/watch?v={renderer["videoId"]}' if renderer.get('videoId') else ''
+
+
+def _get_thumbnail(renderer):
+    thumbnails = (renderer.get('thumbnail') or {}).get('thumbnails') or []
+    return thumbnails[-1].get('url', '') if thumbnails else ''
+
+
+def _get_views(renderer):
+    return get_text(renderer.get('shortViewCountText')) or get_text(renderer.get('viewCountText'))
+
+
+def parse_search_items(initial_data):
+    """
+    Extracts search results from the search page data.
+
+    Only videos placed directly in the result sections are returned, like the 'search_all_videos' selector does.
+
+    Returns:
+        list[dict]: Fields named like SearchVideo.search_video_functions.
+    """
+    search_results = find_first(initial_data, 'twoColumnSearchResultsRenderer') or {}
+    return _parse_search_sections(find_first(search_results, 'sectionListRenderer', {}).get('contents', []))
+
+
+def parse_search_continuation(response):
+    """
+    Extracts search results and the next continuation token from a youtubei/v1/search continuation response.
+
+    Returns:
+        tuple[list[dict], str | None]: Search results and the token of the next page.
+    """
+    sections = []
+    for action in find_values(response.get('onResponseReceivedCommands', []), 'appendContinuationItemsAction'):
+        sections.extend(action.get('continuationItems', []))
+    return _parse_search_sections(sections), get_search_continuation(sections)
+
+
+def get_search_continuation(data):
+    """
+    Returns the token of the next search results page.
+    """
+    continuation_item = find_first(data, 'continuationItemRenderer') or {}
+    return (find_first(continuation_item, 'continuationCommand') or {}).get('token')
+
+
+def _parse_search_sections(sections):
+    items = []
+    for section in sections:
+        for content in (section.get('itemSectionRenderer') or {}).get('contents', []):
+            renderer = content.get('videoRenderer')
+            if not renderer:
+                continue
+            owner = (renderer.get('ownerText') or {}).get('runs') or [{}]
+            owner_url = (
+                owner[0].get('navigationEndpoint', {}).get('commandMetadata', {}).get('webCommandMetadata', {}).get('url')
+            )
+            items.append({
+                'name': get_text(renderer.get('title')),
+                'url': _get_url(renderer),
+                'views': _get_views(renderer),
+                'release_date': get_text(renderer.get('publishedTimeText')),
+                'channel_name': owner[0].get('text', ''),
+                'channel_url': urljoin(YOUTUBE_URL, owner_url) if owner_url else '',
+                'preview': _get_thumbnail(renderer)
+            })
+    return items
+
+
+def parse_channel_video_items(initial_data):
+    """
+    Extracts videos of the selected channel tab.
+
+    Returns:
+        list[dict]: Fields named like ChannelVideo.video_functions. Empty if the selected tab has no video grid.
+    """
+    tabs = find_first(initial_data, 'twoColumnBrowseResultsRenderer', {}).get('tabs', [])
+    selected_tab = next(
+        (tab['tabRenderer'] for tab in tabs if tab.get('tabRenderer', {}).get('selected')), {}
+    )
+    grid = find_first(selected_tab.get('content', {}), 'richGridRenderer', {})
+
+    items = []
+    for content in grid.get('contents', []):
+        renderer = find_first(content.get('richItemRenderer', {}), 'videoRenderer')
+        if not renderer:
+            continue
+        items.append({
+            'title': get_text(renderer.get('title')),
+            'url': _get_url(renderer),
+            'views': _get_views(renderer),
+            'release_date': get_text(renderer.get('publishedTimeText')),
+            'preview': _get_thumbnail(renderer)
+        })
+    return items
@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+JOB_MODES = (
+    'search',
+    'video_info',
+    'shorts_info',
+    'video_all',
+    'channel_info',
+    'channel_video',
+    'channel_shorts',
+    'channel_all',
+)
+CHANNEL_FILTERS = {'popular': '1', 'old': '2'}
+# Modes that collect Video info, where snapshot mode needs a single driver.
+VIDEO_INFO_MODES = ('video_info', 'video_all')
+
+DEFAULT_JOB_SPEC = {
+    'fields': None,
+    'filters': [],
+    'search_request': None,
+    'input': None,
+    'output': None,
+    'max_items': None,
+    'until_date': None,
+    'workers': 1,
+    'resume': False,
+    'incremental': False,
+    'snapshot': False,
+    'http': False,
+}
+
+
+def load_job_spec(filepath):
+    """
+    Loads a job spec from a YAML or JSON file.
+
+    Example:
+        mode: channel_video
+        input: channel_scraper_input_data/channel_links.json
+        fields: [title, url, views]
+        filters: [popular]
+        max_items: 100
+
+    Returns:
+        dict: Validated job spec with defaults filled in.
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        if os.path.splitext(filepath)[1].lower() in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError('Для чтения YAML-заданий установите PyYAML: pip install pyyaml')
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+
+    if not isinstance(spec, dict):
+        raise ValueError(f'Задание {filepath} должно быть словарём параметров.')
+    return validate_job_spec(spec, filepath)
+
+
+def validate_job_spec(spec, source='командной строки'):
+    unknown_keys = set(spec) - set(DEFAULT_JOB_SPEC) - {'mode'}
+    if unknown_keys:
+        raise ValueError(f'Неизвестные параметры задания из {source}: {", ".join(sorted(unknown_keys))}.')
+
+    spec = {**DEFAULT_JOB_SPEC, **spec}
+
+    if spec.get('mode') not in JOB_MODES:
+        raise ValueError(f'Некорректный режим задания из {source}: {spec.get("mode")}. '
+                         f'Доступные режимы: {", ".join(JOB_MODES)}.')
+
+    if spec['mode'] == 'search':
+        spec['search_requests'] = get_search_requests(spec)
+        if not spec['search_requests']:
+            raise ValueError(f'Для режима search в задании из {source} не указан search_request или input.')
+    elif not spec['input']:
+        raise ValueError(f'Для режима {spec["mode"]} в задании из {source} не указан input.')
+
+    if isinstance(spec['fields'], str):
+        spec['fields'] = spec['fields'].split()
+    if isinstance(spec['filters'], str):
+        spec['filters'] = spec['filters'].split()
+    spec['filters'] = spec['filters'] or []
+
+    if spec['mode'] == 'search':
+        # A list of lists is a set of filter combinations, each one searched separately.
+        combination_count = sum(isinstance(filter_names, list) for filter_names in spec['filters'])
+        if combination_count and combination_count != len(spec['filters']):
+            raise ValueError(f'Фильтры поиска в задании из {source} должны быть списком имён или списком списков.')
+        spec['filter_combinations'] = spec['filters'] if combination_count else [spec['filters']]
+
+    if spec['mode'].startswith('channel'):
+        if len(spec['filters']) > 1 or any(name not in CHANNEL_FILTERS for name in spec['filters']):
+            raise ValueError(f'Для каналов доступен один фильтр: {", ".join(CHANNEL_FILTERS)}.')
+        spec['channel_filter'] = CHANNEL_FILTERS[spec['filters'][0]] if spec['filters'] else None
+
+    spec['until_date'] = parse_until_date(spec['until_date'])
+    spec['workers'] = int(spec['workers'])
+    if spec['snapshot'] and spec['workers'] > 1 and spec['mode'] in VIDEO_INFO_MODES:
+        raise ValueError(f'Режим снимков в задании из {source} работает только с одним драйвером: укажите workers: 1.')
+    return spec
+
+
+def get_search_requests(spec):
+    """
+    Search requests of the job: search_request (a string or a list) followed by the requests from input,
+    a text file with one request per line or a JSON list. Repeated requests are dropped.
+
+    Returns:
+        list[str]: Search requests in the given order.
+    """
+    search_requests = spec['search_request'] or []
+    if isinstance(search_requests, str):
+        search_requests = [search_requests]
+    search_requests = list(search_requests)
+
+    if spec['input']:
+        with open(spec['input'], 'r', encoding='utf-8') as f:
+            if os.path.splitext(spec['input'])[1].lower() == '.json':
+                search_requests.extend(json.load(f))
+            else:
+                search_requests.extend(f.read().splitlines())
+
+    return list(dict.fromkeys(request.strip() for request in search_requests if request and request.strip()))
+
+
+def parse_until_date(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'Некорректная дата until_date: {value}. Ожидается формат ГГГГ-ММ-ДД.')
@@ -7,29 +7,42 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
+from utils.string_utils import parse_relative_date, extract_video_id
+from utils.timing_utils import record_timing
 
 
 logger = logging.getLogger(__name__)
 
 def click_element_css(driver, css_selectors, selector_key, timeout=1):
+    """
+    Returns:
+        bool: True if the element was clicked, False if it did not become clickable in time.
+    """
     try:
         element = WebDriverWait(driver, timeout).until(
             EC.element_to_be_clickable((By.CSS_SELECTOR, css_selectors[selector_key]))
         )
         ActionChains(driver).move_to_element(element).click().perform()
         logging.info(f'Клик на элемент {selector_key} выполнен успешно.')
+        return True
     except TimeoutException:
         logging.warning(f'Не удалось кликнуть на элемент {selector_key}.')
+        return False
 
 def click_element_xpath(driver, xpath, key, timeout=1):
-    try:
-        element = WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((By.XPATH, xpath[key]))
-        )
-        ActionChains(driver).move_to_element(element).click().perform()
-        logging.info(f'Клик на элемент {key} выполнен успешно.')
-    except TimeoutException:
+    """
+    Clicks the first element matched by the XPath fallbacks of key in a SelectorRegistry.
+
+    Returns:
+        bool: True if the element was clicked, False if it was not found in time.
+    """
+    element = xpath.wait_for(driver, key, timeout)
+    if element is None:
         logging.warning(f'Не удалось кликнуть на элемент {key}.')
+        return False
+    ActionChains(driver).move_to_element(element).click().perform()
+    logging.info(f'Клик на элемент {key} выполнен успешно.')
+    return True
 
 def sending_request(driver, search_request):
     ActionChains(driver).send_keys(search_request).perform()
@@ -45,4 +58,164 @@ def scroll_selenium_keys(driver):
         if new_height == last_height:
             print('Страница прокручена до конца!')
             break
-        last_height = new_height
\ No newline at end of file
+        last_height = new_height
+
+SCROLL_AND_WAIT_SCRIPT = r"""
+const [itemSelector, dateSelector, urlSelector, stopVideoId, previousCount, timeoutMs, done] = arguments;
+const videoId = (href) => {
+    const match = (href || '').match(/(?:[?&]v=|\/shorts\/)([\w-]{11})/);
+    return match ? match[1] : null;
+};
+const state = () => {
+    const items = document.querySelectorAll(itemSelector);
+    let lastDate = '';
+    if (dateSelector && items.length) {
+        const dateElement = items[items.length - 1].querySelector(dateSelector);
+        lastDate = dateElement ? (dateElement.innerText || dateElement.textContent || '').trim() : '';
+    }
+    let stopFound = false;
+    if (urlSelector && stopVideoId) {
+        for (let i = Math.max(0, previousCount - 1); i < items.length && !stopFound; i++) {
+            const link = items[i].querySelector(urlSelector);
+            stopFound = !!link && videoId(link.href) === stopVideoId;
+        }
+    }
+    return {count: items.length, lastDate: lastDate, stopFound: stopFound};
+};
+window.scrollTo(0, document.documentElement.scrollHeight);
+let current = state();
+if (current.count > previousCount) {
+    done(current);
+    return;
+}
+const observer = new MutationObserver(() => {
+    current = state();
+    if (current.count > previousCount) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(current);
+    }
+});
+const timer = setTimeout(() => {
+    observer.disconnect();
+    done(state());
+}, timeoutMs);
+observer.observe(document.body, {childList: true, subtree: true});
+"""
+
+
+def scroll_to_load_items(
+        driver,
+        css_selectors,
+        item_key,
+        max_items=None,
+        until_date=None,
+        date_key=None,
+        stop_url=None,
+        url_key=None,
+        idle_timeout=5
+):
+    """
+    Scrolls an infinite-scroll page until no more items are loaded or a stop condition is met.
+
+    Every step jumps to the bottom of the document and waits (via MutationObserver) only until
+    the number of items matched by item_key grows.
+
+    Args:
+        driver: WebDriver instance.
+        css_selectors(dict): CSS selectors from css_selectors.json.
+        item_key(str): Key of the selector matching every loaded item.
+        max_items(int, optional): Stop once at least this many items are loaded.
+        until_date(datetime, optional): Stop once the last loaded item is older than this date.
+        date_key(str, optional): Key of the selector with the release date inside an item. Required for until_date.
+        stop_url(str, optional): Stop once an item linking to this video is loaded.
+        url_key(str, optional): Key of the selector with the video link inside an item. Required for stop_url.
+        idle_timeout(float, optional): Seconds to wait for new items before treating the page as fully loaded.
+
+    Returns:
+        int: Number of loaded items.
+    """
+    date_selector = css_selectors[date_key] if until_date and date_key else None
+    url_selector = css_selectors[url_key] if stop_url and url_key else None
+    stop_video_id = extract_video_id(stop_url)
+    driver.set_script_timeout(idle_timeout + 5)
+
+    start = time.perf_counter()
+    count = 0
+    while True:
+        state = driver.execute_async_script(
+            SCROLL_AND_WAIT_SCRIPT,
+            css_selectors[item_key],
+            date_selector,
+            url_selector,
+            stop_video_id,
+            count,
+            int(idle_timeout * 1000)
+        )
+        if state['count'] <= count:
+            logger.info(f'Страница прокручена до конца, загружено {count} элементов {item_key}.')
+            break
+        count = state['count']
+
+        if state['stopFound']:
+            logger.info(f'Загружено {count} элементов {item_key}, найдено последнее известное видео.')
+            break
+
+        if max_items and count >= max_items:
+            logger.info(f'Загружено {count} элементов {item_key}, достигнут лимит {max_items}.')
+            break
+
+        last_date = parse_relative_date(state['lastDate'])
+        if date_selector and last_date and last_date < until_date:
+            logger.info(f'Загружено {count} элементов {item_key}, достигнута дата {until_date:%d.%m.%Y}.')
+            break
+    record_timing(f'scroll.{item_key}', time.perf_counter() - start)
+    return count
+
+
+def iter_limited_items(items_data, max_items=None, until_date=None, stop_url=None, date_field='release_date', url_field='url'):
+    """
+    Yields loaded items up to the scroll stop condition.
+
+    Items older than until_date are dropped only when their date field was collected and could be parsed.
+    With stop_url, the item linking to that video and everything after it are dropped.
+    """
+    stop_video_id = extract_video_id(stop_url)
+    yielded = 0
+    for item in items_data:
+        if max_items and yielded >= max_items:
+            break
+        if stop_video_id and extract_video_id(item.get(url_field, '')) == stop_video_id:
+            break
+        if until_date and (parse_relative_date(item.get(date_field, '')) or until_date) < until_date:
+            continue
+        yielded += 1
+        yield item
+
+
+def limit_loaded_items(items_data, max_items=None, until_date=None, stop_url=None, date_field='release_date', url_field='url'):
+    return list(iter_limited_items(items_data, max_items, until_date, stop_url, date_field, url_field))
+
+
+def limit_first_page_items(items_data, max_items=None, until_date=None, stop_url=None):
+    """
+    Applies the scroll stop conditions to the items of the first page, e.g. parsed from ytInitialData.
+
+    Returns:
+        list | None: Limited items, or None if the stop condition is not reached on the first page
+            and more items have to be loaded by scrolling.
+    """
+    if not items_data:
+        return None
+
+    limited_items = limit_loaded_items(items_data, max_items, until_date, stop_url)
+    stop_video_id = extract_video_id(stop_url)
+    last_date = parse_relative_date(items_data[-1].get('release_date', ''))
+
+    if max_items and len(limited_items) >= max_items:
+        return limited_items
+    if stop_video_id and any(extract_video_id(item.get('url', '')) == stop_video_id for item in items_data):
+        return limited_items
+    if until_date and last_date and last_date < until_date:
+        return limited_items
+    return None
@@ -0,0 +1,193 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+logger = logging.getLogger(__name__)
+
+PROXY_TEST_URL = 'https://www.youtube.com/robots.txt'
+
+
+def check_proxy(proxy, test_url=PROXY_TEST_URL, timeout=5):
+    """
+    Checks a SOCKS5 proxy "host:port" with one request.
+
+    Returns:
+        float | None: Response time in seconds, or None if the proxy does not work.
+    """
+    proxies = {
+        'http': f'socks5://{proxy}',
+        'https': f'socks5://{proxy}'
+    }
+    started_at = time.monotonic()
+    try:
+        response = requests.get(test_url, proxies=proxies, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logger.debug(f'Прокси {proxy} не работает: {e}.')
+        return None
+    return time.monotonic() - started_at
+
+
+def load_proxies(filepath):
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+class ProxyStats:
+    def __init__(self):
+        self.latency = None
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.in_use = 0
+
+    def add_success(self, latency=None):
+        """
+        latency has to be comparable to check_proxy() response times, e.g. of a single small request.
+        """
+        self.successes += 1
+        self.consecutive_failures = 0
+        if latency is not None:
+            self.latency = latency if self.latency is None else 0.7 * self.latency + 0.3 * latency
+
+    def add_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+
+    @property
+    def score(self):
+        """
+        Lower is better: average latency, penalized by the share of failed requests.
+        """
+        total = self.successes + self.failures
+        failure_rate = self.failures / total if total else 0
+        return (self.latency or 10.0) * (1 + 4 * failure_rate)
+
+
+class ProxyPool:
+    """
+    Pool of SOCKS5 proxies checked concurrently and handed out by score.
+
+    Every driver or HTTP worker gets the least used proxy with the best score. A proxy that
+    fails max_failures times in a row is rotated out until the next check.
+    """
+
+    def __init__(self, proxies, test_url=PROXY_TEST_URL, timeout=5, max_workers=100, max_failures=3):
+        self.test_url = test_url
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.max_failures = max_failures
+        self.stats = {proxy: ProxyStats() for proxy in dict.fromkeys(proxies)}
+        self.lock = threading.Lock()
+        self.check_lock = threading.Lock()
+
+    def check_all(self, proxies=None):
+        proxies = list(self.stats) if proxies is None else list(proxies)
+        if not proxies:
+            return 0
+
+        logger.info(f'Проверяю {len(proxies)} прокси...')
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(proxies))) as executor:
+            latencies = list(executor.map(lambda proxy: check_proxy(proxy, self.test_url, self.timeout), proxies))
+
+        with self.lock:
+            for proxy, latency in zip(proxies, latencies):
+                if latency is None:
+                    self.stats[proxy].consecutive_failures = self.max_failures
+                else:
+                    self.stats[proxy].consecutive_failures = 0
+                    self.stats[proxy].latency = latency
+            healthy_count = sum(1 for proxy in proxies if self._is_healthy(proxy))
+        logger.info(f'Рабочих прокси: {healthy_count} из {len(proxies)}.')
+        return healthy_count
+
+    def _is_healthy(self, proxy):
+        return self.stats[proxy].consecutive_failures < self.max_failures
+
+    def is_healthy(self, proxy):
+        with self.lock:
+            return proxy not in self.stats or self._is_healthy(proxy)
+
+    def _pick(self):
+        healthy_proxies = [proxy for proxy in self.stats if self._is_healthy(proxy)]
+        if not healthy_proxies:
+            return None
+        proxy = min(healthy_proxies, key=lambda proxy: (self.stats[proxy].in_use, self.stats[proxy].score))
+        self.stats[proxy].in_use += 1
+        return proxy
+
+    def acquire(self):
+        """
+        Returns:
+            str | None: The best available proxy, or None if no proxy works even after a recheck.
+        """
+        with self.lock:
+            proxy = self._pick()
+        if proxy is None:
+            # One thread rechecks the list, the others wait for it and take a proxy from its result.
+            with self.check_lock:
+                with self.lock:
+                    proxy = self._pick()
+                if proxy is None:
+                    logger.warning('Рабочих прокси не осталось. Перепроверяю весь список.')
+                    self.check_all()
+                    with self.lock:
+                        proxy = self._pick()
+        if proxy is None:
+            logger.error('Нет ни одного рабочего прокси. Работаю без прокси.')
+        return proxy
+
+    def release(self, proxy):
+        with self.lock:
+            if proxy in self.stats and self.stats[proxy].in_use:
+                self.stats[proxy].in_use -= 1
+
+    def report_success(self, proxy, latency=None):
+        with self.lock:
+            if proxy in self.stats:
+                self.stats[proxy].add_success(latency)
+
+    def report_failure(self, proxy):
+        with self.lock:
+            if proxy not in self.stats:
+                return
+            self.stats[proxy].add_failure()
+            if not self._is_healthy(proxy):
+                logger.warning(f'Прокси {proxy} исключён из ротации после {self.max_failures} сбоев подряд.')
+
+
+_proxy_pool = None
+
+
+def set_proxy_pool(proxy_pool):
+    global _proxy_pool
+    _proxy_pool = proxy_pool
+
+
+def get_proxy_pool():
+    return _proxy_pool
+
+
+def is_pool_proxy_healthy(proxy):
+    return _proxy_pool is None or not proxy or _proxy_pool.is_healthy(proxy)
+
+
+def acquire_pool_proxy():
+    return _proxy_pool.acquire() if _proxy_pool is not None else None
+
+
+def release_pool_proxy(proxy):
+    if _proxy_pool is not None and proxy:
+        _proxy_pool.release(proxy)
+
+
+def report_proxy_success(proxy, latency=None):
+    if _proxy_pool is not None and proxy:
+        _proxy_pool.report_success(proxy, latency)
+
+
+def report_proxy_failure(proxy):
+    if _proxy_pool is not None and proxy:
+        _proxy_pool.report_failure(proxy)
@@ -0,0 +1,166 @@
+import logging
+import threading
+from selenium.common import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from utils.file_utils import load_json_file
+from utils.wait_utils import POLL_FREQUENCY
+
+logger = logging.getLogger(__name__)
+
+SELECTOR_TYPES = ('css', 'xpath')
+
+# Tries the candidates of one key in order and returns the first match with its index.
+FIND_CANDIDATE_SCRIPT = """
+const [candidates, byXpath, visibleOnly] = arguments;
+for (let index = 0; index < candidates.length; index++) {
+    let element = null;
+    try {
+        element = byXpath
+            ? document.evaluate(candidates[index], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+            : document.querySelector(candidates[index]);
+    } catch (e) {
+        continue;
+    }
+    if (element && (!visibleOnly || element.getClientRects().length)) {
+        return [element, index];
+    }
+}
+return null;
+"""
+
+VALIDATE_SCRIPT = """
+const [selectors, byXpath] = arguments;
+const invalid = [];
+for (const selector of selectors) {
+    try {
+        if (byXpath) {
+            document.createExpression(selector);
+        } else {
+            document.createDocumentFragment().querySelector(selector);
+        }
+    } catch (e) {
+        invalid.push(selector);
+    }
+}
+return invalid;
+"""
+
+
+class SelectorRegistry(dict):
+    """
+    Selectors of css_selectors.json or search_filters.json, where a key maps to one selector or to
+    an ordered list of fallbacks.
+
+    Indexing a key returns its preferred candidate: the one that matched last time in find(), otherwise
+    the first one. A joined selector would match in document order, so a fallback could beat the primary
+    selector. find() and wait_for() try all candidates in priority order within a single script call.
+    any_of() joins the candidates for presence checks, where any match will do.
+    """
+
+    def __init__(self, selectors, selector_type='css'):
+        if selector_type not in SELECTOR_TYPES:
+            raise ValueError(f'Неизвестный тип селекторов: {selector_type}.')
+        self.selector_type = selector_type
+        self.candidates = {}
+        for key, value in selectors.items():
+            candidates = [value] if isinstance(value, str) else value
+            if not candidates or not all(isinstance(candidate, str) and candidate for candidate in candidates):
+                raise ValueError(f'Селектор {key} должен быть непустой строкой или списком строк.')
+            self.candidates[key] = list(candidates)
+        self.separator = ' | ' if selector_type == 'xpath' else ', '
+        super().__init__({key: candidates[0] for key, candidates in self.candidates.items()})
+        self.preferred = {}
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        # Registries are pickled into the snapshot parser processes. The lock is recreated there.
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __getitem__(self, key):
+        return self.get_candidates(key)[0]
+
+    def any_of(self, key):
+        """
+        Returns:
+            str: All candidates of the key as one selector (a CSS selector list or an XPath union).
+        """
+        return self.separator.join(self.candidates[key])
+
+    def get_candidates(self, key):
+        """
+        Returns:
+            list[str]: Candidates of the key, the one that matched last time first.
+        """
+        candidates = self.candidates[key]
+        preferred = self.preferred.get(key)
+        if preferred is None or preferred not in candidates:
+            return candidates
+        return [preferred] + [candidate for candidate in candidates if candidate != preferred]
+
+    def find(self, driver, key, visible=False):
+        """
+        Returns:
+            WebElement | None: First element matched by the candidates of the key, or None.
+        """
+        candidates = self.get_candidates(key)
+        result = driver.execute_script(FIND_CANDIDATE_SCRIPT, candidates, self.selector_type == 'xpath', visible)
+        if not result:
+            return None
+        element, index = result
+        if len(candidates) > 1:
+            with self.lock:
+                if self.preferred.get(key) != candidates[index]:
+                    logger.debug(f'Для {key} сработал селектор {candidates[index]}.')
+                    self.preferred[key] = candidates[index]
+        return element
+
+    def wait_for(self, driver, key, timeout, visible=False):
+        """
+        Waits until any candidate of the key matches. The timeout is shared by all candidates.
+
+        Returns:
+            WebElement | None: Matched element, or None after the timeout.
+        """
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+                lambda current_driver: self.find(current_driver, key, visible)
+            )
+        except TimeoutException:
+            return None
+
+    def validate(self, driver):
+        """
+        Checks the syntax of every candidate in the browser and logs the broken ones.
+
+        Returns:
+            list[str]: Keys with at least one invalid candidate.
+        """
+        all_candidates = [candidate for candidates in self.candidates.values() for candidate in candidates]
+        invalid = set(driver.execute_script(VALIDATE_SCRIPT, all_candidates, self.selector_type == 'xpath'))
+        invalid_keys = [
+            key for key, candidates in self.candidates.items() if any(candidate in invalid for candidate in candidates)
+        ]
+        for key in invalid_keys:
+            logger.error(f'Некорректный селектор {key}: {self.candidates[key]}.')
+        return invalid_keys
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def load_selectors(filepath, selector_type='css'):
+    """
+    Loads a selector file once per process. Later calls return the same registry with its
+    last-success memory.
+    """
+    with _registries_lock:
+        if filepath not in _registries:
+            _registries[filepath] = SelectorRegistry(load_json_file(filepath), selector_type)
+        return _registries[filepath]
@@ -0,0 +1,57 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelStateStore:
+    """
+    Local store of the newest scraped video URL per channel, used by incremental channel scraping.
+
+    Every channel has its own state file, so jobs running in parallel processes never overwrite each
+    other's state. Shared by the drivers of the channel pipeline, so updates are serialized.
+    State of older runs, kept in one last_seen.json, is still read for channels without a state file.
+    """
+
+    def __init__(self, state_dir='channel_scraper_state'):
+        self.state_dir = state_dir
+        self.legacy_state = self._load_legacy()
+        self.lock = threading.Lock()
+
+    def _load_legacy(self):
+        legacy_file = os.path.join(self.state_dir, 'last_seen.json')
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            logger.info(f'Загружено состояние {len(state)} каналов из {legacy_file}.')
+            return state
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f'Не удалось загрузить состояние каналов из {legacy_file}: {e}.')
+            return {}
+
+    def _get_state_file(self, channel_name):
+        return os.path.join(self.state_dir, 'channels', f'{channel_name}.json')
+
+    def get_last_seen(self, channel_name):
+        state_file = self._get_state_file(channel_name)
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)['last_seen']
+        except FileNotFoundError:
+            return self.legacy_state.get(channel_name)
+        except (OSError, KeyError, json.JSONDecodeError) as e:
+            logger.error(f'Не удалось загрузить состояние канала из {state_file}: {e}.')
+            return self.legacy_state.get(channel_name)
+
+    def set_last_seen(self, channel_name, video_url):
+        state_file = self._get_state_file(channel_name)
+        with self.lock:
+            os.makedirs(os.path.dirname(state_file), exist_ok=True)
+            tmp_file = f'{state_file}.{os.getpid()}.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'last_seen': video_url}, f, ensure_ascii=False, indent=4)
+            os.replace(tmp_file, state_file)
@@ -1,3 +1,5 @@
+import re
+from datetime import datetime, timedelta
 
 
 def extract_channel_name(text):
@@ -7,4 +9,89 @@ def extract_channel_name(text):
         channel_name = channel_name.strip()
         return channel_name
     else:
-        return None
\ No newline at end of file
+        return None
+
+RELATIVE_DATE_UNITS = {
+    'секунд': timedelta(seconds=1),
+    'минут': timedelta(minutes=1),
+    'час': timedelta(hours=1),
+    'дн': timedelta(days=1),
+    'день': timedelta(days=1),
+    'недел': timedelta(weeks=1),
+    'месяц': timedelta(days=30),
+    'год': timedelta(days=365),
+    'лет': timedelta(days=365),
+    'second': timedelta(seconds=1),
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+    'month': timedelta(days=30),
+    'year': timedelta(days=365),
+}
+
+RELATIVE_DATE_PATTERN = re.compile(r'(\d+)\s+(' + '|'.join(RELATIVE_DATE_UNITS) + r')', re.IGNORECASE)
+
+
+def parse_relative_date(text, now=None):
+    """
+    Converts a relative YouTube date like "3 дня назад" or "2 weeks ago" to an approximate datetime.
+
+    Args:
+        text(str): Release date text from the page.
+        now(datetime, optional): Reference time. Defaults to the current time.
+
+    Returns:
+        datetime | None: Approximate release datetime or None if the text could not be parsed.
+    """
+    if not text:
+        return None
+    match = RELATIVE_DATE_PATTERN.search(text)
+    if not match:
+        return None
+    now = now or datetime.now()
+    return now - int(match.group(1)) * RELATIVE_DATE_UNITS[match.group(2).lower()]
+
+
+VIDEO_ID_PATTERN = re.compile(r'(?:[?&]v=|/shorts/|youtu\.be/|/live/)([\w-]{11})')
+
+
+def extract_video_id(url):
+    """
+    Extracts the 11-character video ID from watch, Shorts, live and youtu.be URLs.
+
+    Returns:
+        str | None: Video ID or None if the URL does not contain one.
+    """
+    if not url:
+        return None
+    match = VIDEO_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def parse_video_likes(aria_label):
+    """
+    Converts the aria-label of the Video like button ("Видео понравилось вам и ещё 1 234 пользователям")
+    to the number of likes formatted like "1.234".
+
+    Returns:
+        str | None: Number of likes or None if the label could not be parsed.
+    """
+    if not aria_label:
+        return None
+    if 'одному пользователю' in aria_label:
+        return '0'
+
+    match = re.search(r"и ещё ([\d\s\xa0]+)", aria_label)
+    if not match:
+        return None
+
+    likes_str = match.group(1).replace("\xa0", "").replace(" ", "")
+    if "тыс" in aria_label:
+        likes = int(likes_str) * 1000
+    elif "млн" in aria_label:
+        likes = int(likes_str) * 1000000
+    else:
+        likes = int(likes_str)
+
+    return "{:,}".format(likes).replace(",", ".")
@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class TimingRegistry:
+    """
+    Thread-safe collection of stage durations, e.g. 'driver.get', 'wait.video_title', 'field.video.likes'.
+    """
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started_at)
+
+    def summary(self):
+        """
+        Returns:
+            dict: Stage -> count, total, p50, p95 and max in seconds, sorted by total time.
+        """
+        with self.lock:
+            samples = {stage: sorted(values) for stage, values in self.samples.items()}
+
+        stage_summary = {
+            stage: {
+                'count': len(values),
+                'total': round(sum(values), 4),
+                'p50': round(_percentile(values, 50), 4),
+                'p95': round(_percentile(values, 95), 4),
+                'max': round(values[-1], 4)
+            }
+            for stage, values in samples.items()
+        }
+        return dict(sorted(stage_summary.items(), key=lambda item: item[1]['total'], reverse=True))
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.started_at = time.time()
+
+
+timings = TimingRegistry()
+
+
+def timed(stage):
+    """
+    Context manager that records the duration of the block under stage in the run registry.
+    """
+    return timings.timed(stage)
+
+
+def timed_function(stage):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timings.timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_timing(stage, seconds):
+    timings.record(stage, seconds)
+
+
+def get_timing_summary():
+    return timings.summary()
+
+
+def save_timing_report(filepath, top_stages=10):
+    """
+    Writes the run summary to JSON and logs the stages that took the most time.
+    """
+    stage_summary = timings.summary()
+    report = {
+        'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timings.started_at)),
+        'duration': round(time.time() - timings.started_at, 2),
+        'stages': stage_summary
+    }
+
+    report_dir = os.path.dirname(filepath)
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+
+    logger.info(f'Отчёт о времени выполнения сохранён в {filepath}. Самые долгие этапы:')
+    for stage, stats in list(stage_summary.items())[:top_stages]:
+        logger.info(f'{stage}: всего {stats["total"]:.2f} с, {stats["count"]} раз, '
+                    f'p50 {stats["p50"]:.3f} с, p95 {stats["p95"]:.3f} с, max {stats["max"]:.3f} с.')
+    return report
@@ -0,0 +1,88 @@
+import logging
+import time
+
+from selenium.common import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from utils.timing_utils import record_timing
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WAIT_TIMEOUT = 10
+POLL_FREQUENCY = 0.1
+
+_wait_timeout = DEFAULT_WAIT_TIMEOUT
+
+
+def set_wait_timeout(timeout):
+    global _wait_timeout
+    _wait_timeout = timeout
+    logger.info(f'Максимальное время ожидания элементов: {timeout} с.')
+
+
+def get_wait_timeout():
+    return _wait_timeout
+
+
+def wait_for_selector(driver, css_selectors, selector_keys, timeout=None):
+    """
+    Waits until any of the given selectors is present on the page.
+
+    Args:
+        driver: WebDriver instance.
+        css_selectors(SelectorRegistry): CSS selectors from css_selectors.json.
+        selector_keys(str | list[str]): Readiness selector key or several alternative keys.
+        timeout(float, optional): Waiting ceiling in seconds. Defaults to the value set by set_wait_timeout.
+
+    Returns:
+        float: Time actually spent waiting, in seconds.
+    """
+    if isinstance(selector_keys, str):
+        selector_keys = [selector_keys]
+    timeout = _wait_timeout if timeout is None else timeout
+    selector = ', '.join(css_selectors.any_of(key) for key in selector_keys)
+
+    start = time.perf_counter()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+        )
+        waited = time.perf_counter() - start
+        logger.info(f'Элемент {"/".join(selector_keys)} появился через {waited:.2f} с.')
+    except TimeoutException:
+        waited = time.perf_counter() - start
+        logger.warning(f'Элемент {"/".join(selector_keys)} не появился за {waited:.2f} с.')
+    record_timing(f'wait.{"/".join(selector_keys)}', waited)
+    return waited
+
+
+def wait_for_refresh(driver, css_selectors, selector_key, old_elements, timeout=None):
+    """
+    Waits until the previously found elements are replaced by new ones, e.g. after a filter click.
+
+    Args:
+        driver: WebDriver instance.
+        css_selectors(dict): CSS selectors from css_selectors.json.
+        selector_key(str): Key of the selector matching the refreshed elements.
+        old_elements(list): Elements found before the action.
+        timeout(float, optional): Waiting ceiling in seconds. Defaults to the value set by set_wait_timeout.
+
+    Returns:
+        float: Time actually spent waiting, in seconds.
+    """
+    timeout = _wait_timeout if timeout is None else timeout
+
+    start = time.perf_counter()
+    if old_elements:
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(EC.staleness_of(old_elements[0]))
+        except TimeoutException:
+            logger.warning(f'Элементы {selector_key} не обновились за {timeout} с.')
+    remaining = max(0.0, timeout - (time.perf_counter() - start))
+    return (time.perf_counter() - start) + wait_for_selector(driver, css_selectors, selector_key, remaining)
+
+
+def get_current_elements(driver, css_selectors, selector_key):
+    return driver.find_elements(By.CSS_SELECTOR, css_selectors[selector_key])
@@ -1,24 +1,226 @@
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
 import undetected_chromedriver as uc
+from utils.proxy_pool_utils import acquire_pool_proxy, release_pool_proxy, report_proxy_failure
+from utils.timing_utils import timed
 
+logger = logging.getLogger(__name__)
+
+_patch_lock = threading.Lock()
+
+# uc starts the driver by this name on Windows, where a path without .exe is not found.
+DRIVER_EXECUTABLE_NAME = 'chromedriver.exe' if os.name == 'nt' else 'chromedriver'
+
+# Thumbnails, avatars, fonts, the video stream and ad/tracking requests are never read by the scrapers.
+# src/href attributes of blocked images are still set in the DOM.
+BLOCKED_URL_PATTERNS = [
+    '*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*.mp4', '*.webm', '*.m4a', '*googlevideo.com/videoplayback*',
+    '*i.ytimg.com/*', '*yt3.ggpht.com/*', '*yt3.googleusercontent.com/*', '*fonts.gstatic.com/*',
+    '*doubleclick.net/*', '*googlesyndication.com/*', '*googleadservices.com/*', '*google-analytics.com/*',
+    '*youtube.com/pagead/*', '*youtube.com/ptracking*', '*youtube.com/api/stats/*', '*youtube.com/youtubei/v1/log_event*',
+    '*youtube.com/generate_204*',
+]
+BLOCKED_CONTENT_SETTINGS = ('images', 'media_stream')
+# Also cleared from persistent profiles, where earlier runs set notifications and geolocation too.
+MANAGED_CONTENT_SETTINGS = BLOCKED_CONTENT_SETTINGS + ('notifications', 'geolocation')
+
+_block_resources = False
+
+
+def set_resource_blocking(enabled):
+    global _block_resources
+    _block_resources = enabled
+
+
+def enable_resource_blocking(driver, url_patterns=None):
+    """
+    Drops requests matching url_patterns at the network level through CDP.
+    """
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': url_patterns or BLOCKED_URL_PATTERNS})
+
+
+def get_chrome_major_version():
+    """
+    Returns:
+        int | None: Major version of the installed Chrome, or None if it cannot be determined.
+    """
+    browser_path = uc.find_chrome_executable()
+    if not browser_path:
+        return None
+    if os.name == 'nt':
+        # chrome.exe prints nothing for --version and may open a window, but is installed next to
+        # a directory named after its version.
+        return _get_version_dir_major(browser_path)
+    try:
+        output = subprocess.run([browser_path, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r'(\d+)\.\d+\.\d+', output)
+    return int(match.group(1)) if match else None
+
+
+def _get_version_dir_major(browser_path):
+    try:
+        versions = [name for name in os.listdir(os.path.dirname(browser_path)) if re.fullmatch(r'\d+(\.\d+){3}', name)]
+    except OSError:
+        return None
+    if not versions:
+        return None
+    return max(int(version.split('.')[0]) for version in versions)
+
+
+def _read_driver_version(version_file):
+    try:
+        with open(version_file, 'r', encoding='utf-8') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def reset_content_settings(profile_dir):
+    """
+    Removes the content settings managed by resource blocking from a persistent Chrome profile,
+    so Chrome falls back to the user's own settings.
+    """
+    prefs_file = os.path.join(profile_dir, 'Default', 'Preferences')
+    try:
+        # latin1, like undetected_chromedriver writes this file.
+        with open(prefs_file, 'r', encoding='latin1') as f:
+            prefs = json.load(f)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        logger.warning(f'Не удалось прочитать настройки профиля {prefs_file}: {e}.')
+        return
+
+    managed_settings = prefs.get('profile', {}).get('managed_default_content_settings')
+    if not isinstance(managed_settings, dict):
+        return
+    removed = [setting for setting in MANAGED_CONTENT_SETTINGS if managed_settings.pop(setting, None) is not None]
+    if not removed:
+        return
+    with open(prefs_file, 'w', encoding='latin1') as f:
+        json.dump(prefs, f)
+
+
+def prepare_driver_executable(executable_path):
+    """
+    Downloads and patches chromedriver once and keeps it at executable_path.
+
+    Drivers started with this path skip the download and only check that the binary is patched,
+    so several drivers can start in parallel. The major version of the driver is kept next to it,
+    and the driver is downloaded again once it no longer matches the installed Chrome.
+    """
+    executable_path = os.path.abspath(executable_path)
+    version_file = f'{executable_path}.version'
+    chrome_version = get_chrome_major_version()
+    if chrome_version is None:
+        logger.warning('Не удалось определить версию Chrome. Версия chromedriver не проверяется.')
+
+    with _patch_lock:
+        if os.path.exists(executable_path):
+            driver_version = _read_driver_version(version_file)
+            if chrome_version is None or driver_version == chrome_version:
+                uc.Patcher(executable_path=executable_path).auto()
+                return executable_path
+            logger.info(f'chromedriver в {executable_path} собран для Chrome {driver_version}, '
+                        f'установлен Chrome {chrome_version}. Скачиваю chromedriver заново.')
+
+        executable_dir = os.path.dirname(executable_path)
+        if executable_dir:
+            os.makedirs(executable_dir, exist_ok=True)
+        patcher = uc.Patcher(version_main=chrome_version or 0)
+        patcher.auto()
+        shutil.copy2(patcher.executable_path, executable_path)
+        with open(version_file, 'w', encoding='utf-8') as f:
+            f.write(str(patcher.version_main))
+        logger.info(f'Пропатченный chromedriver {patcher.version_main} сохранён в {executable_path}.')
+        return executable_path
+
+
+def setup_options_webdriver(
+        use_proxy=False,
+        proxy=None,
+        profile_dir=None,
+        driver_executable_path=None,
+        block_resources=None,
+        headless=False
+):
+    """
+    Without an explicit proxy the driver gets one from the proxy pool, if a pool is set.
+
+    Args:
+        profile_dir(str, optional): Persistent Chrome profile, keeps the HTTP cache and cookies between runs.
+            Without it the driver starts in guest mode.
+        driver_executable_path(str, optional): Already patched chromedriver, see prepare_driver_executable.
+        block_resources(bool, optional): Block images, media, fonts and trackers. Defaults to set_resource_blocking.
+        headless(bool, optional): Start Chrome without a window, e.g. for benchmarks.
+    """
+    if block_resources is None:
+        block_resources = _block_resources
+
+    pool_proxy = None
+    if not use_proxy and proxy is None:
+        pool_proxy = proxy = acquire_pool_proxy()
+        use_proxy = proxy is not None
 
-def setup_options_webdriver(use_proxy=False, proxy=None):
     options = uc.ChromeOptions()
     if use_proxy and proxy:
         proxy_string = f"--proxy-server=socks5://{proxy}"
         options.add_argument(proxy_string)
 
     options.add_argument("--lang=ru-RU")
-    options.add_argument("--guest")  # Гостевой режим (альтернатива инкогнито)
+    if headless:
+        # maximize_window has no screen to fill in headless mode.
+        options.add_argument('--window-size=1920,1080')
+    if not profile_dir:
+        options.add_argument("--guest")  # Гостевой режим (альтернатива инкогнито)
     options.add_argument(
         "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36"
     )
     options.add_argument("--disable-webrtc")
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_argument('--mute-audio')
+    if profile_dir:
+        # A persistent profile would otherwise keep the content settings of a previous run.
+        reset_content_settings(profile_dir)
+    if block_resources:
+        options.add_experimental_option('prefs', {
+            f'profile.managed_default_content_settings.{setting}': 2 for setting in BLOCKED_CONTENT_SETTINGS
+        })
 
-    driver = uc.Chrome(options=options)
+    try:
+        driver = uc.Chrome(
+            options=options,
+            user_data_dir=os.path.abspath(profile_dir) if profile_dir else None,
+            driver_executable_path=driver_executable_path,
+            headless=headless
+        )
+    except Exception:
+        report_proxy_failure(pool_proxy)
+        release_pool_proxy(pool_proxy)
+        raise
+    driver.pool_proxy = pool_proxy
     driver.maximize_window()
 
+    load_page = driver.get
+
+    def timed_get(url):
+        with timed('driver.get'):
+            load_page(url)
+
+    driver.get = timed_get
+
     driver.execute_script("delete navigator.webdriver;")
+    if block_resources:
+        enable_resource_blocking(driver)
 
     return driver
\ No newline at end of file
@@ -0,0 +1,280 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+TASK_KINDS = ('video_info', 'shorts_info', 'channel_video')
+DEFAULT_LEASE_SECONDS = 10 * 60
+DEFAULT_MAX_ATTEMPTS = 3
+
+Task = namedtuple('Task', 'id kind key payload attempts')
+
+
+def get_worker_id():
+    return f'{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}'
+
+
+@contextmanager
+def keep_lease(work_queue, task, worker_id):
+    """
+    Renews the lease of the task in the background every third of the lease time while the block runs.
+    """
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(work_queue.lease_seconds / 3):
+            if not work_queue.renew(task, worker_id):
+                logger.warning(f'{worker_id}: аренда задачи {task.kind} {task.key} потеряна.')
+                return
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+class SqliteWorkQueue:
+    """
+    Task queue and result sink in one SQLite file, shared by a coordinator and any number of workers.
+
+    A worker leases a task for lease_seconds. A task whose lease expired, e.g. because the worker died,
+    is handed out again, and after max_attempts leases it is marked failed. The file has to be on a disk
+    every worker can reach; leases use BEGIN IMMEDIATE, so one task is never leased twice at a time.
+
+    The file uses the rollback journal: WAL keeps its index in shared memory of one host and breaks on
+    network file systems. Over NFS or SMB, SQLite relies on the byte-range locks of the file system, so
+    the share must support them (e.g. NFS without the nolock mount option, SMB without cached locking).
+    Where locks are not reliable, keep the file on one machine and run all workers there.
+    """
+
+    def __init__(self, db_path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        # Also switches back files created in WAL mode.
+        self.connection.execute('PRAGMA journal_mode=DELETE')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS tasks ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, key TEXT NOT NULL, payload TEXT NOT NULL, '
+            "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+            'lease_owner TEXT, lease_expires REAL, result TEXT, error TEXT, updated_at REAL NOT NULL, '
+            'UNIQUE (kind, key))'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires)')
+        logger.info(f'Очередь задач {db_path} открыта.')
+
+    def put_many(self, kind, items):
+        """
+        Adds (key, payload) tasks. Keys already in the queue are skipped.
+
+        Returns:
+            int: Number of added tasks.
+        """
+        now = time.time()
+        with self.lock:
+            before = self.connection.total_changes
+            self.connection.execute('BEGIN IMMEDIATE')
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO tasks (kind, key, payload, updated_at) VALUES (?, ?, ?, ?)',
+                [(kind, key, json.dumps(payload, ensure_ascii=False), now) for key, payload in items]
+            )
+            self.connection.execute('COMMIT')
+            return self.connection.total_changes - before
+
+    def lease(self, worker_id):
+        """
+        Returns:
+            Task | None: The oldest pending or abandoned task, or None if there is nothing to do.
+        """
+        now = time.time()
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                self.connection.execute(
+                    "UPDATE tasks SET status = 'failed', error = 'lease expired', updated_at = ? "
+                    "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, now, self.max_attempts)
+                )
+                row = self.connection.execute(
+                    'SELECT id, kind, key, payload, attempts FROM tasks '
+                    "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is None:
+                    self.connection.execute('COMMIT')
+                    return None
+                task_id, kind, key, payload, attempts = row
+                self.connection.execute(
+                    "UPDATE tasks SET status = 'leased', attempts = ?, lease_owner = ?, lease_expires = ?, "
+                    'updated_at = ? WHERE id = ?',
+                    (attempts + 1, worker_id, now + self.lease_seconds, now, task_id)
+                )
+                self.connection.execute('COMMIT')
+            except Exception:
+                self.connection.execute('ROLLBACK')
+                raise
+        return Task(task_id, kind, key, json.loads(payload), attempts + 1)
+
+    def _update_leased(self, task, worker_id, sql, params):
+        with self.lock:
+            cursor = self.connection.execute(
+                f"{sql} WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (*params, task.id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def renew(self, task, worker_id):
+        """
+        Extends the lease of a task that takes long. False means the lease was lost to another worker.
+        """
+        now = time.time()
+        return self._update_leased(
+            task, worker_id, 'UPDATE tasks SET lease_expires = ?, updated_at = ?', (now + self.lease_seconds, now)
+        )
+
+    def complete(self, task, worker_id, result):
+        return self._update_leased(
+            task,
+            worker_id,
+            "UPDATE tasks SET status = 'done', result = ?, error = NULL, lease_owner = NULL, updated_at = ?",
+            (json.dumps(result, ensure_ascii=False), time.time())
+        )
+
+    def fail(self, task, worker_id, error):
+        status = 'failed' if task.attempts >= self.max_attempts else 'pending'
+        return self._update_leased(
+            task,
+            worker_id,
+            'UPDATE tasks SET status = ?, error = ?, lease_owner = NULL, updated_at = ?',
+            (status, str(error), time.time())
+        )
+
+    def counts(self, kind=None):
+        """
+        Returns:
+            dict: Status -> number of tasks.
+        """
+        sql = 'SELECT status, COUNT(*) FROM tasks'
+        params = ()
+        if kind is not None:
+            sql += ' WHERE kind = ?'
+            params = (kind,)
+        with self.lock:
+            return dict(self.connection.execute(f'{sql} GROUP BY status', params).fetchall())
+
+    def iter_results(self, kind):
+        """
+        Yields:
+            tuple: (key, payload, result) of every completed task in the order the tasks were added.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT key, payload, result FROM tasks WHERE kind = ? AND status = 'done' ORDER BY id", (kind,)
+            ).fetchall()
+        for key, payload, result in rows:
+            yield key, json.loads(payload), json.loads(result)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class MemoryWorkQueue:
+    """
+    In-process stand-in for SqliteWorkQueue with the same interface, for tests and single-box dry runs.
+
+    clock can be replaced to expire leases without waiting.
+    """
+
+    def __init__(self, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS, clock=time.time):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.tasks = {}
+        self.keys = set()
+        self.lock = threading.Lock()
+
+    def put_many(self, kind, items):
+        added = 0
+        with self.lock:
+            for key, payload in items:
+                if (kind, key) in self.keys:
+                    continue
+                self.keys.add((kind, key))
+                task_id = len(self.tasks) + 1
+                self.tasks[task_id] = {
+                    'kind': kind, 'key': key, 'payload': payload, 'status': 'pending', 'attempts': 0,
+                    'lease_owner': None, 'lease_expires': None, 'result': None, 'error': None
+                }
+                added += 1
+        return added
+
+    def lease(self, worker_id):
+        now = self.clock()
+        with self.lock:
+            for task_id, task in self.tasks.items():
+                expired = task['status'] == 'leased' and task['lease_expires'] < now
+                if expired and task['attempts'] >= self.max_attempts:
+                    task.update(status='failed', error='lease expired')
+                    continue
+                if task['status'] == 'pending' or expired:
+                    task.update(
+                        status='leased',
+                        attempts=task['attempts'] + 1,
+                        lease_owner=worker_id,
+                        lease_expires=now + self.lease_seconds
+                    )
+                    return Task(task_id, task['kind'], task['key'], task['payload'], task['attempts'])
+        return None
+
+    def _update_leased(self, task, worker_id, **values):
+        with self.lock:
+            stored = self.tasks.get(task.id)
+            if stored is None or stored['status'] != 'leased' or stored['lease_owner'] != worker_id:
+                return False
+            stored.update(values)
+            return True
+
+    def renew(self, task, worker_id):
+        return self._update_leased(task, worker_id, lease_expires=self.clock() + self.lease_seconds)
+
+    def complete(self, task, worker_id, result):
+        return self._update_leased(task, worker_id, status='done', result=result, error=None, lease_owner=None)
+
+    def fail(self, task, worker_id, error):
+        status = 'failed' if task.attempts >= self.max_attempts else 'pending'
+        return self._update_leased(task, worker_id, status=status, error=str(error), lease_owner=None)
+
+    def counts(self, kind=None):
+        counts = {}
+        with self.lock:
+            for task in self.tasks.values():
+                if kind is None or task['kind'] == kind:
+                    counts[task['status']] = counts.get(task['status'], 0) + 1
+        return counts
+
+    def iter_results(self, kind):
+        with self.lock:
+            rows = [
+                (task['key'], task['payload'], task['result'])
+                for task in self.tasks.values() if task['kind'] == kind and task['status'] == 'done'
+            ]
+        yield from rows
+
+    def close(self):
+        pass
@@ -0,0 +1,179 @@
+import logging
+import queue
+import threading
+from utils.proxy_pool_utils import release_pool_proxy, report_proxy_success, report_proxy_failure
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def _close_driver(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f'Не удалось корректно закрыть драйвер: {e}.')
+    release_pool_proxy(getattr(driver, 'pool_proxy', None))
+
+
+def _start_driver(driver_factory, processor_factory, worker_name):
+    """
+    Returns:
+        tuple: Started driver and its processor, or (None, None) if either could not be created.
+    """
+    try:
+        driver = driver_factory()
+    except Exception as e:
+        logger.error(f'{worker_name}: не удалось запустить драйвер: {e}.')
+        return None, None
+    logger.info(f'{worker_name}: драйвер запущен.')
+    try:
+        return driver, processor_factory(driver)
+    except Exception as e:
+        logger.error(f'{worker_name}: не удалось подготовить обработчик: {e}.')
+        _stop_driver(driver, None, worker_name)
+        return None, None
+
+
+def _stop_driver(driver, driver_closer, worker_name):
+    try:
+        (driver_closer or _close_driver)(driver)
+    except Exception as e:
+        logger.warning(f'{worker_name}: не удалось закрыть драйвер: {e}.')
+
+
+def _is_driver_healthy(driver, driver_checker, worker_name):
+    try:
+        return driver_checker is None or driver_checker(driver)
+    except Exception as e:
+        logger.warning(f'{worker_name}: не удалось проверить драйвер: {e}. Перезапускаю драйвер.')
+        return False
+
+
+def _process_item(worker_name, index, item, driver, processor, driver_factory, processor_factory, driver_closer,
+                  max_attempts):
+    """
+    Returns:
+        tuple: Result (None if the item failed) and the driver and processor left for the next item.
+    """
+    for attempt in range(1, max_attempts + 1):
+        if driver is None:
+            driver, processor = _start_driver(driver_factory, processor_factory, worker_name)
+            if driver is None:
+                continue
+        try:
+            result = processor(item)
+            # The time of a whole item is not comparable to proxy check latencies, so it is not reported.
+            report_proxy_success(getattr(driver, 'pool_proxy', None))
+            return result, driver, processor
+        except Exception as e:
+            logger.error(f'{worker_name}: сбой драйвера при обработке элемента {index + 1} '
+                         f'(попытка {attempt}/{max_attempts}): {e}. Перезапускаю драйвер.')
+            # A driver restarted after a failure gets another proxy if the pool is set.
+            report_proxy_failure(getattr(driver, 'pool_proxy', None))
+            _stop_driver(driver, driver_closer, worker_name)
+            driver, processor = None, None
+
+    logger.error(f'{worker_name}: элемент {index + 1} не обработан после {max_attempts} попыток.')
+    return None, driver, processor
+
+
+def _pool_worker(
+        worker_name, tasks, results, driver_factory, processor_factory, driver_closer, driver_checker, max_attempts
+):
+    driver, processor = _start_driver(driver_factory, processor_factory, worker_name)
+
+    while True:
+        task = tasks.get()
+        if task is _STOP:
+            break
+
+        index, item = task
+        result = None
+        # Every task puts a result, otherwise iter_pool_results would wait for it forever.
+        try:
+            if driver is not None and not _is_driver_healthy(driver, driver_checker, worker_name):
+                _stop_driver(driver, driver_closer, worker_name)
+                driver, processor = None, None
+            result, driver, processor = _process_item(
+                worker_name, index, item, driver, processor, driver_factory, processor_factory, driver_closer,
+                max_attempts
+            )
+        except Exception as e:
+            logger.error(f'{worker_name}: элемент {index + 1} не обработан: {e}.')
+        finally:
+            results.put((index, result))
+
+    if driver is not None:
+        _stop_driver(driver, driver_closer, worker_name)
+
+
+def iter_pool_results(
+        items,
+        processor_factory,
+        driver_factory,
+        worker_count,
+        driver_closer=None,
+        max_attempts=2,
+        driver_checker=None
+):
+    """
+    Processes items on several drivers sharing one work queue and yields results in input order.
+
+    Args:
+        items(list): Items to process.
+        processor_factory(callable): Takes a driver and returns a callable that processes one item.
+        driver_factory(callable): Starts a new driver. Called again when a worker's driver crashes.
+        worker_count(int): Number of drivers working in parallel.
+        driver_closer(callable, optional): Closes a driver. Defaults to driver.quit().
+        max_attempts(int, optional): Attempts per item, each after a driver restart. Defaults to 2.
+        driver_checker(callable, optional): Takes a driver and returns False if it has to be replaced
+            before the next item, e.g. after too many page loads.
+
+    Yields:
+        Result of the processor for every item, or None if the item could not be processed.
+    """
+    if not items:
+        return
+    driver_closer = driver_closer or _close_driver
+
+    tasks = queue.Queue()
+    results = queue.Queue()
+    for index, item in enumerate(items):
+        tasks.put((index, item))
+
+    worker_count = min(worker_count, len(items))
+    for _ in range(worker_count):
+        tasks.put(_STOP)
+
+    workers = [
+        threading.Thread(
+            target=_pool_worker,
+            args=(
+                f'Воркер {number}',
+                tasks,
+                results,
+                driver_factory,
+                processor_factory,
+                driver_closer,
+                driver_checker,
+                max_attempts
+            ),
+            daemon=True
+        )
+        for number in range(1, worker_count + 1)
+    ]
+    for worker in workers:
+        worker.start()
+
+    pending = {}
+    next_index = 0
+    while next_index < len(items):
+        index, result = results.get()
+        pending[index] = result
+        while next_index in pending:
+            yield pending.pop(next_index)
+            next_index += 1
+
+    for worker in workers:
+        worker.join()
@@ -1,21 +1,61 @@
-import re
 import time
 import logging
 from collections import OrderedDict
-from selenium.common import TimeoutException, NoSuchElementException
+from selenium.common import TimeoutException
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from utils import element_utils, click_element_css, get_functions_from_user
+from utils.element_utils import probe_page_state
+from utils.browser_pool_utils import get_driver_callbacks
+from utils.worker_pool_utils import iter_pool_results
+from utils.wait_utils import wait_for_selector, get_wait_timeout
+from utils.timing_utils import timed, timed_function
+from utils.string_utils import extract_video_id, parse_video_likes
+from utils.html_parse_utils import SnapshotParser, SNAPSHOT_FAILED_STATUS
+from utils.http_fetch_utils import YoutubeHttpClient, close_http_client
+from utils.initial_data_utils import get_watch_page_data, parse_watch_data, resolve_comment_count, COMMENTS_DISABLED
 
 logger = logging.getLogger(__name__)
 
+VIDEO_STATUS_CHECKS = (
+    ('is_video_unavailable', 'Видео удалено/недоступно'),
+    ('is_video_unacceptable', 'YouTube посчитал данное видео неприемлемым!'),
+)
+SHORTS_STATUS_CHECKS = (
+    ('is_shorts_unacceptable', 'Shorts недоступен, т.к. YouTube посчитал его неприемлемым.'),
+)
+# Not in the DOM right after the page is loaded: the description is collapsed, the comments header loads lazily.
+VIDEO_LAZY_FIELDS = ('description', 'comments')
+VIDEO_FAILED_STATUS = 'Не удалось обработать видео.'
+SHORTS_FAILED_STATUS = 'Не удалось обработать Shorts.'
+FAILED_STATUSES = (VIDEO_FAILED_STATUS, SHORTS_FAILED_STATUS, SNAPSHOT_FAILED_STATUS)
+VIDEO_COMMENTS_NOT_FOUND = 'Количество комментариев к Video не найдено.'
+SHORTS_TITLE_NOT_FOUND = 'Название Shorts не найдено.'
+SHORTS_DESCRIPTION_NOT_FOUND = 'Описание к Shorts не найдено.'
+SHORTS_RELEASE_DATE_NOT_FOUND = 'Дата релиза Shorts не найдена.'
+# Returned by getters in place of a field that is missing on the page: written to the output, never cached.
+# COMMENTS_DISABLED is a real state of the video and is cached for the TTL of comments like a count.
+FIELD_NOT_FOUND_VALUES = frozenset({
+    VIDEO_COMMENTS_NOT_FOUND, SHORTS_TITLE_NOT_FOUND, SHORTS_DESCRIPTION_NOT_FOUND, SHORTS_RELEASE_DATE_NOT_FOUND
+})
+
+
+def is_failed_record(record):
+    """
+    True for the record of a video that could not be processed, as opposed to a video that is unavailable.
+    """
+    return record is not None and record.get('status') in FAILED_STATUSES
+
+
 class VideoInfoBase:
-    def __init__(self, driver, css_selectors):
+    def __init__(self, driver, css_selectors, cache=None):
         self.driver = driver
         self.css_selectors = css_selectors
+        self.cache = cache
+        self.page_state = {}
         self.logger = logging.getLogger(__name__)
 
     def click_element_css(self, selector_key):
@@ -30,44 +70,97 @@ class VideoInfoBase:
     def _get_element_attribute(self, element, selector_key, attribute, error_message):
         return element_utils.get_element_attribute(element, self.css_selectors, selector_key, attribute, error_message)
 
-    def is_video_unavailable(self):
-        try:
-            self.driver.find_element(By.CSS_SELECTOR, self.css_selectors['is_video_unavailable'])
-            self.logger.info('Проверка на доступность Video: не пройдена.')
-            return True
-        except NoSuchElementException:
-            self.logger.info('Проверка на доступность Video: пройдена успешно.')
-            return False
-
-    def is_video_unacceptable(self):
-        try:
-            self.driver.find_element(By.CSS_SELECTOR, self.css_selectors['is_video_unacceptable'])
-            self.logger.info('Проверка на неприемлемое Video: не пройдена.')
-            return True
-        except NoSuchElementException:
-            self.logger.info('Проверка на неприемлемое Video: пройдена успешно.')
-            return False
-
-    def is_shorts_unacceptable(self):
-        try:
-            self.driver.find_element(By.CSS_SELECTOR, self.css_selectors['is_shorts_unacceptable'])
-            self.logger.info('Проверка на неприемлемый Shorts: не пройдена.')
-            return True
-        except NoSuchElementException:
-            self.logger.info('Проверка на неприемлемый Shorts: пройдена успешно.')
-            return False
+    def _get_cached_info(self, video, selected_functions):
+        video_id = extract_video_id(video.get('url'))
+        if self.cache is None or not video_id:
+            return video_id, {}
+        return video_id, self.cache.get_fresh(video_id, selected_functions)
+
+    def _is_fully_cached(self, cached_info, selected_functions, info_functions):
+        return all(func_name in cached_info for func_name in selected_functions if func_name in info_functions)
+
+    def _collect_info(self, info_functions, selected_functions, cached_info):
+        info = OrderedDict()
+        collected_info = {}
+        for func_name in selected_functions:
+            if func_name in cached_info:
+                info[func_name] = cached_info[func_name]
+            elif func_name in info_functions:
+                self.logger.debug(f'Выбрана функция {func_name} для сбора информации.')
+                func = info_functions[func_name]
+                with timed(f'field.{type(self).__name__}.{func_name}'):
+                    info[func_name] = collected_info[func_name] = func()
+            else:
+                self.logger.warning('Выбранная пользователем информация не соответствует словарю функций.')
+        return info, collected_info
+
+    def _save_to_cache(self, video_id, collected_info):
+        if self.cache is not None and video_id:
+            self.cache.put(video_id, {
+                name: value for name, value in collected_info.items()
+                if not (isinstance(value, str) and value in FIELD_NOT_FOUND_VALUES)
+            })
+
+    def probe_page(self, status_checks, extra_keys=()):
+        """
+        Checks all page states with one script call right after the page is loaded.
+
+        Args:
+            status_checks(iterable): (selector_key, status) pairs of dead-page checks, in priority order.
+            extra_keys(iterable, optional): Other state selectors to remember. Lazily loaded sections,
+                like the comments, are not on the page yet and have to be checked later.
+
+        Returns:
+            str | None: Status of the first failed check, or None if the page can be scraped.
+        """
+        selector_keys = [selector_key for selector_key, _ in status_checks] + list(extra_keys)
+        self.page_state = probe_page_state(self.driver, self.css_selectors, selector_keys)
+
+        for selector_key, status in status_checks:
+            if self.page_state.get(selector_key):
+                self.logger.info(f'Проверка страницы {selector_key}: не пройдена.')
+                return status
+        self.logger.info('Проверка страницы пройдена успешно.')
+
+        if self.page_state.get('live'):
+            self.logger.info('Видео является прямой трансляцией.')
+        elif self.page_state.get('upcoming'):
+            self.logger.info('Видео является ещё не начавшейся премьерой.')
+        return None
 
 
 class VideoInfo(VideoInfoBase):
-    def __init__(self, driver, css_selectors):
-        super().__init__(driver, css_selectors)
+    def __init__(
+            self,
+            driver,
+            css_selectors,
+            cache=None,
+            snapshot_dir=None,
+            http_workers=0,
+            http_proxy=None,
+            async_fetcher=None
+    ):
+        super().__init__(driver, css_selectors, cache)
+        self.snapshot_dir = snapshot_dir
+        self.http_workers = http_workers
+        self.http_proxy = http_proxy
+        self.async_fetcher = async_fetcher
         self.video_info_functions = {
             'name': self.get_video_title,
             'views': self.get_video_views,
             'likes': self.get_video_likes,
             'release_date': self.get_video_release_date,
             'comments': self.get_video_comments,
-            'description': self.get_video_description
+            'description': self.get_video_description,
+            'channel': self.get_video_channel_name
+        }
+        # VIDEO_LAZY_FIELDS are not parsed from snapshots, see _iter_video_info_snapshots.
+        self.video_snapshot_fields = {
+            'name': ('video_title', None),
+            'views': ('video_views', None),
+            'likes': ('video_likes', 'aria-label', parse_video_likes),
+            'release_date': ('video_release_date', None),
+            'channel': ('video_channel_name', None)
         }
 
     def get_video_description(self):
@@ -86,49 +179,37 @@ class VideoInfo(VideoInfoBase):
             error_message='Лайки к видео не найдены.'
         )
 
-        if aria_label:
-            if 'одному пользователю' in aria_label:
-                self.logger.info('В элементе "video_likes" содержится фраза "одному пользователю", количество лайков = 0')
-                return '0'
-            else:
-                match = re.search(r"и ещё ([\d\s\xa0]+)", aria_label)
-                if match:
-                    likes_str = match.group(1).replace("\xa0", "").replace(" ", "")
-                    if "тыс" in aria_label:
-                        likes = int(likes_str) * 1000
-                    elif "млн" in aria_label:
-                        likes = int(likes_str) * 1000000
-                    else:
-                        likes = int(likes_str)
-
-                    formatted_likes = "{:,}".format(likes).replace(",", ".")
-                    self.logger.info('Количество лайков в Video найдено успешно.')
-                    return formatted_likes
+        likes = parse_video_likes(aria_label)
+        if likes == '0':
+            self.logger.info('В элементе "video_likes" содержится фраза "одному пользователю", количество лайков = 0')
+        elif likes:
+            self.logger.info('Количество лайков в Video найдено успешно.')
+        return likes
 
     def get_video_comments(self):
         max_attempts = 10
         attempts = 0
         try:
-            try:
-                self.driver.find_element(By.CSS_SELECTOR, self.css_selectors['comments_turned_off'])
-                self.logger.warning('Комментарии к Video отключены.')
-                return 'Комментарии к Video отключены.'
-            except NoSuchElementException:
-                while attempts < max_attempts:
-                    attempts += 1
-                    self.logger.info(f'Попытка {attempts}/{max_attempts} поиска количества комментариев в Video.')
-                    try:
-                        video_comments_element = WebDriverWait(self.driver, 2).until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, self.css_selectors['video_comments']))
-                        )
-                        self.logger.info('Количество комментариев к Video найдено успешно.')
-                        return video_comments_element.text.strip()
-                    except TimeoutException:
-                        self.logger.info(f'Попытка {attempts}/{max_attempts} не удалась. Приступаю к прокрутке страницы.')
-                        self.driver.find_element("tag name", 'html').send_keys(Keys.PAGE_DOWN)
-                        time.sleep(0.2)
-                self.logger.warning('Достигнуто максимальное количество попыток поиска количества комментариев к Video.')
-                return 'Количество комментариев к Video не найдено.'
+            while attempts < max_attempts:
+                attempts += 1
+                self.logger.info(f'Попытка {attempts}/{max_attempts} поиска количества комментариев в Video.')
+                try:
+                    video_comments_element = WebDriverWait(self.driver, 2).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, self.css_selectors['video_comments']))
+                    )
+                    self.logger.info('Количество комментариев к Video найдено успешно.')
+                    return video_comments_element.text.strip()
+                except TimeoutException:
+                    # The message is loaded together with the comments section, so it is checked on every attempt.
+                    comments_state = probe_page_state(self.driver, self.css_selectors, ['comments_turned_off'])
+                    if comments_state.get('comments_turned_off'):
+                        self.logger.warning('Комментарии к Video отключены.')
+                        return COMMENTS_DISABLED
+                    self.logger.info(f'Попытка {attempts}/{max_attempts} не удалась. Приступаю к прокрутке страницы.')
+                    self.driver.find_element("tag name", 'html').send_keys(Keys.PAGE_DOWN)
+                    time.sleep(0.2)
+            self.logger.warning('Достигнуто максимальное количество попыток поиска количества комментариев к Video.')
+            return VIDEO_COMMENTS_NOT_FOUND
         except Exception as e:
             self.logger.error(f'Произошла ошибка при сборе количества комментариев к Video: {e}.')
             return None
@@ -154,43 +235,265 @@ class VideoInfo(VideoInfoBase):
             error_message='Название видео не найдено.'
         )
 
-    def scraping_video_info(self, filtered_data, selected_video_info_functions):
-        video_data = []
+    def get_video_channel_name(self):
+        return self._get_element_text(
+            element=self.driver,
+            selector_key='video_channel_name',
+            error_message='Название канала не найдено.'
+        )
+
+    def _get_initial_data_info(self, video_id, selected_video_info_functions):
+        initial_data, player_response = get_watch_page_data(self.driver)
+        page_info = parse_watch_data(initial_data, player_response, video_id)
+        if 'status' in page_info:
+            return page_info
+
+        if 'comments' in selected_video_info_functions and 'comments' not in page_info:
+            comment_count = resolve_comment_count(self.driver, initial_data, get_wait_timeout())
+            if comment_count:
+                page_info['comments'] = comment_count
+
+        initial_info = {
+            func_name: page_info[func_name] for func_name in selected_video_info_functions if func_name in page_info
+        }
+        self.logger.info(f'Из ytInitialData получено полей: {len(initial_info)} из {len(selected_video_info_functions)}.')
+        return initial_info
+
+    @timed_function('video.total')
+    def scraping_single_video(self, video, selected_video_info_functions):
+        video_id, cached_info = self._get_cached_info(video, selected_video_info_functions)
+        if self._is_fully_cached(cached_info, selected_video_info_functions, self.video_info_functions):
+            self.logger.info('Вся выбранная информация о видео взята из кэша.')
+            video_info, _ = self._collect_info(self.video_info_functions, selected_video_info_functions, cached_info)
+            return video_info
+
+        self.page_state = {}
+        self.driver.get(video['url'])
+
+        with timed('video.initial_data'):
+            initial_info = self._get_initial_data_info(video_id, selected_video_info_functions)
+        if 'status' in initial_info:
+            return OrderedDict(status=initial_info['status'])
+
+        known_info = {**cached_info, **initial_info}
+        if not self._is_fully_cached(known_info, selected_video_info_functions, self.video_info_functions):
+            wait_for_selector(
+                self.driver, self.css_selectors, ['video_title', 'is_video_unavailable', 'is_video_unacceptable']
+            )
+
+            status = self.probe_page(VIDEO_STATUS_CHECKS)
+            if status:
+                return OrderedDict(status=status)
+
+        video_info, collected_info = self._collect_info(
+            self.video_info_functions, selected_video_info_functions, known_info
+        )
+        collected_info.update(initial_info)
+        self._save_to_cache(video_id, collected_info)
+
+        return video_info
+
+    def scraping_video_info(self, filtered_data, selected_video_info_functions, worker_count=1):
+        return list(self.iter_video_info(filtered_data, selected_video_info_functions, worker_count))
+
+    def iter_video_info(self, filtered_data, selected_video_info_functions, worker_count=1):
+        if self.http_workers or self.async_fetcher is not None:
+            yield from self._iter_video_info_http(filtered_data, selected_video_info_functions)
+            return
+        if worker_count > 1:
+            if self.snapshot_dir:
+                self.logger.warning('Режим снимков работает только с одним драйвером и отключён для Video.')
+            yield from self._iter_video_info_pool(filtered_data, selected_video_info_functions, worker_count)
+            return
+        if self.snapshot_dir:
+            yield from self._iter_video_info_snapshots(filtered_data, selected_video_info_functions)
+            return
+
         total_videos = len(filtered_data)
         for video_number, video in enumerate(filtered_data, 1):
             self.logger.info(f'\nОбработка видео {video_number} из {total_videos}...')
-            self.driver.get(video['url'])
-            time.sleep(1)
-
-            video_info = OrderedDict()
+            yield self.scraping_single_video(video, selected_video_info_functions)
+
+    def _fetch_http_video_info(self, client, video, selected_video_info_functions):
+        video_id, cached_info = self._get_cached_info(video, selected_video_info_functions)
+        if self._is_fully_cached(cached_info, selected_video_info_functions, self.video_info_functions):
+            return cached_info
+
+        missing_functions = [func_name for func_name in selected_video_info_functions if func_name not in cached_info]
+        http_info = client.fetch_video_info(video['url'], missing_functions)
+        if 'status' in http_info:
+            return http_info
+
+        self._save_to_cache(video_id, http_info)
+        return {**cached_info, **http_info}
+
+    def _iter_async_video_info(self, filtered_data, selected_video_info_functions):
+        cached_data = [self._get_cached_info(video, selected_video_info_functions) for video in filtered_data]
+        is_cached = [
+            self._is_fully_cached(cached_info, selected_video_info_functions, self.video_info_functions)
+            for _, cached_info in cached_data
+        ]
+        fetch_urls = [video['url'] for video, cached in zip(filtered_data, is_cached) if not cached]
+        fetched_data = self.async_fetcher.iter_video_info(fetch_urls, selected_video_info_functions)
+
+        for (video_id, cached_info), cached in zip(cached_data, is_cached):
+            if cached:
+                yield cached_info
+                continue
 
-            if self.is_video_unavailable():
-                video_info['status'] = 'Видео удалено/недоступно'
-                video_data.append(video_info)
+            http_info = next(fetched_data)
+            if http_info is None or 'status' in http_info:
+                yield http_info
                 continue
-            elif self.is_video_unacceptable():
-                video_info['status'] = 'YouTube посчитал данное видео неприемлемым!'
-                video_data.append(video_info)
+
+            self._save_to_cache(video_id, http_info)
+            yield {**cached_info, **http_info}
+
+    def _iter_video_info_http(self, filtered_data, selected_video_info_functions):
+        """
+        Collects Video info over HTTP without a browser: with the asyncio fetcher if it is set,
+        otherwise in http_workers threads.
+
+        Fields that are missing in the server-rendered page are collected by the Selenium driver.
+        """
+        if self.async_fetcher is not None:
+            results = self._iter_async_video_info(filtered_data, selected_video_info_functions)
+        else:
+            self.logger.info(f'Запускаю HTTP-обработку {len(filtered_data)} видео в {self.http_workers} потоках.')
+
+            def processor_factory(client):
+                return lambda video: self._fetch_http_video_info(client, video, selected_video_info_functions)
+
+            results = iter_pool_results(
+                filtered_data,
+                processor_factory,
+                lambda: YoutubeHttpClient(self.http_proxy),
+                self.http_workers,
+                driver_closer=close_http_client
+            )
+        total_videos = len(filtered_data)
+        for video_number, (video, http_info) in enumerate(zip(filtered_data, results), 1):
+            self.logger.info(f'\nОбработка видео {video_number} из {total_videos}...')
+            http_info = http_info or {}
+            if 'status' in http_info:
+                yield OrderedDict(status=http_info['status'])
                 continue
 
-            for func_name in selected_video_info_functions:
-                if func_name in self.video_info_functions:
-                    self.logger.debug(f'Выбрана функция {func_name} для сбора информации.')
-                    func = self.video_info_functions[func_name]
-                    video_info[func_name] = func()
+            missing_functions = [
+                func_name for func_name in selected_video_info_functions
+                if func_name in self.video_info_functions and func_name not in http_info
+            ]
+            if missing_functions:
+                self.logger.info(f'Поля не найдены в HTML-ответе, собираю через браузер: {", ".join(missing_functions)}.')
+                browser_info = self.scraping_single_video(video, missing_functions)
+                if 'status' in browser_info:
+                    yield browser_info
+                    continue
+                http_info = {**http_info, **browser_info}
+
+            yield OrderedDict(
+                (func_name, http_info[func_name]) for func_name in selected_video_info_functions if func_name in http_info
+            )
+
+    def _iter_video_info_snapshots(self, filtered_data, selected_video_info_functions):
+        """
+        Saves page_source of every video and parses it in a process pool while the driver opens the next URL.
+
+        Lazy fields are not parsed from the snapshot: they are taken from ytInitialData of the page,
+        or collected live if the data has no value, before the driver leaves the page.
+        """
+        field_specs = {
+            name: self.video_snapshot_fields[name]
+            for name in selected_video_info_functions if name in self.video_snapshot_fields
+        }
+        lazy_functions = [name for name in selected_video_info_functions if name in VIDEO_LAZY_FIELDS]
+        parser = SnapshotParser(self.css_selectors, field_specs, VIDEO_STATUS_CHECKS, self.snapshot_dir)
+        with parser:
+            total_videos = len(filtered_data)
+            for video_number, video in enumerate(filtered_data, 1):
+                self.logger.info(f'\nОбработка видео {video_number} из {total_videos}...')
+                video_id, cached_info = self._get_cached_info(video, selected_video_info_functions)
+
+                if self._is_fully_cached(cached_info, selected_video_info_functions, self.video_info_functions):
+                    self.logger.info('Вся выбранная информация о видео взята из кэша.')
+                    parser.add_result(OrderedDict(), (video_id, cached_info, {}))
                 else:
-                    self.logger.warning(f'Выбранная пользователем информация не соответствует словарю функций.')
+                    self.page_state = {}
+                    self.driver.get(video['url'])
+                    wait_for_selector(
+                        self.driver, self.css_selectors, ['video_title', 'is_video_unavailable', 'is_video_unacceptable']
+                    )
+                    page_source = self.driver.page_source
+                    lazy_info = self._get_lazy_video_info(
+                        video_id, [name for name in lazy_functions if name not in cached_info]
+                    )
+                    if 'status' in lazy_info:
+                        parser.add_result(OrderedDict(status=lazy_info['status']), (video_id, cached_info, {}))
+                    else:
+                        parser.submit(video_id or video['url'], page_source, (video_id, cached_info, lazy_info))
+
+                for (video_id, cached_info, lazy_info), parsed_info in parser.iter_ready():
+                    yield self._merge_snapshot_info(
+                        video_id, cached_info, lazy_info, parsed_info, selected_video_info_functions
+                    )
+
+            for (video_id, cached_info, lazy_info), parsed_info in parser.iter_all():
+                yield self._merge_snapshot_info(video_id, cached_info, lazy_info, parsed_info, selected_video_info_functions)
+
+    def _get_lazy_video_info(self, video_id, lazy_functions):
+        if not lazy_functions:
+            return {}
+        lazy_info = self._get_initial_data_info(video_id, lazy_functions)
+        if 'status' in lazy_info:
+            return lazy_info
+        for func_name in lazy_functions:
+            if func_name not in lazy_info:
+                self.logger.info(f'Поля {func_name} нет в ytInitialData, собираю его со страницы.')
+                with timed(f'field.{type(self).__name__}.{func_name}'):
+                    lazy_info[func_name] = self.video_info_functions[func_name]()
+        return lazy_info
+
+    def _merge_snapshot_info(self, video_id, cached_info, lazy_info, parsed_info, selected_video_info_functions):
+        if 'status' in parsed_info:
+            return parsed_info
+
+        collected_info = {**parsed_info, **lazy_info}
+        video_info = OrderedDict()
+        for func_name in selected_video_info_functions:
+            if func_name in cached_info:
+                video_info[func_name] = cached_info[func_name]
+            elif func_name in collected_info:
+                video_info[func_name] = collected_info[func_name]
+        self._save_to_cache(video_id, {
+            name: value for name, value in collected_info.items() if name not in cached_info and value is not None
+        })
+        return video_info
+
+    def _iter_video_info_pool(self, filtered_data, selected_video_info_functions, worker_count):
+        self.logger.info(f'Запускаю обработку {len(filtered_data)} видео в {worker_count} драйверах.')
+
+        def processor_factory(driver):
+            scraper = VideoInfo(driver, self.css_selectors, self.cache)
+            return lambda video: scraper.scraping_single_video(video, selected_video_info_functions)
+
+        driver_factory, driver_closer, driver_checker = get_driver_callbacks()
+        results = iter_pool_results(
+            filtered_data, processor_factory, driver_factory, worker_count, driver_closer, driver_checker=driver_checker
+        )
+        for video_info in results:
+            if video_info is None:
+                video_info = OrderedDict(status=VIDEO_FAILED_STATUS)
+            yield video_info
 
-            video_data.append(video_info)
-        return video_data
+    def get_available_info(self):
+        return list(self.video_info_functions.keys())
 
     def get_video_info_functions(self):
-        available_info = list(self.video_info_functions.keys())
-        return get_functions_from_user('видео', available_info)
+        return get_functions_from_user('видео', self.get_available_info())
 
 class ShortsInfo(VideoInfoBase):
-    def __init__(self, driver, css_selectors):
-        super().__init__(driver, css_selectors)
+    def __init__(self, driver, css_selectors, cache=None):
+        super().__init__(driver, css_selectors, cache)
         self.shorts_info_functions = {
             'name': self.get_shorts_title,
             'views': self.get_shorts_views,
@@ -201,21 +504,16 @@ class ShortsInfo(VideoInfoBase):
         }
 
     def get_shorts_title(self):
-        selectors = ['shorts_title_1', 'shorts_title_2', 'shorts_title_3']
-        for selector in selectors:
-            try:
-                shorts_title_element = WebDriverWait(self.driver, 0.5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, self.css_selectors[selector]))
-                )
-                self.logger.info('Заголовок Shorts найден успешно.')
-                return shorts_title_element.text.strip()
-            except TimeoutException:
-                self.logger.info(f'Не удалось найти название Shorts. Пробую другой CSS-селектор: {selector}...')
-            except Exception as e:
-                self.logger.error(f'Произошла ошибка при сборе заголовка Shorts: {e}.')
-                return None
-        self.logger.warning('Заголовок Shorts не найден.')
-        return 'Название Shorts не найдено.'
+        try:
+            shorts_title_element = self.css_selectors.wait_for(self.driver, 'shorts_title', 0.5)
+            if shorts_title_element is None:
+                self.logger.warning('Заголовок Shorts не найден.')
+                return SHORTS_TITLE_NOT_FOUND
+            self.logger.info('Заголовок Shorts найден успешно.')
+            return shorts_title_element.text.strip()
+        except Exception as e:
+            self.logger.error(f'Произошла ошибка при сборе заголовка Shorts: {e}.')
+            return None
 
     def get_shorts_likes(self):
         shorts_likes = self._get_element_text(
@@ -244,21 +542,16 @@ class ShortsInfo(VideoInfoBase):
         Returns:
             str: Текст описания Shorts-видео или 'Описание к Shorts не найдено', если описание не найдено.
         """
-        selectors = ['shorts_description_1', 'shorts_description_2']
-        for selector in selectors:
-            try:
-                description_element = WebDriverWait(self.driver, 0.5).until(
-                    EC.visibility_of_element_located((By.CSS_SELECTOR, self.css_selectors[selector]))
-                )
-                self.logger.info('Описание к Shorts найдено успешно.')
-                return description_element.text.strip()
-            except TimeoutException:
-                self.logger.info(f'Не удалось найти описание к Shorts. Пробую другой CSS-селектор: {selector}...')
-            except Exception as e:
-                self.logger.error(f'Произошла ошибка при сборе описания к Shorts: {e}.')
-                return None
-        self.logger.warning('Описание к Shorts не найдено.')
-        return 'Описание к Shorts не найдено.'
+        try:
+            description_element = self.css_selectors.wait_for(self.driver, 'shorts_description', 0.5, visible=True)
+            if description_element is None:
+                self.logger.warning('Описание к Shorts не найдено.')
+                return SHORTS_DESCRIPTION_NOT_FOUND
+            self.logger.info('Описание к Shorts найдено успешно.')
+            return description_element.text.strip()
+        except Exception as e:
+            self.logger.error(f'Произошла ошибка при сборе описания к Shorts: {e}.')
+            return None
 
     def get_shorts_views(self):
         return self._get_element_text(
@@ -307,40 +600,73 @@ class ShortsInfo(VideoInfoBase):
                     return f'{hours_ago} {ago}'
             except TimeoutException:
                 self.logger.warning('Дата релиза Shorts не найдена.')
-                return 'Дата релиза Shorts не найдена.'
+                return SHORTS_RELEASE_DATE_NOT_FOUND
         except Exception as e:
             self.logger.error(f'Произошла ошибка при поиске даты релиза Shorts: {e}.')
             return None
 
-    def scraping_shorts_info(self, filtered_data, selected_shorts_info_functions):
-        shorts_data = []
-        total_videos = len(filtered_data)
-        for video_number, video in enumerate(filtered_data, 1):
-            self.logger.info(f'\nОбработка Shorts {video_number} из {total_videos}...')
-            self.driver.get(video['url'])
-            time.sleep(1)
+    def scraping_single_shorts(self, video, selected_shorts_info_functions):
+        video_id, cached_info = self._get_cached_info(video, selected_shorts_info_functions)
+        if self._is_fully_cached(cached_info, selected_shorts_info_functions, self.shorts_info_functions):
+            self.logger.info('Вся выбранная информация о Shorts взята из кэша.')
+            shorts_info, _ = self._collect_info(self.shorts_info_functions, selected_shorts_info_functions, cached_info)
+            return shorts_info
 
-            shorts_info = OrderedDict()
+        self.page_state = {}
+        self.driver.get(video['url'])
+        wait_for_selector(self.driver, self.css_selectors, ['shorts_menu_button', 'is_shorts_unacceptable'])
 
-            if self.is_shorts_unacceptable():
-                shorts_info['status'] = 'Shorts недоступен, т.к. YouTube посчитал его неприемлемым.'
-                continue
+        if self.probe_page(SHORTS_STATUS_CHECKS):
+            return None
+
+        self.click_element_css('shorts_menu_button')
+        self.click_element_css('shorts_description_button')
+        self.click_element_css('shorts_more_button')
+
+        shorts_info, collected_info = self._collect_info(
+            self.shorts_info_functions, selected_shorts_info_functions, cached_info
+        )
+        self._save_to_cache(video_id, collected_info)
+
+        return shorts_info
 
-            self.click_element_css('shorts_menu_button')
-            self.click_element_css('shorts_description_button')
-            self.click_element_css('shorts_more_button')
+    def scraping_shorts_info(self, filtered_data, selected_shorts_info_functions, worker_count=1):
+        shorts_data = self.iter_shorts_info(filtered_data, selected_shorts_info_functions, worker_count)
+        return [shorts_info for shorts_info in shorts_data if shorts_info is not None]
 
-            for func_name in selected_shorts_info_functions:
-                if func_name in self.shorts_info_functions:
-                    self.logger.debug(f'Выбрана функция {func_name} для сбора информации.')
-                    func = self.shorts_info_functions[func_name]
-                    shorts_info[func_name] = func()
+    def iter_shorts_info(self, filtered_data, selected_shorts_info_functions, worker_count=1):
+        """
+        Yields Shorts info in input order. Unavailable Shorts yield None, Shorts that could not be processed
+        yield a record with status.
+        """
+        if worker_count > 1:
+            self.logger.info(f'Запускаю обработку {len(filtered_data)} Shorts в {worker_count} драйверах.')
+
+            def processor_factory(driver):
+                scraper = ShortsInfo(driver, self.css_selectors, self.cache)
+                # Wrapped, so an unavailable Shorts (None) is not taken for a failed one.
+                return lambda video: (scraper.scraping_single_shorts(video, selected_shorts_info_functions),)
+
+            driver_factory, driver_closer, driver_checker = get_driver_callbacks()
+            results = iter_pool_results(
+                filtered_data, processor_factory, driver_factory, worker_count, driver_closer, driver_checker=driver_checker
+            )
+            for result in results:
+                if result is None:
+                    yield OrderedDict(status=SHORTS_FAILED_STATUS)
                 else:
-                    self.logger.warning(f'Выбранная пользователем информация не соответствует словарю функций.')
+                    yield result[0]
+        else:
+            yield from self._iter_shorts_info_serial(filtered_data, selected_shorts_info_functions)
+
+    def _iter_shorts_info_serial(self, filtered_data, selected_shorts_info_functions):
+        total_videos = len(filtered_data)
+        for video_number, video in enumerate(filtered_data, 1):
+            self.logger.info(f'\nОбработка Shorts {video_number} из {total_videos}...')
+            yield self.scraping_single_shorts(video, selected_shorts_info_functions)
 
-            shorts_data.append(shorts_info)
-        return shorts_data
+    def get_available_info(self):
+        return list(self.shorts_info_functions.keys())
 
     def get_shorts_info_functions(self):
-        available_info = list(self.shorts_info_functions.keys())
-        return get_functions_from_user('Shorts', available_info)
\ No newline at end of file
+        return get_functions_from_user('Shorts', self.get_available_info())
\ No newline at end of file